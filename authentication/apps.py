@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        if getattr(settings, 'USE_MONGODB', False) and getattr(settings, 'MONGODB_CHECK_INDEXES_ON_STARTUP', False):
+            from mongo_indexes import check_indexes
+            check_indexes()
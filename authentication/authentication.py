@@ -0,0 +1,123 @@
+"""
+Stateless JWT authentication for the MongoDB-backed API
+
+The request principal is built from the token claims; no Django User row is
+read. Optionally (JWT_VERIFY_MONGO_USER) the Mongo user is confirmed to still
+exist and be verified, through a bounded TTL cache keyed by user id so the
+common case costs no database round trip.
+
+Async views (which DRF cannot serve) are protected with ``jwt_required``,
+which runs the same checks without blocking the event loop.
+"""
+
+from functools import wraps
+
+from django.conf import settings
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from mongo_cache import ReadThroughCache
+from .decorators import JsonApiResponse
+
+# user id -> whether the Mongo user exists and is verified
+principal_cache = ReadThroughCache(
+    max_entries=getattr(settings, 'JWT_PRINCIPAL_CACHE_MAX_ENTRIES', 10000),
+    ttl_seconds=getattr(settings, 'JWT_PRINCIPAL_CACHE_TTL_SECONDS', 60),
+)
+
+
+class MongoPrincipal:
+    """Lightweight authenticated user built from JWT claims"""
+    
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+    
+    def __init__(self, token):
+        self.token = token
+        self.id = str(token[api_settings.USER_ID_CLAIM])
+        self.email = token.get('email')
+        self.username = token.get('username')
+    
+    @property
+    def pk(self):
+        return self.id
+    
+    def __str__(self):
+        return f"MongoPrincipal {self.id}"
+    
+    def __eq__(self, other):
+        return isinstance(other, MongoPrincipal) and self.id == other.id
+    
+    def __hash__(self):
+        return hash(self.id)
+
+
+class MongoJWTAuthentication(JWTAuthentication):
+    """Validates signature and expiry, then builds a MongoPrincipal from the claims"""
+    
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        
+        principal = MongoPrincipal(validated_token)
+        if getattr(settings, 'JWT_VERIFY_MONGO_USER', True):
+            from mongo_models import MongoUser
+            
+            is_active = principal_cache.get_or_load(
+                principal.id, lambda: MongoUser.is_active_user(principal.id)
+            )
+            if not is_active:
+                raise AuthenticationFailed("User not found or not verified", code='user_not_found')
+        return principal
+    
+    async def aauthenticate(self, request):
+        """Async authenticate(); returns (principal, token) or None without a bearer token"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        principal = MongoPrincipal(validated_token)
+        if getattr(settings, 'JWT_VERIFY_MONGO_USER', True):
+            from mongo_models_async import AsyncMongoUser
+            
+            is_active = await principal_cache.aget_or_load(
+                principal.id, lambda: AsyncMongoUser.ais_active_user(principal.id)
+            )
+            if not is_active:
+                raise AuthenticationFailed("User not found or not verified", code='user_not_found')
+        return principal, validated_token
+
+
+def jwt_required(view):
+    """Async counterpart of DRF's IsAuthenticated for plain Django async views
+
+    Sets ``request.user`` to the MongoPrincipal; failures get the same 401
+    body and WWW-Authenticate header DRF would send.
+    """
+    authenticator = MongoJWTAuthentication()
+    
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user_auth = await authenticator.aauthenticate(request)
+            if user_auth is None:
+                raise NotAuthenticated()
+        except APIException as e:
+            data = e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}
+            response = JsonApiResponse(data, status=e.status_code)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+        request.user, request.auth = user_auth
+        return await view(request, *args, **kwargs)
+    return wrapper
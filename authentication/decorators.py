@@ -0,0 +1,80 @@
+"""
+Decorators for plain Django async views
+
+DRF's ``@api_view`` only wraps synchronous functions, so the async views use
+``async_api_view`` instead: it restricts the HTTP methods, exempts the view
+from CSRF (token-authenticated API, as with DRF) and exposes the parsed body
+as ``request.data`` and the query string as ``request.query_params``, with
+DRF-compatible error bodies. Views answer with ``JsonApiResponse``, whose body
+is rendered by DRF's JSONRenderer, so it is byte-for-byte what the DRF views
+send for the same data.
+"""
+
+from functools import wraps
+from io import BytesIO
+import json
+
+from django.http import HttpResponse, QueryDict
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import UnsupportedMediaType
+from rest_framework.renderers import JSONRenderer
+
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+
+class JsonApiResponse(HttpResponse):
+    """JSON response rendered like DRF's Response (datetime precision, separators, UTF-8)"""
+    
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(JSONRenderer().render(data), **kwargs)
+
+
+def parse_request_data(request):
+    """Parse the body like DRF's default JSON, form and multipart parsers
+
+    Raises ValueError on malformed JSON and UnsupportedMediaType for a body
+    of any other content type.
+    """
+    if request.content_type == 'application/json':
+        if not request.body:
+            return {}
+        return json.loads(request.body)
+    if request.content_type in FORM_CONTENT_TYPES:
+        if request.method == 'POST':
+            return request.POST
+        # Django only parses the form bodies of POST requests (e.g. not DELETE)
+        if request.content_type == 'multipart/form-data':
+            data, _files = request.parse_file_upload(request.META, BytesIO(request.body))
+            return data
+        return QueryDict(request.body, encoding=request.encoding)
+    if not request.body:
+        return {}
+    raise UnsupportedMediaType(request.content_type)
+
+
+def async_api_view(http_method_names):
+    """Async counterpart of DRF's @api_view for the listed methods"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in http_method_names:
+                return JsonApiResponse({
+                    'detail': f'Method "{request.method}" not allowed.'
+                }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            
+            try:
+                request.data = parse_request_data(request)
+            except ValueError as e:
+                return JsonApiResponse({
+                    'detail': f'JSON parse error - {e}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            except UnsupportedMediaType as e:
+                return JsonApiResponse({
+                    'detail': e.detail
+                }, status=e.status_code)
+            request.query_params = request.GET
+            return await view(request, *args, **kwargs)
+        return csrf_exempt(wrapper)
+    return decorator
@@ -0,0 +1,141 @@
+"""
+Password hashing service for PoojaPath API
+
+Hashing and verification run in a bounded worker pool instead of inline in
+the request thread. At most PASSWORD_HASHING_WORKERS hashes run at once and
+at most PASSWORD_HASHING_MAX_PENDING more may wait; beyond that callers get
+``HashingBusy`` (mapped to 503) instead of piling up behind the CPU.
+
+The ``a``-prefixed methods are for async views: they wait for a slot and for
+the result without blocking the event loop.
+
+Verification reports whether the stored hash uses an outdated hasher or
+cost, so callers can rehash on successful login (see MongoUser.authenticate).
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import multiprocessing
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated"""
+    pass
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count taken from PASSWORD_PBKDF2_ITERATIONS"""
+    
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+
+def hash_password(password):
+    """Hash with the preferred hasher (runs in the pool)"""
+    return make_password(password)
+
+
+def verify_password(password, encoded):
+    """Return (is_correct, must_update) for a stored hash (runs in the pool)"""
+    outdated = []
+    is_correct = check_password(password, encoded, setter=lambda raw_password: outdated.append(True))
+    return is_correct, bool(outdated)
+
+
+class PasswordHashingService:
+    """Bounded thread/process pool for password hashing with back-pressure"""
+    
+    def __init__(self, workers=None, max_pending=64, timeout=5, executor='thread'):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor_type = executor
+        self._slots = threading.BoundedSemaphore(self.workers + max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', None),
+            max_pending=getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', 64),
+            timeout=getattr(settings, 'PASSWORD_HASHING_TIMEOUT_SECONDS', 5),
+            executor=getattr(settings, 'PASSWORD_HASHING_EXECUTOR', 'thread'),
+        )
+    
+    def _get_executor(self):
+        # Pools do not survive a fork; create one lazily per process
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                if self.executor_type == 'process':
+                    # Forked children inherit the configured Django settings
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('fork')
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='password-hasher'
+                    )
+                self._pid = os.getpid()
+            return self._executor
+    
+    def _submit_acquired(self, fn, *args):
+        # The caller holds a slot; it is released when the work finishes
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+    
+    def submit(self, fn, *args):
+        """Queue work on the pool, waiting up to ``timeout`` seconds for a free slot"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy("Password hashing is saturated, try again shortly")
+        return self._submit_acquired(fn, *args)
+    
+    async def asubmit(self, fn, *args):
+        """Async submit; returns an awaitable for the result"""
+        if not self._slots.acquire(blocking=False):
+            # Saturated: wait for a slot in the default executor, not on the event loop
+            loop = asyncio.get_running_loop()
+            acquired = await loop.run_in_executor(None, self._slots.acquire, True, self.timeout)
+            if not acquired:
+                raise HashingBusy("Password hashing is saturated, try again shortly")
+        return asyncio.wrap_future(self._submit_acquired(fn, *args))
+    
+    def hash(self, password):
+        return self.submit(hash_password, password).result()
+    
+    def verify(self, password, encoded):
+        """Return (is_correct, must_update)"""
+        if not encoded:
+            return False, False
+        return self.submit(verify_password, password, encoded).result()
+    
+    async def ahash(self, password):
+        return await (await self.asubmit(hash_password, password))
+    
+    async def averify(self, password, encoded):
+        """Async verify; returns (is_correct, must_update)"""
+        if not encoded:
+            return False, False
+        return await (await self.asubmit(verify_password, password, encoded))
+    
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+password_hasher = PasswordHashingService.from_settings()
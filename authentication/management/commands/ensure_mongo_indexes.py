@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mongo_indexes import MONGO_INDEXES, ensure_indexes, missing_indexes
+
+
+class Command(BaseCommand):
+    help = 'Create the MongoDB indexes declared in mongo_indexes.MONGO_INDEXES'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'collections', nargs='*',
+            help='Only these collections (default: all registered collections)'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report missing indexes; exit with an error if any are missing'
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'USE_MONGODB', False):
+            # build.sh runs this on every deploy, including SQLite ones
+            self.stdout.write('USE_MONGODB is off; no MongoDB indexes to create')
+            return
+
+        collections = options['collections'] or None
+        unknown = set(collections or []) - set(MONGO_INDEXES)
+        if unknown:
+            raise CommandError(f"No indexes registered for: {', '.join(sorted(unknown))}")
+
+        if options['check']:
+            missing = missing_indexes(collections)
+            for collection_name, index_name in missing:
+                self.stdout.write(f'Missing: {collection_name}.{index_name}')
+            if missing:
+                raise CommandError(f'{len(missing)} MongoDB indexes are missing')
+            self.stdout.write(self.style.SUCCESS('All MongoDB indexes are present'))
+            return
+
+        for collection_name, index_names in ensure_indexes(collections).items():
+            for index_name in index_names:
+                self.stdout.write(f'Index ready: {collection_name}.{index_name}')
+        self.stdout.write(self.style.SUCCESS('MongoDB indexes are up to date'))
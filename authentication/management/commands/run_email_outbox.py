@@ -0,0 +1,35 @@
+import json
+import signal
+
+from django.core.management.base import BaseCommand
+
+from authentication.outbox import outbox_dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the MongoDB email outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker threads (default: EMAIL_OUTBOX_WORKERS)')
+        parser.add_argument('--once', action='store_true', help='Send everything that is due, then exit')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print queue depth and the delivery latency of the last --window seconds, then exit')
+        parser.add_argument('--window', type=int, default=3600, help='Seconds of deliveries --stats covers')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(outbox_dispatcher.queue_stats(options['window']), indent=2))
+            return
+
+        if options['once']:
+            processed = outbox_dispatcher.drain()
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} outbox emails'))
+            return
+
+        signal.signal(signal.SIGTERM, lambda *_: outbox_dispatcher.stop())
+        outbox_dispatcher.start(workers=options['workers'] or max(outbox_dispatcher.workers, 1))
+        self.stdout.write('Email outbox workers started')
+        try:
+            outbox_dispatcher.join()
+        except KeyboardInterrupt:
+            outbox_dispatcher.stop()
@@ -0,0 +1,115 @@
+from argparse import ArgumentTypeError
+from datetime import datetime, timezone
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from mongodb_handler import mongo_handler
+from mongo_indexes import ensure_indexes
+from mongo_seed import CITIES, SEED_BATCH_SIZE, SEED_COLLECTIONS, SEED_EPOCH, SeedPlan, seed
+
+
+def utc_datetime(value):
+    """--now: an ISO 8601 date/time, as naive UTC like the datetimes the models store"""
+    try:
+        when = datetime.fromisoformat(value)
+    except ValueError:
+        raise ArgumentTypeError(f'not an ISO 8601 date/time: {value!r}')
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill MongoDB with synthetic users, OTPs, login sessions and pandits for scale testing. '
+        'The same --seed always generates the same documents. Never run against production data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0)
+        parser.add_argument('--otps', type=int, default=0)
+        parser.add_argument('--sessions', type=int, default=0, help='Login sessions')
+        parser.add_argument('--pandits', type=int, default=0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--locations', type=int, default=len(CITIES), help='Distinct pandit locations')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Location popularity skew (0 = uniform, higher = more concentrated)')
+        parser.add_argument('--days', type=int, default=365, help='Spread creation times over this many days')
+        parser.add_argument('--now', type=utc_datetime, default=SEED_EPOCH,
+                            help='End of the seeded period (ISO 8601, UTC). Fixed by default so that a '
+                                 're-run generates the same _ids and skips documents already inserted')
+        parser.add_argument('--password', default='SeedPass123!', help='Password of every generated user')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Insert processes')
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+        parser.add_argument('--drop', action='store_true',
+                            help='Drop the seeded collections first (indexes are rebuilt after loading); '
+                                 'needs MONGODB_CONNECTION_STRING set in the environment')
+
+    def handle(self, *args, **options):
+        counts = dict(zip(SEED_COLLECTIONS, (
+            options['users'], options['otps'], options['sessions'], options['pandits'],
+        )))
+        if not any(counts.values()):
+            raise CommandError('Nothing to generate: pass --users, --otps, --sessions and/or --pandits')
+        if options['locations'] < 1:
+            raise CommandError('--locations must be at least 1')
+        if counts['otps'] and settings.MONGODB_OTP_TTL_INDEX:
+            self.stderr.write(self.style.WARNING(
+                'The otps TTL index deletes OTPs older than 10 minutes, which is nearly all seeded ones; '
+                'set MONGODB_OTP_TTL_INDEX=False to keep them'
+            ))
+
+        in_memory = type(mongo_handler.get_client()).__module__.startswith('mongomock')
+        if options['drop'] and not in_memory and 'MONGODB_CONNECTION_STRING' not in os.environ:
+            # Only an explicit setting: a cluster configured in .env must not be dropped by accident
+            raise CommandError('--drop drops collections on a real MongoDB; '
+                               'set MONGODB_CONNECTION_STRING in the environment')
+
+        workers = options['workers']
+        if in_memory:
+            # An in-memory database cannot be shared with worker processes
+            workers = 1
+
+        if options['drop']:
+            for collection_name, count in counts.items():
+                if count:
+                    mongo_handler.get_collection(collection_name).drop()
+
+        plan = SeedPlan(
+            counts,
+            seed=options['seed'],
+            locations=options['locations'],
+            zipf=options['zipf'],
+            days=options['days'],
+            now=options['now'],
+            # Hashing millions of passwords would dominate the run: every user shares one hash
+            password_hash=make_password(options['password']),
+        )
+        total = sum(counts.values())
+        done = 0
+        started = time.perf_counter()
+
+        def progress(collection_name, inserted, duplicates):
+            nonlocal done
+            done += inserted + duplicates
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'\r{done}/{total} documents ({done / elapsed:,.0f}/s)', ending='')
+            self.stdout.flush()
+
+        totals = seed(plan, workers=workers, batch_size=options['batch_size'], progress=progress)
+        self.stdout.write('')
+
+        ensure_indexes([collection_name for collection_name, count in counts.items() if count])
+
+        elapsed = time.perf_counter() - started
+        for collection_name, (inserted, duplicates) in totals.items():
+            skipped = f', {duplicates} already present' if duplicates else ''
+            self.stdout.write(f'{collection_name}: {inserted} inserted{skipped}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {sum(inserted for inserted, _ in totals.values())} documents in {elapsed:.1f}s '
+            f'with {workers} worker(s)'
+        ))
@@ -0,0 +1,33 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from mongo_models import MongoOTP
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired OTPs from MongoDB. Only needed when the otps TTL index is disabled '
+        '(MONGODB_OTP_TTL_INDEX=False); runs once, or forever with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0, help='Repeat every N seconds (0 = run once)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        # Background maintenance: yield the CPU to anything else on the host
+        if hasattr(os, 'nice'):
+            os.nice(10)
+
+        while True:
+            deleted = MongoOTP.cleanup_expired_otps(
+                batch_size=options['batch_size'],
+                pause=options['pause']
+            )
+            self.stdout.write(f'Deleted {deleted} expired OTPs')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
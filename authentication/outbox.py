@@ -0,0 +1,351 @@
+"""
+MongoDB-backed email outbox for PoojaPath API
+
+Views call ``enqueue_email`` (``aenqueue_email`` from async views) which
+persists the message in the ``email_outbox`` collection and returns
+immediately. An ``OutboxDispatcher`` (background threads in the web process
+and/or ``manage.py run_email_outbox``) claims pending messages in batches,
+sends them over one reused email backend connection per worker and retries
+failures with exponential backoff.
+
+Delivery outcomes and latency are exported as Prometheus metrics when
+METRICS_ENABLED is on (a dedicated ``run_email_outbox`` process needs the web
+server's PROMETHEUS_MULTIPROC_DIR to be scraped with it); ``queue_stats``
+derives queue depth and recent delivery latency from MongoDB, so any process
+can report them.
+"""
+
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from mongodb_handler import async_mongo_handler, mongo_handler
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = 'email_outbox'
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+def _outbox_message(subject, body, recipients, from_email=None):
+    now = datetime.utcnow()
+    return {
+        'subject': subject,
+        'body': body,
+        'from_email': from_email or settings.EMAIL_HOST_USER or 'noreply@poojapath.com',
+        'recipients': list(recipients),
+        'status': PENDING,
+        'attempts': 0,
+        'created_at': now,
+        'next_attempt_at': now,
+    }
+
+
+def _observe_delivery(outcome, latency=None):
+    if getattr(settings, 'METRICS_ENABLED', False):
+        from poojapath_api.metrics import EMAIL_OUTBOX_DELIVERIES, EMAIL_OUTBOX_DELIVERY_LATENCY
+        EMAIL_OUTBOX_DELIVERIES.labels(outcome).inc()
+        if latency is not None:
+            EMAIL_OUTBOX_DELIVERY_LATENCY.observe(latency)
+
+
+def _wake_dispatcher():
+    if getattr(settings, 'EMAIL_OUTBOX_WORKERS', 1) > 0:
+        outbox_dispatcher.start()
+        outbox_dispatcher.notify()
+
+
+def enqueue_email(subject, body, recipients, from_email=None):
+    """Persist an email for asynchronous delivery and return its outbox id"""
+    collection = mongo_handler.get_collection(OUTBOX_COLLECTION)
+    result = collection.insert_one(_outbox_message(subject, body, recipients, from_email))
+    _wake_dispatcher()
+    return result.inserted_id
+
+
+async def aenqueue_email(subject, body, recipients, from_email=None):
+    """Async enqueue_email for the async views"""
+    collection = async_mongo_handler.get_collection(OUTBOX_COLLECTION)
+    result = await collection.insert_one(_outbox_message(subject, body, recipients, from_email))
+    _wake_dispatcher()
+    return result.inserted_id
+
+
+class OutboxDispatcher:
+    """Worker pool that drains the email outbox"""
+    
+    def __init__(self, workers=1, batch_size=20, max_attempts=5, backoff_seconds=30,
+                 poll_seconds=5, lease_seconds=120):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'sent': 0,
+            'retried': 0,
+            'failed': 0,
+            'latency_count': 0,
+            'latency_total_seconds': 0.0,
+            'latency_max_seconds': 0.0,
+        }
+    
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            workers=getattr(settings, 'EMAIL_OUTBOX_WORKERS', 1),
+            batch_size=getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 20),
+            max_attempts=getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5),
+            backoff_seconds=getattr(settings, 'EMAIL_OUTBOX_BACKOFF_SECONDS', 30),
+            poll_seconds=getattr(settings, 'EMAIL_OUTBOX_POLL_SECONDS', 5),
+        )
+    
+    def start(self, workers=None):
+        """Start the worker threads once per process (restarted after a fork)"""
+        with self._lock:
+            if self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads):
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = []
+            for number in range(workers or self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f'email-outbox-{number}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+    
+    def stop(self, timeout=None):
+        """Ask the workers to finish their current batch and exit"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+    
+    def notify(self):
+        """Wake an idle worker because a message was enqueued"""
+        self._wakeup.set()
+    
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+    
+    def _run(self):
+        connection = None
+        while not self._stopping.is_set():
+            try:
+                connection, processed = self.process_batch(connection)
+            except Exception:
+                logger.exception("Email outbox worker failed; retrying after the poll interval")
+                connection = self._close(connection)
+                processed = 0
+            
+            if not processed:
+                # Idle: release the SMTP connection and wait for new work
+                connection = self._close(connection)
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+        self._close(connection)
+    
+    def drain(self):
+        """Send everything that is due in the calling thread; returns the number processed"""
+        connection = None
+        total = 0
+        try:
+            while True:
+                connection, processed = self.process_batch(connection)
+                if not processed:
+                    return total
+                total += processed
+        finally:
+            self._close(connection)
+    
+    def claim_batch(self):
+        """Mark up to batch_size due messages as being sent by this worker
+
+        Expired leases (messages whose worker died mid-send) come first, then
+        pending messages in next_attempt_at order; each branch is one
+        index-backed find. A single update_many claims them all under a new
+        claim_id, so a batch costs three round trips whatever its size. If
+        another worker claimed some of them in between, the ones this worker
+        won are read back by claim_id.
+        """
+        collection = mongo_handler.get_collection(OUTBOX_COLLECTION)
+        now = datetime.utcnow()
+        expired = {'status': SENDING, 'locked_until': {'$lt': now}}
+        due = {'status': PENDING, 'next_attempt_at': {'$lte': now}}
+        candidates = list(collection.find(expired, sort=[('locked_until', 1)], limit=self.batch_size))
+        if len(candidates) < self.batch_size:
+            candidates += collection.find(due, sort=[('next_attempt_at', 1)],
+                                          limit=self.batch_size - len(candidates))
+        if not candidates:
+            return []
+        
+        claim_id = uuid.uuid4().hex
+        locked_until = now + timedelta(seconds=self.lease_seconds)
+        ids = [message_data['_id'] for message_data in candidates]
+        result = collection.update_many(
+            {'_id': {'$in': ids}, '$or': [expired, due]},
+            {
+                '$set': {'status': SENDING, 'claim_id': claim_id, 'locked_until': locked_until},
+                '$inc': {'attempts': 1},
+            }
+        )
+        if result.modified_count != len(ids):
+            return list(collection.find({'_id': {'$in': ids}, 'claim_id': claim_id}))
+        for message_data in candidates:
+            message_data.update(status=SENDING, claim_id=claim_id, locked_until=locked_until,
+                                attempts=message_data['attempts'] + 1)
+        return candidates
+    
+    def renew_lease(self, batch):
+        """Extend the lease on messages of a claimed batch; returns the ids still held by this worker"""
+        collection = mongo_handler.get_collection(OUTBOX_COLLECTION)
+        ids = [message_data['_id'] for message_data in batch]
+        held = {'_id': {'$in': ids}, 'claim_id': batch[0]['claim_id'], 'status': SENDING}
+        result = collection.update_many(
+            held, {'$set': {'locked_until': datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+        )
+        if result.matched_count == len(ids):
+            return set(ids)
+        return {message_data['_id'] for message_data in collection.find(held, {'_id': 1})}
+    
+    def process_batch(self, connection=None):
+        """Claim and send one batch; returns (connection, number of messages processed)"""
+        batch = self.claim_batch()
+        if not batch:
+            return connection, 0
+        
+        held = {message_data['_id'] for message_data in batch}
+        lease_renewed = time.monotonic()
+        for position, message_data in enumerate(batch):
+            # Renew halfway through the lease so a slow batch is not reclaimed and sent twice
+            if time.monotonic() - lease_renewed >= self.lease_seconds / 2:
+                held = self.renew_lease(batch[position:])
+                lease_renewed = time.monotonic()
+            if message_data['_id'] not in held:
+                continue
+            try:
+                if connection is None:
+                    connection = get_connection(fail_silently=False)
+                    connection.open()
+                EmailMessage(
+                    message_data['subject'],
+                    message_data['body'],
+                    message_data['from_email'],
+                    message_data['recipients'],
+                    connection=connection,
+                ).send()
+            except Exception as e:
+                self._record_failure(message_data, e)
+                # The connection may be unusable after an SMTP error
+                connection = self._close(connection)
+            else:
+                self._record_sent(message_data)
+        return connection, len(batch)
+    
+    def _record_sent(self, message_data):
+        sent_at = datetime.utcnow()
+        collection = mongo_handler.get_collection(OUTBOX_COLLECTION)
+        collection.update_one(
+            {'_id': message_data['_id'], 'claim_id': message_data['claim_id']},
+            {'$set': {'status': SENT, 'sent_at': sent_at}, '$unset': {'locked_until': '', 'claim_id': ''}}
+        )
+        latency = (sent_at - message_data['created_at']).total_seconds()
+        with self._lock:
+            self._stats['sent'] += 1
+            self._stats['latency_count'] += 1
+            self._stats['latency_total_seconds'] += latency
+            self._stats['latency_max_seconds'] = max(self._stats['latency_max_seconds'], latency)
+        _observe_delivery(SENT, latency)
+    
+    def _record_failure(self, message_data, error):
+        collection = mongo_handler.get_collection(OUTBOX_COLLECTION)
+        attempts = message_data['attempts']
+        if attempts >= self.max_attempts:
+            update = {'status': FAILED, 'last_error': str(error)}
+            stat = 'failed'
+            logger.error(f"Giving up on outbox email {message_data['_id']} after {attempts} attempts: {error}")
+        else:
+            delay = self.backoff_seconds * 2 ** (attempts - 1)
+            update = {
+                'status': PENDING,
+                'last_error': str(error),
+                'next_attempt_at': datetime.utcnow() + timedelta(seconds=delay),
+            }
+            stat = 'retried'
+            logger.warning(f"Outbox email {message_data['_id']} failed, retrying in {delay}s: {error}")
+        collection.update_one(
+            {'_id': message_data['_id'], 'claim_id': message_data['claim_id']},
+            {'$set': update, '$unset': {'locked_until': '', 'claim_id': ''}}
+        )
+        with self._lock:
+            self._stats[stat] += 1
+        _observe_delivery(stat)
+    
+    @staticmethod
+    def _close(connection):
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                logger.warning("Error closing email connection", exc_info=True)
+        return None
+    
+    def stats(self):
+        """Queue depth (from MongoDB) and this process's delivery counters"""
+        collection = mongo_handler.get_collection(OUTBOX_COLLECTION)
+        with self._lock:
+            stats = dict(self._stats)
+        count = stats.pop('latency_count')
+        total = stats.pop('latency_total_seconds')
+        stats['latency_avg_seconds'] = total / count if count else None
+        stats['queue_depth'] = collection.count_documents({'status': {'$in': [PENDING, SENDING]}})
+        stats['failed_total'] = collection.count_documents({'status': FAILED})
+        return stats
+    
+    @staticmethod
+    def queue_stats(window_seconds=3600):
+        """Queue depth, failures and the delivery latency of the last window, all from MongoDB
+
+        Unlike ``stats`` this covers every process that sends mail, whichever
+        process asks.
+        """
+        collection = mongo_handler.get_collection(OUTBOX_COLLECTION)
+        latency_ms = {'$subtract': ['$sent_at', '$created_at']}
+        delivered = next(collection.aggregate([
+            {'$match': {'sent_at': {'$gte': datetime.utcnow() - timedelta(seconds=window_seconds)}}},
+            {'$group': {
+                '_id': None,
+                'sent': {'$sum': 1},
+                'latency_avg': {'$avg': latency_ms},
+                'latency_max': {'$max': latency_ms},
+            }},
+        ]), None)
+        return {
+            'queue_depth': collection.count_documents({'status': {'$in': [PENDING, SENDING]}}),
+            'failed_total': collection.count_documents({'status': FAILED}),
+            'window_seconds': window_seconds,
+            'sent': delivered['sent'] if delivered else 0,
+            'latency_avg_seconds': delivered['latency_avg'] / 1000 if delivered else None,
+            'latency_max_seconds': delivered['latency_max'] / 1000 if delivered else None,
+        }
+
+
+outbox_dispatcher = OutboxDispatcher.from_settings()
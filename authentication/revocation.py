@@ -0,0 +1,211 @@
+"""
+Refresh-token revocation for the MongoDB-backed API
+
+Revoked token ids (``jti``) are stored in the ``revoked_tokens`` collection
+with a TTL index on the token's own expiry, so entries disappear once the
+token could no longer be used anyway. Each process keeps a Bloom filter of
+revoked ids, refreshed incrementally every JWT_REVOCATION_REFRESH_SECONDS:
+a token that is not in the filter is definitely not revoked and costs no
+database round trip; a filter hit is confirmed with one indexed lookup.
+
+Revocations made by another process become visible here after at most one
+refresh interval.
+"""
+
+from datetime import datetime, timedelta
+import hashlib
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from mongodb_handler import async_mongo_handler, mongo_handler
+
+REVOCATION_COLLECTION = 'revoked_tokens'
+
+# Overlap between incremental refreshes, covering clock skew between processes
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+    
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray(self.size // 8 + 1)
+    
+    def _positions(self, item):
+        # Double hashing (Kirsch-Mitzenmacher) from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+    
+    def add(self, item):
+        """Add an item; returns False (and leaves count alone) if it was already present"""
+        new = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+    
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationStore:
+    """MongoDB store of revoked jtis with a per-process Bloom filter in front"""
+    
+    def __init__(self, capacity=100000, error_rate=0.001, refresh_seconds=5):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._bloom = None
+        self._synced_until = None
+        self._next_refresh = 0
+        # Held while a refresh queries MongoDB; _lock only guards the in-memory swap
+        self._refresh_lock = threading.Lock()
+        self._rebuild_revocations = None
+        self._lock = threading.Lock()
+        self._stats = {'checks': 0, 'bloom_negatives': 0, 'db_lookups': 0, 'false_positives': 0}
+    
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            capacity=getattr(settings, 'JWT_REVOCATION_BLOOM_CAPACITY', 100000),
+            error_rate=getattr(settings, 'JWT_REVOCATION_BLOOM_ERROR_RATE', 0.001),
+            refresh_seconds=getattr(settings, 'JWT_REVOCATION_REFRESH_SECONDS', 5),
+        )
+    
+    @property
+    def collection(self):
+        return mongo_handler.get_collection(REVOCATION_COLLECTION)
+    
+    @staticmethod
+    def _revocation_update(jti, expires_at):
+        return {'$setOnInsert': {'jti': jti, 'expires_at': expires_at, 'revoked_at': datetime.utcnow()}}
+    
+    def _remember(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            if self._rebuild_revocations is not None:
+                # A rebuild in progress may have read the collection before this revocation
+                self._rebuild_revocations.append(jti)
+    
+    def revoke(self, jti, expires_at):
+        """Revoke a token id until its expiry; returns False if it was already revoked"""
+        result = self.collection.update_one(
+            {'jti': jti}, self._revocation_update(jti, expires_at), upsert=True
+        )
+        self._remember(jti)
+        return result.upserted_id is not None
+    
+    async def arevoke(self, jti, expires_at):
+        """Async revoke for the async views"""
+        collection = async_mongo_handler.get_collection(REVOCATION_COLLECTION)
+        result = await collection.update_one(
+            {'jti': jti}, self._revocation_update(jti, expires_at), upsert=True
+        )
+        self._remember(jti)
+        return result.upserted_id is not None
+    
+    def _might_be_revoked(self, jti):
+        # Bloom check; False means definitely not revoked
+        with self._lock:
+            self._stats['checks'] += 1
+            if jti not in self._bloom:
+                self._stats['bloom_negatives'] += 1
+                return False
+            self._stats['db_lookups'] += 1
+            return True
+    
+    def _confirmed(self, revoked):
+        if not revoked:
+            with self._lock:
+                self._stats['false_positives'] += 1
+        return revoked
+    
+    def is_revoked(self, jti):
+        """Whether a token id has been revoked"""
+        self.refresh()
+        if not self._might_be_revoked(jti):
+            return False
+        return self._confirmed(self.collection.find_one({'jti': jti}, {'_id': 1}) is not None)
+    
+    async def ais_revoked(self, jti):
+        """Async is_revoked; the periodic filter refresh runs in a worker thread"""
+        if self._refresh_due():
+            await sync_to_async(self.refresh, thread_sensitive=False)()
+        if not self._might_be_revoked(jti):
+            return False
+        collection = async_mongo_handler.get_collection(REVOCATION_COLLECTION)
+        return self._confirmed(await collection.find_one({'jti': jti}, {'_id': 1}) is not None)
+    
+    def _refresh_due(self):
+        return self._bloom is None or time.monotonic() >= self._next_refresh
+    
+    def refresh(self, force=False):
+        """Load revocations made since the last refresh (everything on first use)
+
+        The MongoDB query runs without holding the lock that is_revoked uses;
+        only the update of the filter happens under it. While a refresh is in
+        flight other callers keep using the current filter instead of waiting
+        (except on first use, when there is no filter yet).
+        """
+        if not force and not self._refresh_due():
+            return
+        if not self._refresh_lock.acquire(blocking=force or self._bloom is None):
+            return
+        try:
+            if not force and not self._refresh_due():
+                return
+            now = datetime.utcnow()
+            with self._lock:
+                rebuild = self._bloom is None or self._bloom.count >= self.capacity
+                if rebuild:
+                    self._rebuild_revocations = []
+            if rebuild:
+                # Full (re)build; expired entries drop out because the TTL index removed them
+                bloom = BloomFilter(self.capacity, self.error_rate)
+                query = {'expires_at': {'$gt': now}}
+            else:
+                bloom = self._bloom
+                query = {'revoked_at': {'$gte': self._synced_until - REFRESH_OVERLAP}}
+            try:
+                jtis = [token_data['jti'] for token_data in self.collection.find(query, {'jti': 1, '_id': 0})]
+            except BaseException:
+                with self._lock:
+                    self._rebuild_revocations = None
+                raise
+            with self._lock:
+                if rebuild:
+                    jtis += self._rebuild_revocations
+                    self._rebuild_revocations = None
+                for jti in jtis:
+                    bloom.add(jti)
+                self._bloom = bloom
+                self._synced_until = now
+                self._next_refresh = time.monotonic() + self.refresh_seconds
+        finally:
+            self._refresh_lock.release()
+    
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                bloom_entries=self._bloom.count if self._bloom is not None else 0,
+                bloom_capacity=self.capacity,
+            )
+
+
+revocation_store = RevocationStore.from_settings()
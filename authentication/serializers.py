@@ -19,11 +19,9 @@ class UserSignupSerializer(serializers.Serializer):
         if data['password'] != data['reEnterPassword']:
             raise serializers.ValidationError("Passwords do not match")
         
-        # Check using appropriate model (MongoDB or Django ORM)
-        if getattr(settings, 'USE_MONGODB', False):
-            if User.get_by_email(data['email']):
-                raise serializers.ValidationError("User with this email already exists")
-        else:
+        # With MongoDB the unique users.email index rejects duplicates on insert
+        # (MongoUser.create_user), so no lookup is needed here
+        if not getattr(settings, 'USE_MONGODB', False):
             if User.objects.filter(email=data['email']).exists():
                 raise serializers.ValidationError("User with this email already exists")
         
@@ -70,11 +68,8 @@ class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        # Check using appropriate model (MongoDB or Django ORM)
-        if getattr(settings, 'USE_MONGODB', False):
-            if not User.get_by_email(value):
-                raise serializers.ValidationError("User with this email does not exist")
-        else:
+        # With MongoDB the view looks the user up itself (one round trip, not two)
+        if not getattr(settings, 'USE_MONGODB', False):
             if not User.objects.filter(email=value).exists():
                 raise serializers.ValidationError("User with this email does not exist")
         return value
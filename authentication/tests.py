@@ -1,3 +1,647 @@
-from django.test import TestCase
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from io import StringIO
+from smtplib import SMTPException
+import os
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.test import override_settings
+from prometheus_client import REGISTRY
+
+from mongodb_handler import mongo_handler
+from mongo_indexes import MONGO_INDEXES, ensure_indexes, missing_indexes, otp_indexes
+from mongo_models import MongoOTP, MongoUser
+from mongo_writers import BufferedWriter
+from mongo_testing import MongoTestCase
+from .hashing import password_hasher
+from .outbox import FAILED, PENDING, SENT, OutboxDispatcher, enqueue_email
+from .revocation import BloomFilter, RevocationStore, revocation_store
+
+
+def create_verified_user(email='ravi@example.com', password='TestPass123!'):
+    MongoUser.create_user('ravi', email, password)
+    MongoUser.mark_verified(email)
+
+
+class SignupTests(MongoTestCase):
+    def signup(self, email='ravi@example.com'):
+        return self.client.post('/api/user/signup/', {
+            'user_name': 'ravi',
+            'email': email,
+            'password': 'TestPass123!',
+            'reEnterPassword': 'TestPass123!',
+        }, content_type='application/json')
+
+    def test_signup_is_three_inserts(self):
+        with self.assertNumMongoCommands(3) as log:
+            response = self.signup()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(log), [
+            ('email_outbox', 'insert'),
+            ('otps', 'insert'),
+            ('users', 'insert'),
+        ])
+        self.assertFalse(MongoUser.get_by_email('ravi@example.com').is_verified)
+
+    def test_duplicate_email_is_rejected_by_the_unique_index(self):
+        self.signup()
+
+        with self.assertNumMongoCommands(1):
+            response = self.signup()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'User with this email already exists'})
+        self.assertEqual(MongoUser.objects.filter(email='ravi@example.com').count(), 1)
+
+    def test_invalid_signup_does_not_touch_mongo(self):
+        with self.assertNumMongoCommands(0):
+            response = self.client.post('/api/user/signup/', {
+                'user_name': 'ravi',
+                'email': 'ravi@example.com',
+                'password': 'TestPass123!',
+                'reEnterPassword': 'Different123!',
+            }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class EnsureIndexesCommandTests(MongoTestCase):
+    def test_creates_the_unique_email_index_on_an_existing_database(self):
+        users = mongo_handler.get_collection('users')
+        users.drop_indexes()
+        self.assertIn(('users', 'email_1'), missing_indexes(['users']))
+
+        call_command('ensure_mongo_indexes', stdout=StringIO())
+
+        self.assertEqual(missing_indexes(), [])
+        MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+        with self.assertRaises(ValueError):
+            MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+
+    @override_settings(USE_MONGODB=False)
+    def test_is_a_no_op_without_mongodb(self):
+        out = StringIO()
+        with self.assertNumMongoCommands(0):
+            call_command('ensure_mongo_indexes', stdout=out)
+
+        self.assertIn('USE_MONGODB is off', out.getvalue())
+
+
+class SeedCommandTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        # Seeded OTPs are older than the TTL, which would expire them between the runs
+        patcher = mock.patch.dict(MONGO_INDEXES, {'otps': otp_indexes(ttl_index=False)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        mongo_handler.get_collection('otps').drop()
+
+    def seed(self, *args):
+        out = StringIO()
+        call_command('seed_mongo', '--users', '20', '--otps', '10', '--sessions', '30', '--pandits', '20',
+                     *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_a_rerun_with_the_same_seed_inserts_nothing(self):
+        self.seed()
+        ids = sorted(mongo_handler.get_collection('login_sessions').distinct('_id'))
+
+        class AnHourLater(datetime):
+            @classmethod
+            def utcnow(cls):
+                return datetime.utcnow() + timedelta(hours=1)
+
+        with mock.patch('mongo_seed.datetime', AnHourLater):
+            out = self.seed()
+
+        for collection_name, count in [('users', 20), ('otps', 10), ('login_sessions', 30), ('pandits', 20)]:
+            self.assertIn(f'{collection_name}: 0 inserted, {count} already present', out)
+            self.assertEqual(mongo_handler.get_collection(collection_name).count_documents({}), count)
+        self.assertEqual(sorted(mongo_handler.get_collection('login_sessions').distinct('_id')), ids)
+
+    def test_drop_needs_an_explicit_connection_string(self):
+        environ = {name: value for name, value in os.environ.items() if name != 'MONGODB_CONNECTION_STRING'}
+        with mock.patch.dict(os.environ, environ, clear=True), \
+                mock.patch('authentication.management.commands.seed_mongo.mongo_handler') as handler:
+            handler.get_client.return_value = object()
+            with self.assertRaisesMessage(CommandError, 'set MONGODB_CONNECTION_STRING in the environment'):
+                self.seed('--drop')
+
+        handler.get_collection.assert_not_called()
+
+
+class OTPIndexTests(MongoTestCase):
+    def created_at_index(self):
+        return mongo_handler.get_collection('otps').index_information()['created_at_1']
+
+    def test_switching_the_ttl_setting_rebuilds_the_created_at_index(self):
+        with mock.patch.dict(MONGO_INDEXES, {'otps': otp_indexes(ttl_index=True)}):
+            ensure_indexes(['otps'])
+        self.assertIn('expireAfterSeconds', self.created_at_index())
+
+        with mock.patch.dict(MONGO_INDEXES, {'otps': otp_indexes(ttl_index=False)}):
+            self.assertEqual(missing_indexes(['otps']), [('otps', 'created_at_1')])
+            with self.assertLogs('mongo_indexes', level='WARNING'):
+                ensure_indexes(['otps'])
+            self.assertEqual(missing_indexes(['otps']), [])
+        self.assertNotIn('expireAfterSeconds', self.created_at_index())
+
+        with mock.patch.dict(MONGO_INDEXES, {'otps': otp_indexes(ttl_index=True)}), \
+                self.assertLogs('mongo_indexes', level='WARNING'):
+            ensure_indexes(['otps'])
+        self.assertIn('expireAfterSeconds', self.created_at_index())
+
+
+class VerifyOTPTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+        self.otp = MongoOTP.create_otp('ravi@example.com', 'signup')
+
+    def verify(self, otp):
+        return self.client.post('/api/user/verify-otp/', {
+            'email': 'ravi@example.com',
+            'otp': otp,
+        }, content_type='application/json')
+
+    def test_verify_otp_consumes_the_otp_and_marks_the_user_verified(self):
+        with self.assertNumMongoCommands(3) as log:
+            response = self.verify(self.otp.otp)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [('otps', 'find'), ('otps', 'delete'), ('users', 'update')])
+        self.assertTrue(MongoUser.get_by_email('ravi@example.com').is_verified)
+
+    def test_wrong_otp_costs_one_extra_lookup_for_the_error(self):
+        wrong_otp = '000000' if self.otp.otp != '000000' else '111111'
+
+        with self.assertNumMongoCommands(2):
+            response = self.verify(wrong_otp)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid OTP'})
+
+    def test_a_new_otp_invalidates_the_earlier_ones(self):
+        mongo_handler.get_collection('otps').update_one({'_id': self.otp.data['_id']}, {'$set': {
+            'created_at': datetime.utcnow() - timedelta(seconds=60),
+        }})
+        newer = MongoOTP.create_otp('ravi@example.com', 'signup')
+        while newer.otp == self.otp.otp:
+            newer = MongoOTP.create_otp('ravi@example.com', 'signup')
+
+        response = self.verify(self.otp.otp)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid OTP'})
+
+        response = self.verify(newer.otp)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(MongoUser.get_by_email('ravi@example.com').is_verified)
+
+
+class LoginTests(MongoTestCase):
+    def login(self, password='TestPass123!'):
+        return self.client.post('/api/user/login/', {
+            'email': 'ravi@example.com',
+            'password': password,
+            'deviceType': 'mobile',
+        }, content_type='application/json')
+
+    def test_login_is_one_lookup(self):
+        create_verified_user()
+
+        # The login session is written by the buffered session writer, off the request path
+        with self.assertNumMongoCommands(1) as log:
+            response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [('users', 'find')])
+        self.assertIn('access', response.json()['tokens'])
+
+    def test_wrong_password(self):
+        create_verified_user()
+
+        with self.assertNumMongoCommands(1):
+            response = self.login(password='Wrong123!')
+
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(
+        PASSWORD_HASHERS=[
+            'authentication.hashing.ConfigurablePBKDF2PasswordHasher',
+            'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        ],
+        PASSWORD_PBKDF2_ITERATIONS=1000,
+    )
+    def test_login_rehashes_an_outdated_hash(self):
+        create_verified_user()
+        mongo_handler.get_collection('users').update_one({'email': 'ravi@example.com'}, {'$set': {
+            'password': make_password('TestPass123!', hasher='pbkdf2_sha1'),
+        }})
+
+        with self.assertNumMongoCommands(2) as log:
+            response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [('users', 'find'), ('users', 'update')])
+        stored = MongoUser.get_by_email('ravi@example.com').password
+        self.assertTrue(stored.startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_saturated_hashing_pool_returns_503(self):
+        create_verified_user()
+        # A finished hash releases its slot just after its result is returned, so wait a little
+        held = 0
+        while password_hasher._slots.acquire(timeout=0.05):
+            held += 1
+        try:
+            with mock.patch.object(password_hasher, 'timeout', 0):
+                response = self.login()
+        finally:
+            for _ in range(held):
+                password_hasher._slots.release()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response.json(), {'error': 'Password hashing is saturated, try again shortly'})
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_unverified_user_cannot_log_in(self):
+        MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+
+        with self.assertNumMongoCommands(1):
+            response = self.login()
+
+        self.assertEqual(response.status_code, 400)
+
+
+class PasswordResetTests(MongoTestCase):
+    def test_forgot_password_is_one_lookup_and_two_inserts(self):
+        create_verified_user()
+
+        with self.assertNumMongoCommands(3) as log:
+            response = self.client.post('/api/user/forgot-password/', {
+                'email': 'ravi@example.com',
+            }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [
+            ('users', 'find'),
+            ('otps', 'insert'),
+            ('email_outbox', 'insert'),
+        ])
+
+    def test_forgot_password_for_unknown_email(self):
+        with self.assertNumMongoCommands(1):
+            response = self.client.post('/api/user/forgot-password/', {
+                'email': 'nobody@example.com',
+            }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'email': ['User with this email does not exist']})
+
+    def test_reset_password_consumes_the_otp_and_updates_the_password(self):
+        create_verified_user()
+        otp = MongoOTP.create_otp('ravi@example.com', 'forgot_password')
+
+        with self.assertNumMongoCommands(3) as log:
+            response = self.client.post('/api/user/reset-password/', {
+                'email': 'ravi@example.com',
+                'otp': otp.otp,
+                'new_password': 'NewPass123!',
+                'confirm_password': 'NewPass123!',
+            }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [('otps', 'find'), ('otps', 'delete'), ('users', 'update')])
+        self.assertIsNotNone(MongoUser.authenticate('ravi@example.com', 'NewPass123!'))
+
+
+class TokenTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        create_verified_user()
+        response = self.client.post('/api/user/login/', {
+            'email': 'ravi@example.com',
+            'password': 'TestPass123!',
+        }, content_type='application/json')
+        self.refresh = response.json()['tokens']['refresh']
+        # Load the revocation Bloom filter now so its periodic refresh is not counted
+        revocation_store.refresh(force=True)
+
+    def post(self, path, refresh):
+        return self.client.post(path, {'refresh': refresh}, content_type='application/json')
+
+    def test_refresh_rotates_with_one_upsert(self):
+        with self.assertNumMongoCommands(1) as log:
+            response = self.post('/api/user/token/refresh/', self.refresh)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [('revoked_tokens', 'update')])
+
+    def test_reusing_a_rotated_refresh_token_is_one_lookup(self):
+        self.post('/api/user/token/refresh/', self.refresh)
+
+        with self.assertNumMongoCommands(1) as log:
+            response = self.post('/api/user/token/refresh/', self.refresh)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(log, [('revoked_tokens', 'find')])
+
+    def test_logout_is_one_upsert(self):
+        with self.assertNumMongoCommands(1):
+            response = self.post('/api/user/logout/', self.refresh)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post('/api/user/token/refresh/', self.refresh).status_code, 401)
+
+    def test_missing_refresh_token_is_rejected(self):
+        for path in ('/api/user/token/refresh/', '/api/user/logout/'):
+            for data in ({}, {'refresh': ''}, {'refresh': 123}, [self.refresh]):
+                with self.subTest(path=path, data=data), self.assertNumMongoCommands(0):
+                    response = self.client.post(path, data, content_type='application/json')
+
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {'error': 'Refresh token is required'})
+
+
+class OutboxTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.outbox = mongo_handler.get_collection('email_outbox')
+        self.dispatcher = OutboxDispatcher(workers=0, batch_size=10, max_attempts=3, backoff_seconds=30)
+
+    def enqueue(self, count=1):
+        return [enqueue_email('Your OTP', 'Code: 123456', [f'user{number}@example.com'])
+                for number in range(count)]
+
+    @contextmanager
+    def failing_send(self):
+        with mock.patch('authentication.outbox.EmailMessage.send', side_effect=SMTPException('boom')), \
+                self.assertLogs('authentication.outbox', level='WARNING') as logs:
+            yield logs
+
+    def make_due(self, message_id):
+        self.outbox.update_one({'_id': message_id}, {'$set': {'next_attempt_at': datetime.utcnow()}})
+
+    def test_a_batch_is_claimed_in_three_round_trips(self):
+        self.enqueue(5)
+
+        with self.assertNumMongoCommands(3) as log:
+            batch = self.dispatcher.claim_batch()
+
+        self.assertEqual(log, [
+            ('email_outbox', 'find'), ('email_outbox', 'find'), ('email_outbox', 'update'),
+        ])
+        self.assertEqual(len(batch), 5)
+        self.assertEqual({message['attempts'] for message in batch}, {1})
+        self.assertEqual(len({message['claim_id'] for message in batch}), 1)
+        self.assertEqual(self.dispatcher.claim_batch(), [])
+
+    def test_sends_due_messages(self):
+        message_id, = self.enqueue()
+
+        self.assertEqual(self.dispatcher.drain(), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        message = self.outbox.find_one({'_id': message_id})
+        self.assertEqual(message['status'], SENT)
+        self.assertNotIn('locked_until', message)
+
+    def test_failed_send_is_retried_with_exponential_backoff(self):
+        message_id, = self.enqueue()
+
+        delays = []
+        with self.failing_send():
+            for _ in range(2):
+                started = datetime.utcnow()
+                self.dispatcher.drain()
+                message = self.outbox.find_one({'_id': message_id})
+                delays.append(round((message['next_attempt_at'] - started).total_seconds()))
+                self.make_due(message_id)
+
+        self.assertEqual(message['status'], PENDING)
+        self.assertEqual(message['attempts'], 2)
+        self.assertEqual(message['last_error'], 'boom')
+        self.assertEqual(delays, [30, 60])
+        self.assertEqual(self.dispatcher.stats()['retried'], 2)
+
+        self.dispatcher.drain()
+        self.assertEqual(self.outbox.find_one({'_id': message_id})['status'], SENT)
+
+    def test_gives_up_after_max_attempts(self):
+        message_id, = self.enqueue()
+
+        with self.failing_send() as logs:
+            for _ in range(3):
+                self.dispatcher.drain()
+                self.make_due(message_id)
+
+        self.assertIn('Giving up', logs.output[-1])
+        message = self.outbox.find_one({'_id': message_id})
+        self.assertEqual(message['status'], FAILED)
+        self.assertEqual(message['attempts'], 3)
+        self.assertEqual(self.dispatcher.drain(), 0)
+        self.assertEqual(self.dispatcher.stats()['failed'], 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        message_id, = self.enqueue()
+        stalled, = self.dispatcher.claim_batch()
+        self.outbox.update_one({'_id': message_id}, {'$set': {'locked_until': datetime.utcnow() - timedelta(seconds=1)}})
+
+        reclaimed, = OutboxDispatcher(workers=0).claim_batch()
+
+        self.assertEqual(reclaimed['attempts'], 2)
+        self.assertNotEqual(reclaimed['claim_id'], stalled['claim_id'])
+        # The stalled worker no longer holds the message, so it cannot send it or record a result
+        self.assertEqual(self.dispatcher.renew_lease([stalled]), set())
+        self.dispatcher._record_sent(stalled)
+        self.assertEqual(self.outbox.find_one({'_id': message_id})['claim_id'], reclaimed['claim_id'])
+
+    def test_slow_batch_renews_its_lease(self):
+        self.enqueue(3)
+        dispatcher = OutboxDispatcher(workers=0, lease_seconds=0)
+
+        with mock.patch.object(dispatcher, 'renew_lease', wraps=dispatcher.renew_lease) as renew_lease:
+            self.assertEqual(dispatcher.drain(), 3)
+
+        self.assertEqual([len(call.args[0]) for call in renew_lease.call_args_list], [3, 2, 1])
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_queue_stats_come_from_mongodb(self):
+        sent_id, pending_id = self.enqueue(2)
+        self.outbox.update_one({'_id': sent_id}, {'$set': {
+            'status': SENT, 'created_at': datetime.utcnow() - timedelta(seconds=30), 'sent_at': datetime.utcnow(),
+        }})
+
+        # A fresh dispatcher, as in `run_email_outbox --stats`, has sent nothing itself
+        stats = OutboxDispatcher(workers=0).queue_stats()
+
+        self.assertEqual((stats['queue_depth'], stats['failed_total'], stats['sent']), (1, 0, 1))
+        self.assertAlmostEqual(stats['latency_avg_seconds'], 30, delta=1)
+        self.assertEqual(stats['latency_avg_seconds'], stats['latency_max_seconds'])
+
+        out = StringIO()
+        call_command('run_email_outbox', '--stats', stdout=out)
+        self.assertIn('"queue_depth": 1', out.getvalue())
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_deliveries_are_exported_as_metrics(self):
+        def sample(name, labels=None):
+            return REGISTRY.get_sample_value(f'poojapath_email_outbox_{name}', labels or {}) or 0
+
+        before = (sample('deliveries_total', {'outcome': SENT}), sample('deliveries_total', {'outcome': 'retried'}),
+                  sample('delivery_latency_seconds_count'))
+        message_id, = self.enqueue()
+        with self.failing_send():
+            self.dispatcher.drain()
+        self.make_due(message_id)
+        self.dispatcher.drain()
+
+        after = (sample('deliveries_total', {'outcome': SENT}), sample('deliveries_total', {'outcome': 'retried'}),
+                 sample('delivery_latency_seconds_count'))
+        self.assertEqual([new - old for new, old in zip(after, before)], [1, 1, 1])
+
+
+class BufferedWriterTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.audit = mongo_handler.get_collection('audit')
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.audit.count_documents({}) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.audit.count_documents({})
+
+    def test_full_queue_drops_and_counts(self):
+        writer = BufferedWriter('audit', max_batch=100, flush_interval=60, max_queue=2)
+
+        self.assertEqual([writer.write({'number': number}) for number in range(3)], [True, True, False])
+
+        self.assertEqual((writer.stats()['dropped'], writer.stats()['overflow']), (1, 1))
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(writer.stats()['written'], 2)
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_counts_and_queue_length_are_exported_as_metrics(self):
+        def sample(name, outcome=None):
+            labels = {'collection': 'audit', **({'outcome': outcome} if outcome else {})}
+            return REGISTRY.get_sample_value(f'poojapath_buffered_writer_{name}', labels) or 0
+
+        before = [sample('documents_total', outcome) for outcome in ('enqueued', 'overflow', 'written')]
+        writer = BufferedWriter('audit', max_batch=100, flush_interval=60, max_queue=2)
+        for number in range(3):
+            writer.write({'number': number})
+        self.assertEqual(sample('queue_length'), 2)
+
+        writer.flush()
+
+        after = [sample('documents_total', outcome) for outcome in ('enqueued', 'overflow', 'written')]
+        self.assertEqual([new - old for new, old in zip(after, before)], [2, 1, 2])
+        self.assertEqual(sample('queue_length'), 0)
+
+    def test_flushes_when_a_batch_is_full(self):
+        writer = BufferedWriter('audit', max_batch=3, flush_interval=60)
+
+        for number in range(3):
+            writer.write({'number': number})
+
+        self.assertEqual(self.wait_for(3), 3)
+
+    def test_flushes_on_the_interval(self):
+        writer = BufferedWriter('audit', max_batch=100, flush_interval=0.05)
+
+        writer.write({'number': 1})
+
+        self.assertEqual(self.wait_for(1), 1)
+
+    def test_partial_bulk_write_error_drops_only_the_failed_documents(self):
+        self.audit.create_index('number', unique=True)
+        self.audit.insert_one({'number': 1})
+        writer = BufferedWriter('audit', max_batch=100, flush_interval=60)
+        for number in range(3):
+            writer.write({'number': number})
+
+        with self.assertLogs('mongo_writers', level='ERROR'):
+            self.assertEqual(writer.flush(), 2)
+
+        stats = writer.stats()
+        self.assertEqual((stats['written'], stats['dropped'], stats['flush_errors']), (2, 1, 1))
+        self.assertEqual(self.audit.count_documents({}), 3)
+
+
+class RevocationStoreTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = RevocationStore(capacity=1000)
+        self.expires_at = datetime.utcnow() + timedelta(days=1)
+
+    def spy_on_find(self, side_effect):
+        collection = mock.Mock(wraps=self.store.collection)
+        real_find = collection.find
+
+        def find(*args, **kwargs):
+            documents = list(real_find(*args, **kwargs))
+            side_effect()
+            return documents
+        collection.find = find
+        return mock.patch.object(RevocationStore, 'collection', new_callable=mock.PropertyMock,
+                                 return_value=collection)
+
+    def test_bloom_filter_counts_each_item_once(self):
+        bloom = BloomFilter(1000)
+
+        self.assertTrue(bloom.add('a'))
+        self.assertFalse(bloom.add('a'))
+        self.assertTrue(bloom.add('b'))
+
+        self.assertEqual(bloom.count, 2)
+        self.assertIn('a', bloom)
+
+    def test_overlapping_refreshes_do_not_inflate_the_filter(self):
+        self.store.revoke('jti-1', self.expires_at)
+        self.store.refresh(force=True)
+        self.store.refresh(force=True)
+        self.store.refresh(force=True)
+
+        self.assertEqual(self.store.stats()['bloom_entries'], 1)
+        self.assertTrue(self.store.is_revoked('jti-1'))
+        self.assertFalse(self.store.is_revoked('jti-2'))
+
+    def test_query_runs_without_holding_the_check_lock(self):
+        self.store.refresh(force=True)
+        lock_held = []
+
+        with self.spy_on_find(lambda: lock_held.append(self.store._lock.locked())):
+            self.store.refresh(force=True)
+
+        self.assertEqual(lock_held, [False])
+
+    def test_checks_do_not_wait_for_a_refresh_in_flight(self):
+        self.store.refresh(force=True)
+        self.store._next_refresh = 0
+        results = []
+
+        # Another thread checking while this refresh is reading MongoDB uses the current filter
+        def check():
+            thread = threading.Thread(target=lambda: results.append(self.store.is_revoked('jti-1')))
+            thread.start()
+            thread.join(5)
+        with self.spy_on_find(check):
+            self.store.refresh()
+
+        self.assertEqual(results, [False])
+
+    def test_revocation_during_a_rebuild_is_kept(self):
+        # Revoked after the rebuild read the collection, before the new filter is swapped in
+        with self.spy_on_find(lambda: self.store.revoke('jti-1', self.expires_at)):
+            self.store.refresh(force=True)
+
+        self.assertIn('jti-1', self.store._bloom)
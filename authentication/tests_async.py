@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta
+
+from django.test import override_settings
+from django.urls import include, path
+
+from mongodb_handler import mongo_handler
+from mongo_models import MongoOTP, MongoUser
+from mongo_testing import MongoTestCase
+from . import urls, views_async
+from .tests import create_verified_user
+
+# The async views, as authentication.urls serves them with USE_ASYNC_VIEWS=True
+urlpatterns = [
+    path('api/user/', include(urls.view_urlpatterns(views_async))),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, USE_ASYNC_VIEWS=True)
+class AsyncAuthenticationViewTests(MongoTestCase):
+    async def post(self, path, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        return await self.async_client.post(path, data, **kwargs)
+
+    async def signup(self, email='ravi@example.com'):
+        return await self.post('/api/user/signup/', {
+            'user_name': 'ravi',
+            'email': email,
+            'password': 'TestPass123!',
+            'reEnterPassword': 'TestPass123!',
+        })
+
+    async def login(self, password='TestPass123!'):
+        return await self.post('/api/user/login/', {
+            'email': 'ravi@example.com',
+            'password': password,
+            'deviceType': 'mobile',
+        })
+
+    async def test_signup(self):
+        response = await self.signup()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['message'], 'User created successfully. Please verify your email.')
+        user = MongoUser.get_by_email('ravi@example.com')
+        self.assertEqual(response.json()['user_id'], user.id)
+        self.assertFalse(user.is_verified)
+        self.assertEqual(mongo_handler.get_collection('email_outbox').count_documents({}), 1)
+
+    async def test_duplicate_signup(self):
+        await self.signup()
+
+        response = await self.signup()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'User with this email already exists'})
+
+    async def test_invalid_signup(self):
+        response = await self.post('/api/user/signup/', {
+            'user_name': 'ravi',
+            'email': 'ravi@example.com',
+            'password': 'TestPass123!',
+            'reEnterPassword': 'Different123!',
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': ['Passwords do not match']})
+
+    async def test_verify_otp(self):
+        MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+        otp = MongoOTP.create_otp('ravi@example.com', 'signup').otp
+        wrong_otp = '000000' if otp != '000000' else '111111'
+
+        response = await self.post('/api/user/verify-otp/', {'email': 'ravi@example.com', 'otp': wrong_otp})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid OTP'})
+
+        response = await self.post('/api/user/verify-otp/', {'email': 'ravi@example.com', 'otp': otp})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'Email verified successfully'})
+        self.assertTrue(MongoUser.get_by_email('ravi@example.com').is_verified)
+
+    async def test_only_the_latest_otp_is_accepted(self):
+        MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+        older = MongoOTP.create_otp('ravi@example.com', 'signup')
+        mongo_handler.get_collection('otps').update_one({'_id': older.data['_id']}, {'$set': {
+            'created_at': datetime.utcnow() - timedelta(seconds=60),
+        }})
+        older = older.otp
+        newer = MongoOTP.create_otp('ravi@example.com', 'signup').otp
+        while newer == older:
+            newer = MongoOTP.create_otp('ravi@example.com', 'signup').otp
+
+        response = await self.post('/api/user/verify-otp/', {'email': 'ravi@example.com', 'otp': older})
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.post('/api/user/verify-otp/', {'email': 'ravi@example.com', 'otp': newer})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_login(self):
+        create_verified_user()
+
+        # The motor commands are counted too
+        with self.assertNumMongoCommands(1) as log:
+            response = await self.login()
+
+        self.assertEqual(log, [('users', 'find')])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['message'], 'Login successful')
+        self.assertEqual(body['user']['email'], 'ravi@example.com')
+        self.assertEqual(set(body['tokens']), {'access', 'refresh'})
+
+    async def test_login_failures(self):
+        response = await self.post('/api/user/login/', {'email': 'ravi@example.com'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Email and password are required'})
+
+        MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+        response = await self.login()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Please verify your email before logging in'})
+
+        MongoUser.mark_verified('ravi@example.com')
+        response = await self.login(password='Wrong123!')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Invalid credentials'})
+
+    async def test_forgot_and_reset_password(self):
+        response = await self.post('/api/user/forgot-password/', {'email': 'ravi@example.com'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'email': ['User with this email does not exist']})
+
+        create_verified_user()
+        response = await self.post('/api/user/forgot-password/', {'email': 'ravi@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'OTP sent to email for password reset'})
+
+        otp = MongoOTP.objects.get(email='ravi@example.com', purpose='forgot_password').otp
+        response = await self.post('/api/user/reset-password/', {
+            'email': 'ravi@example.com',
+            'otp': otp,
+            'new_password': 'NewPass123!',
+            'confirm_password': 'NewPass123!',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'Password reset successfully'})
+        self.assertIsNotNone(MongoUser.authenticate('ravi@example.com', 'NewPass123!'))
+
+    async def test_token_refresh_and_logout(self):
+        create_verified_user()
+        refresh = (await self.login()).json()['tokens']['refresh']
+
+        response = await self.post('/api/user/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()['tokens']['refresh']
+        self.assertNotEqual(rotated, refresh)
+
+        response = await self.post('/api/user/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Token has been revoked'})
+
+        response = await self.post('/api/user/logout/', {'refresh': rotated})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'Logged out successfully'})
+        self.assertEqual((await self.post('/api/user/token/refresh/', {'refresh': rotated})).status_code, 401)
+
+    async def test_invalid_refresh_token(self):
+        for path in ('/api/user/token/refresh/', '/api/user/logout/'):
+            response = await self.post(path, {'refresh': 'not-a-token'})
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json(), {'error': 'Token is invalid or expired'})
+
+    async def test_missing_refresh_token(self):
+        for path in ('/api/user/token/refresh/', '/api/user/logout/'):
+            for data in ({}, {'refresh': ''}, {'refresh': None}):
+                response = await self.post(path, data)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Refresh token is required'})
+        self.assertEqual(mongo_handler.get_collection('revoked_tokens').count_documents({}), 0)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.get('/api/user/login/')
+
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response.json(), {'detail': 'Method "GET" not allowed.'})
+
+    async def test_malformed_json(self):
+        response = await self.post('/api/user/login/', 'not json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['detail'].startswith('JSON parse error - '))
+
+    async def test_form_encoded_body(self):
+        create_verified_user()
+
+        response = await self.post('/api/user/login/', 'email=ravi%40example.com&password=TestPass123%21',
+                                   content_type='application/x-www-form-urlencoded')
+
+        self.assertEqual(response.status_code, 200)
+
+    async def test_unsupported_media_type(self):
+        response = await self.post('/api/user/login/', 'ravi@example.com', content_type='text/plain')
+
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(response.json(), {'detail': 'Unsupported media type "text/plain" in request.'})
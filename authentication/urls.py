@@ -1,10 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views_mongo as views
-
-urlpatterns = [
-    path('signup/', views.signup, name='signup'),
-    path('verify-otp/', views.verify_otp, name='verify_otp'),
-    path('login/', views.login, name='login'),
-    path('forgot-password/', views.forgot_password, name='forgot_password'),
-    path('reset-password/', views.reset_password, name='reset_password'),
-]
+
+# Async (motor) views for ASGI deployments, sync DRF views otherwise
+if getattr(settings, 'USE_ASYNC_VIEWS', False):
+    from . import views_async as views
+else:
+    from . import views_mongo as views
+
+
+def view_urlpatterns(views):
+    """The routes of this app, served by views_mongo or views_async"""
+    return [
+        path('signup/', views.signup, name='signup'),
+        path('verify-otp/', views.verify_otp, name='verify_otp'),
+        path('login/', views.login, name='login'),
+        path('forgot-password/', views.forgot_password, name='forgot_password'),
+        path('reset-password/', views.reset_password, name='reset_password'),
+        path('token/refresh/', views.token_refresh, name='token_refresh'),
+        path('logout/', views.logout, name='logout'),
+    ]
+
+
+urlpatterns = view_urlpatterns(views)
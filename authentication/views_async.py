@@ -0,0 +1,290 @@
+"""
+Async versions of the MongoDB authentication views
+
+Served instead of ``views_mongo`` when USE_ASYNC_VIEWS is enabled and the
+project runs under ASGI (uvicorn). Every Mongo round trip goes through motor
+and password hashing is awaited on the hashing pool, so one worker keeps
+many requests in flight. Status codes and response bodies match
+``views_mongo``: ``JsonApiResponse`` renders them with DRF's JSONRenderer.
+DRF's content negotiation headers (Allow, Vary) are not sent.
+"""
+
+from datetime import datetime
+
+from rest_framework import status
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from mongo_models_async import AsyncMongoUser, AsyncMongoOTP, AsyncMongoLoginSession
+from .decorators import JsonApiResponse, async_api_view
+from .hashing import HashingBusy
+from .outbox import aenqueue_email
+from .revocation import revocation_store
+from .serializers import (
+    UserSignupSerializer,
+    OTPVerificationSerializer,
+    ForgotPasswordSerializer,
+    ResetPasswordSerializer
+)
+from .views_mongo import generate_jwt_tokens, get_refresh_token
+
+
+def busy_response(error):
+    """503 asking the client to retry when password hashing is saturated"""
+    response = JsonApiResponse({
+        'error': str(error)
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
+async def otp_error_response(email, purpose, otp_code):
+    """400 for an OTP that could not be consumed, telling expired codes apart"""
+    latest = await AsyncMongoOTP.aget_latest_unused(email, purpose)
+    if latest is not None and latest.otp == otp_code:
+        error = 'OTP has expired'
+    else:
+        error = 'Invalid OTP'
+    return JsonApiResponse({
+        'error': error
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['POST'])
+async def signup(request):
+    """User signup endpoint using MongoDB (async)"""
+    serializer = UserSignupSerializer(data=request.data)
+    if serializer.is_valid():
+        try:
+            user = await AsyncMongoUser.acreate_user(
+                username=serializer.validated_data['user_name'],
+                email=serializer.validated_data['email'],
+                password=serializer.validated_data['password']
+            )
+            
+            otp_obj = await AsyncMongoOTP.acreate_otp(
+                email=user.email,
+                purpose='signup'
+            )
+            
+            # Queue the OTP email; the outbox workers deliver it
+            await aenqueue_email(
+                'Verify Your Email - PoojaPath',
+                f'Your OTP for email verification is: {otp_obj.otp}',
+                [user.email]
+            )
+            
+            return JsonApiResponse({
+                'message': 'User created successfully. Please verify your email.',
+                'user_id': user.id
+            }, status=status.HTTP_201_CREATED)
+        
+        except ValueError as e:
+            return JsonApiResponse({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except HashingBusy as e:
+            return busy_response(e)
+    
+    return JsonApiResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['POST'])
+async def verify_otp(request):
+    """OTP verification endpoint using MongoDB (async)"""
+    serializer = OTPVerificationSerializer(data=request.data)
+    if serializer.is_valid():
+        email = serializer.validated_data['email']
+        otp_code = serializer.validated_data['otp']
+        
+        if not await AsyncMongoOTP.aconsume(email, 'signup', otp_code):
+            return await otp_error_response(email, 'signup', otp_code)
+        
+        if await AsyncMongoUser.amark_verified(email):
+            return JsonApiResponse({
+                'message': 'Email verified successfully'
+            }, status=status.HTTP_200_OK)
+        else:
+            return JsonApiResponse({
+                'error': 'User not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+    
+    return JsonApiResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['POST'])
+async def login(request):
+    """User login endpoint using MongoDB (async)"""
+    email = request.data.get('email')
+    password = request.data.get('password')
+    device_type = request.data.get('deviceType', 'web')
+    
+    if not email or not password:
+        return JsonApiResponse({
+            'error': 'Email and password are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        user = await AsyncMongoUser.aauthenticate(email, password)
+    except HashingBusy as e:
+        return busy_response(e)
+    
+    if user and user.is_verified:
+        await AsyncMongoLoginSession.acreate_session(
+            user_id=user.id,
+            device_type=device_type
+        )
+        
+        return JsonApiResponse({
+            'message': 'Login successful',
+            'user': {
+                'id': user.id,
+                'username': user.username,
+                'email': user.email
+            },
+            'tokens': generate_jwt_tokens(user)
+        }, status=status.HTTP_200_OK)
+    
+    elif user and not user.is_verified:
+        return JsonApiResponse({
+            'error': 'Please verify your email before logging in'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    else:
+        return JsonApiResponse({
+            'error': 'Invalid credentials'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+
+@async_api_view(['POST'])
+async def forgot_password(request):
+    """Forgot password endpoint using MongoDB (async)"""
+    serializer = ForgotPasswordSerializer(data=request.data)
+    if serializer.is_valid():
+        email = serializer.validated_data['email']
+        
+        if not await AsyncMongoUser.aget_by_email(email):
+            return JsonApiResponse({
+                'email': ['User with this email does not exist']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        otp_obj = await AsyncMongoOTP.acreate_otp(
+            email=email,
+            purpose='forgot_password'
+        )
+        
+        # Queue the OTP email; the outbox workers deliver it
+        await aenqueue_email(
+            'Reset Your Password - PoojaPath',
+            f'Your OTP for password reset is: {otp_obj.otp}',
+            [email]
+        )
+        
+        return JsonApiResponse({
+            'message': 'OTP sent to email for password reset'
+        }, status=status.HTTP_200_OK)
+    
+    return JsonApiResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['POST'])
+async def reset_password(request):
+    """Reset password endpoint using MongoDB (async)"""
+    serializer = ResetPasswordSerializer(data=request.data)
+    if serializer.is_valid():
+        email = serializer.validated_data['email']
+        otp_code = serializer.validated_data['otp']
+        new_password = serializer.validated_data['new_password']
+        
+        if not await AsyncMongoOTP.aconsume(email, 'forgot_password', otp_code):
+            return await otp_error_response(email, 'forgot_password', otp_code)
+        
+        try:
+            updated = await AsyncMongoUser.aset_password_by_email(email, new_password)
+        except HashingBusy as e:
+            return busy_response(e)
+        
+        if updated:
+            return JsonApiResponse({
+                'message': 'Password reset successfully'
+            }, status=status.HTTP_200_OK)
+        else:
+            return JsonApiResponse({
+                'error': 'User not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+    
+    return JsonApiResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+async def revoke_refresh_token(refresh):
+    """Revoke a refresh token until it expires; returns False if it was already revoked"""
+    return await revocation_store.arevoke(
+        refresh[api_settings.JTI_CLAIM],
+        expires_at=datetime.utcfromtimestamp(refresh['exp'])
+    )
+
+
+@async_api_view(['POST'])
+async def token_refresh(request):
+    """Issue a new access token (and rotated refresh token) for a valid refresh token (async)"""
+    token = get_refresh_token(request.data)
+    if token is None:
+        return JsonApiResponse({
+            'error': 'Refresh token is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        refresh = RefreshToken(token)
+    except TokenError as e:
+        return JsonApiResponse({
+            'error': str(e)
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    if await revocation_store.ais_revoked(refresh[api_settings.JTI_CLAIM]):
+        return JsonApiResponse({
+            'error': 'Token has been revoked'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    tokens = {
+        'access': str(refresh.access_token)
+    }
+    
+    if api_settings.ROTATE_REFRESH_TOKENS:
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            # Only one of several concurrent refreshes with the same token may rotate it
+            if not await revoke_refresh_token(refresh):
+                return JsonApiResponse({
+                    'error': 'Token has been revoked'
+                }, status=status.HTTP_401_UNAUTHORIZED)
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        tokens['refresh'] = str(refresh)
+    
+    return JsonApiResponse({
+        'message': 'Token refreshed successfully',
+        'tokens': tokens
+    }, status=status.HTTP_200_OK)
+
+
+@async_api_view(['POST'])
+async def logout(request):
+    """Revoke the given refresh token (async)"""
+    token = get_refresh_token(request.data)
+    if token is None:
+        return JsonApiResponse({
+            'error': 'Refresh token is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        refresh = RefreshToken(token)
+    except TokenError as e:
+        return JsonApiResponse({
+            'error': str(e)
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    await revoke_refresh_token(refresh)
+    
+    return JsonApiResponse({
+        'message': 'Logged out successfully'
+    }, status=status.HTTP_200_OK)
@@ -1,13 +1,17 @@
+from datetime import datetime
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.core.mail import send_mail
-from django.conf import settings
-from django.contrib.auth import get_user_model
 from decouple import config
 from mongo_models import MongoUser, MongoOTP, MongoLoginSession
+from .hashing import HashingBusy
+from .outbox import enqueue_email
+from .revocation import revocation_store
 from .serializers import (
     UserSignupSerializer, 
     OTPVerificationSerializer, 
@@ -18,25 +22,43 @@ from .serializers import (
 
 
 def generate_jwt_tokens(mongo_user):
-    """Generate JWT tokens for MongoDB user using Django User"""
-    User = get_user_model()
-    
-    # Get or create corresponding Django user
-    django_user, created = User.objects.get_or_create(
-        username=mongo_user.email,  # Use email as username for uniqueness
-        defaults={
-            'email': mongo_user.email,
-            'is_active': True
-        }
-    )
+    """Generate JWT tokens for MongoDB user
+
+    The tokens carry the Mongo identity directly (``user_id`` is the Mongo
+    ``_id``), so issuing them touches no relational table.
+    """
+    refresh = RefreshToken()
+    refresh[api_settings.USER_ID_CLAIM] = mongo_user.id
+    refresh['email'] = mongo_user.email
+    refresh['username'] = mongo_user.username
     
-    refresh = RefreshToken.for_user(django_user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token)
     }
 
 
+def busy_response(error):
+    """503 asking the client to retry when password hashing is saturated"""
+    response = Response({
+        'error': str(error)
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
+def otp_error_response(email, purpose, otp_code):
+    """400 for an OTP that could not be consumed, telling expired codes apart"""
+    latest = MongoOTP.get_latest_unused(email, purpose)
+    if latest is not None and latest.otp == otp_code:
+        error = 'OTP has expired'
+    else:
+        error = 'Invalid OTP'
+    return Response({
+        'error': error
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def signup(request):
@@ -57,13 +79,11 @@ def signup(request):
                 purpose='signup'
             )
             
-            # Send OTP via email
-            send_mail(
+            # Queue the OTP email; the outbox workers deliver it
+            enqueue_email(
                 'Verify Your Email - PoojaPath',
                 f'Your OTP for email verification is: {otp_obj.otp}',
-                settings.EMAIL_HOST_USER or 'noreply@poojapath.com',
-                [user.email],
-                fail_silently=False,
+                [user.email]
             )
             
             return Response({
@@ -75,6 +95,8 @@ def signup(request):
             return Response({
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
+        except HashingBusy as e:
+            return busy_response(e)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -83,41 +105,17 @@ def signup(request):
 @permission_classes([AllowAny])
 def verify_otp(request):
     """OTP verification endpoint using MongoDB"""
-    import sys
-    print(f"🚀 DEBUG: verify_otp called!", file=sys.stderr, flush=True)
-    print(f"🚀 DEBUG: Request data: {request.data}", file=sys.stderr, flush=True)
-    
     serializer = OTPVerificationSerializer(data=request.data)
     if serializer.is_valid():
         email = serializer.validated_data['email']
         otp_code = serializer.validated_data['otp']
         
-        # Get the latest unused OTP
-        otp_obj = MongoOTP.get_latest_unused(email, 'signup')
-        
-        if not otp_obj:
-            return Response({
-                'error': 'Invalid OTP'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if otp_obj.otp != otp_code:
-            return Response({
-                'error': 'Invalid OTP'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if not otp_obj.is_valid():
-            return Response({
-                'error': 'OTP has expired'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Delete OTP after successful verification (security best practice)
-        otp_obj.delete()
+        # Atomically check and delete the OTP (security best practice)
+        if not MongoOTP.consume(email, 'signup', otp_code):
+            return otp_error_response(email, 'signup', otp_code)
         
         # Mark user as verified
-        user = MongoUser.get_by_email(email)
-        if user:
-            user.verify_email()
-            
+        if MongoUser.mark_verified(email):
             return Response({
                 'message': 'Email verified successfully'
             }, status=status.HTTP_200_OK)
@@ -143,7 +141,10 @@ def login(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     # Authenticate user with MongoDB
-    user = MongoUser.authenticate(email, password)
+    try:
+        user = MongoUser.authenticate(email, password)
+    except HashingBusy as e:
+        return busy_response(e)
     
     if user and user.is_verified:
         # Create login session
@@ -180,24 +181,14 @@ def login(request):
 @permission_classes([AllowAny])
 def forgot_password(request):
     """Forgot password endpoint using MongoDB"""
-    print(f"🔍 DEBUG: Forgot password called for email: {request.data.get('email')}")
-    
     serializer = ForgotPasswordSerializer(data=request.data)
     if serializer.is_valid():
         email = serializer.validated_data['email']
-        print(f"🔍 DEBUG: Looking up user with email: {email}")
-        
-        # Check if user exists
-        user = MongoUser.get_by_email(email)
-        print(f"🔍 DEBUG: User lookup result: {user}")
-        if user:
-            print(f"🔍 DEBUG: User data: {user.data}")
         
-        if not user:
-            print(f"🔍 DEBUG: User not found, returning 404")
+        if not MongoUser.get_by_email(email):
             return Response({
-                'error': 'User with this email does not exist'
-            }, status=status.HTTP_404_NOT_FOUND)
+                'email': ['User with this email does not exist']
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Generate OTP
         otp_obj = MongoOTP.create_otp(
@@ -205,13 +196,11 @@ def forgot_password(request):
             purpose='forgot_password'
         )
         
-        # Send OTP via email
-        send_mail(
+        # Queue the OTP email; the outbox workers deliver it
+        enqueue_email(
             'Reset Your Password - PoojaPath',
             f'Your OTP for password reset is: {otp_obj.otp}',
-            settings.EMAIL_HOST_USER or 'noreply@poojapath.com',
-            [email],
-            fail_silently=False,
+            [email]
         )
         
         return Response({
@@ -231,32 +220,17 @@ def reset_password(request):
         otp_code = serializer.validated_data['otp']
         new_password = serializer.validated_data['new_password']
         
-        # Get the latest unused OTP for forgot password
-        otp_obj = MongoOTP.get_latest_unused(email, 'forgot_password')
-        
-        if not otp_obj:
-            return Response({
-                'error': 'Invalid OTP'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if otp_obj.otp != otp_code:
-            return Response({
-                'error': 'Invalid OTP'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if not otp_obj.is_valid():
-            return Response({
-                'error': 'OTP has expired'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Delete OTP after successful verification (security best practice)
-        otp_obj.delete()
+        # Atomically check and delete the OTP (security best practice)
+        if not MongoOTP.consume(email, 'forgot_password', otp_code):
+            return otp_error_response(email, 'forgot_password', otp_code)
         
         # Update user password
-        user = MongoUser.get_by_email(email)
-        if user:
-            user.set_password(new_password)
-            
+        try:
+            updated = MongoUser.set_password_by_email(email, new_password)
+        except HashingBusy as e:
+            return busy_response(e)
+        
+        if updated:
             return Response({
                 'message': 'Password reset successfully'
             }, status=status.HTTP_200_OK)
@@ -266,3 +240,88 @@ def reset_password(request):
             }, status=status.HTTP_404_NOT_FOUND)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def get_refresh_token(data):
+    """The ``refresh`` value of a request body, or None unless it is a non-empty string
+
+    ``RefreshToken(None)`` would mint a new token instead of validating one.
+    """
+    refresh = data.get('refresh') if hasattr(data, 'get') else None
+    return refresh if isinstance(refresh, str) and refresh else None
+
+
+def revoke_refresh_token(refresh):
+    """Revoke a refresh token until it expires; returns False if it was already revoked"""
+    return revocation_store.revoke(
+        refresh[api_settings.JTI_CLAIM],
+        expires_at=datetime.utcfromtimestamp(refresh['exp'])
+    )
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def token_refresh(request):
+    """Issue a new access token (and rotated refresh token) for a valid refresh token"""
+    token = get_refresh_token(request.data)
+    if token is None:
+        return Response({
+            'error': 'Refresh token is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        refresh = RefreshToken(token)
+    except TokenError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    if revocation_store.is_revoked(refresh[api_settings.JTI_CLAIM]):
+        return Response({
+            'error': 'Token has been revoked'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    tokens = {
+        'access': str(refresh.access_token)
+    }
+    
+    if api_settings.ROTATE_REFRESH_TOKENS:
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            # Only one of several concurrent refreshes with the same token may rotate it
+            if not revoke_refresh_token(refresh):
+                return Response({
+                    'error': 'Token has been revoked'
+                }, status=status.HTTP_401_UNAUTHORIZED)
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        tokens['refresh'] = str(refresh)
+    
+    return Response({
+        'message': 'Token refreshed successfully',
+        'tokens': tokens
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def logout(request):
+    """Revoke the given refresh token"""
+    token = get_refresh_token(request.data)
+    if token is None:
+        return Response({
+            'error': 'Refresh token is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        refresh = RefreshToken(token)
+    except TokenError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    revoke_refresh_token(refresh)
+    
+    return Response({
+        'message': 'Logged out successfully'
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the MongoDB models and the API views
+
+Times the hot model methods (MongoUser.create_user/authenticate,
+MongoOTP.create_otp/get_latest_unused, MongoPandit.get_all/get_page/
+get_by_location/to_dict) and the pandit and login views, called in-process
+through the Django test client, at several pandit collection sizes. Reads
+are timed with the pandit read cache cleared before every call (cold) unless
+the case name says otherwise.
+
+Runs against an in-memory mongomock database by default; pass
+--mongo mongodb://localhost:27017 to use a local mongod, which is what the
+index-backed lookups should be judged on (mongomock scans every document).
+
+Results can be saved with --output and a later run checked against them with
+--baseline: any case whose median is more than --tolerance slower than in
+the baseline is reported and the run exits with status 1.
+
+    python benchmarks/bench_models.py --sizes 1000,100000 --output baseline.json
+    python benchmarks/bench_models.py --sizes 1000,100000 --baseline baseline.json
+    python benchmarks/bench_models.py --mongo mongodb://localhost:27017 --sizes 1000,100000,1000000
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'poojapath_api.settings')
+
+PASSWORD = 'BenchPass123!'
+CITIES = [
+    'Varanasi', 'Pune', 'Mumbai', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata', 'Jaipur',
+    'Ujjain', 'Haridwar', 'Rishikesh', 'Prayagraj', 'Ayodhya', 'Mathura', 'Nashik', 'Puri',
+]
+INSERT_BATCH = 10000
+
+user_numbers = itertools.count()
+
+
+def measure(function, setup=None, min_time=0.5, min_runs=3, max_runs=1000):
+    """Median, p95 and min wall time of `function` in seconds; `setup` runs untimed before each call"""
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() < deadline):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'runs': len(timings),
+        'median_us': statistics.median(timings) * 1e6,
+        'p95_us': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1e6,
+        'min_us': timings[0] * 1e6,
+    }
+
+
+def seed_pandits(count):
+    """Replace the pandits collection with `count` documents in the shape create_pandit writes
+
+    The collection is filled before its indexes are built, which is faster on
+    mongod and avoids mongomock's per-insert unique index scan.
+    """
+    from mongodb_handler import mongo_handler
+    from mongo_cache import pandit_cache
+    from mongo_indexes import ensure_indexes
+    from pandit_management.locations import normalize_location
+
+    collection = mongo_handler.get_collection('pandits')
+    collection.drop()
+    rng = random.Random(count)
+    now = datetime.utcnow()
+    numbers = iter(range(count))
+    while True:
+        batch = []
+        for number in itertools.islice(numbers, INSERT_BATCH):
+            location = rng.choice(CITIES)
+            created_at = now - timedelta(seconds=number)
+            batch.append({
+                'Pandit_name': f'Pandit {number}',
+                'phone': f'9{number:09d}',
+                'Location': location,
+                'location_key': normalize_location(location),
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+        if not batch:
+            break
+        collection.insert_many(batch, ordered=False)
+    ensure_indexes()
+    pandit_cache.clear()
+
+
+def model_cases():
+    """(name, function, setup) for the model methods"""
+    from mongo_cache import pandit_cache
+    from mongo_models import MongoOTP, MongoPandit, MongoUser
+
+    email = 'bench@example.com'
+    if MongoUser.get_by_email(email) is None:
+        MongoUser.create_user('bench', email, PASSWORD)
+        MongoUser.mark_verified(email)
+    MongoOTP.create_otp(email, 'signup')
+    pandit = MongoPandit.get_by_location('Varanasi')[0]
+
+    def create_user():
+        number = next(user_numbers)
+        MongoUser.create_user(f'bench{number}', f'bench{number}-{os.getpid()}@example.com', PASSWORD)
+
+    return [
+        ('user.create_user', create_user, None),
+        ('user.authenticate', lambda: MongoUser.authenticate(email, PASSWORD), None),
+        ('otp.create_otp', lambda: MongoOTP.create_otp(email, 'signup'), None),
+        ('otp.get_latest_unused', lambda: MongoOTP.get_latest_unused(email, 'signup'), None),
+        ('pandit.get_all', MongoPandit.get_all, pandit_cache.clear),
+        ('pandit.get_page', MongoPandit.get_page, pandit_cache.clear),
+        ('pandit.get_page (cached)', MongoPandit.get_page, None),
+        ('pandit.get_by_location exact', lambda: MongoPandit.get_by_location('Varanasi'), pandit_cache.clear),
+        ('pandit.get_by_location prefix',
+         lambda: MongoPandit.get_by_location('Var', prefix=True), pandit_cache.clear),
+        ('pandit.to_dict', pandit.to_dict, None),
+    ]
+
+
+def view_cases():
+    """(name, function, setup) for the views, through the Django test client"""
+    from django.test import Client
+    from mongo_cache import pandit_cache
+
+    client = Client()
+
+    def get(path):
+        response = client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert response.status_code == 200, (path, response.status_code, response.content[:200])
+
+    def login():
+        response = client.post('/api/user/login/', {'email': 'bench@example.com', 'password': PASSWORD},
+                               content_type='application/json')
+        assert response.status_code == 200, response.content[:200]
+        return response.json()['tokens']['access']
+
+    token = login()
+    return [
+        ('view login', login, None),
+        ('view list', lambda: get('/api/pandit/list/'), pandit_cache.clear),
+        ('view list (cached)', lambda: get('/api/pandit/list/'), None),
+        ('view location exact', lambda: get('/api/pandit/location/Varanasi/?match=exact'), pandit_cache.clear),
+        ('view location prefix', lambda: get('/api/pandit/location/Var/'), pandit_cache.clear),
+    ]
+
+
+def run(sizes, min_time, only):
+    results = {}
+    for size in sizes:
+        started = time.perf_counter()
+        seed_pandits(size)
+        print(f'\n{size} pandits (seeded in {time.perf_counter() - started:.1f}s)')
+        results[str(size)] = {}
+        for name, function, setup in model_cases() + view_cases():
+            if only and not any(part in name for part in only):
+                continue
+            stats = measure(function, setup, min_time=min_time)
+            results[str(size)][name] = stats
+            print(f'  {name:<32} {stats["median_us"]:>12.1f} us  (p95 {stats["p95_us"]:.1f}, {stats["runs"]} runs)')
+    return results
+
+
+def print_scaling(results):
+    sizes = list(results)
+    if len(sizes) < 2:
+        return
+    print(f'\nmedian time relative to {sizes[0]} pandits')
+    print(f'{"case":<32} ' + ' '.join(f'{size:>10}' for size in sizes[1:]))
+    for name, stats in results[sizes[0]].items():
+        ratios = [results[size][name]['median_us'] / stats['median_us'] for size in sizes[1:]]
+        print(f'{name:<32} ' + ' '.join(f'{ratio:>9.1f}x' for ratio in ratios))
+
+
+def find_regressions(results, baseline, tolerance):
+    """(size, case, baseline median, median) for every case slower than the baseline allows"""
+    regressions = []
+    for size, cases in results.items():
+        for name, stats in cases.items():
+            old = baseline.get(size, {}).get(name)
+            if old and stats['median_us'] > old['median_us'] * (1 + tolerance):
+                regressions.append((size, name, old['median_us'], stats['median_us']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000', help='Pandit collection sizes')
+    parser.add_argument('--mongo', default='mongomock://', help='MongoDB connection string')
+    parser.add_argument('--database', default='poojapath_bench')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Seconds to spend on each case')
+    parser.add_argument('--only', action='append', help='Only run cases whose name contains this text')
+    parser.add_argument('--iterations', type=int, default=1000,
+                        help='PBKDF2 iterations (password hashing has its own benchmark)')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to check this run against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    os.environ.update({
+        'USE_MONGODB': 'True',
+        'MONGODB_CONNECTION_STRING': args.mongo,
+        'MONGODB_DATABASE_NAME': args.database,
+        'PASSWORD_PBKDF2_ITERATIONS': str(args.iterations),
+        'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend',
+        'LOG_LEVEL': 'WARNING',
+    })
+    import django
+    django.setup()
+    from django.test.utils import setup_test_environment
+    from mongodb_handler import mongo_handler
+    from mongo_indexes import ensure_indexes
+
+    setup_test_environment()
+    mongo_handler.get_client().drop_database(args.database)
+    ensure_indexes()
+
+    print(f'mongo={args.mongo} sizes={args.sizes} python={platform.python_version()}')
+    results = run(sizes, args.min_time, args.only)
+    print_scaling(results)
+    mongo_handler.get_client().drop_database(args.database)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'mongo': args.mongo,
+                'python': platform.python_version(),
+                'results': results,
+            }, output, indent=2)
+        print(f'\nresults written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = find_regressions(results, json.load(baseline)['results'], args.tolerance)
+        if regressions:
+            print(f'\nREGRESSIONS (slower than baseline by more than {args.tolerance:.0%}):')
+            for size, name, old, new in regressions:
+                print(f'  {size} pandits  {name:<32} {old:>10.1f} us -> {new:>10.1f} us  ({new / old - 1:+.0%})')
+            sys.exit(1)
+        print(f'\nno regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Password verification throughput: inline check_password vs the hashing pool
+
+Simulates concurrent logins (password verification only, no database) and
+reports logins/second and logins/second/core for both strategies.
+
+    python benchmarks/bench_password_hashing.py --concurrency 16 --logins 400
+    python benchmarks/bench_password_hashing.py --hasher scrypt
+    python benchmarks/bench_password_hashing.py --iterations 600000 --executor process
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'poojapath_api.settings')
+
+
+def run(verify, concurrency, logins, password, encoded):
+    """Run `logins` verifications from `concurrency` client threads; returns logins/second"""
+    def login(_):
+        return verify(password, encoded)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        results = list(clients.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    assert all(results), 'verification failed'
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=(os.cpu_count() or 1) * 4)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Hashing pool size')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--hasher', choices=['pbkdf2', 'scrypt', 'argon2', 'bcrypt'], default=None)
+    parser.add_argument('--iterations', type=int, default=None, help='PBKDF2 iterations')
+    args = parser.parse_args()
+
+    if args.hasher:
+        os.environ['PASSWORD_HASHER'] = args.hasher
+    if args.iterations:
+        os.environ['PASSWORD_PBKDF2_ITERATIONS'] = str(args.iterations)
+    os.environ['PASSWORD_HASHING_WORKERS'] = str(args.workers)
+    os.environ['PASSWORD_HASHING_EXECUTOR'] = args.executor
+    os.environ['PASSWORD_HASHING_MAX_PENDING'] = str(max(args.concurrency, 1))
+
+    import django
+    django.setup()
+    from django.contrib.auth.hashers import check_password, make_password
+    from authentication.hashing import password_hasher
+
+    password = 'BenchPass123!'
+    encoded = make_password(password)
+    cores = os.cpu_count() or 1
+    print(f'hasher={encoded.split("$", 1)[0]} cores={cores} concurrency={args.concurrency} '
+          f'pool={args.executor}x{args.workers} logins={args.logins}')
+
+    inline = run(check_password, args.concurrency, args.logins, password, encoded)
+    pooled = run(lambda raw, stored: password_hasher.verify(raw, stored)[0],
+                 args.concurrency, args.logins, password, encoded)
+    password_hasher.shutdown()
+
+    print(f'{"strategy":<10} {"logins/s":>10} {"logins/s/core":>14}')
+    print(f'{"inline":<10} {inline:>10.1f} {inline / cores:>14.1f}')
+    print(f'{"pool":<10} {pooled:>10.1f} {pooled / cores:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
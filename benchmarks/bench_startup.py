@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Process startup time: loading the WSGI application and the MongoDB models
+
+Each run starts a fresh interpreter that builds the WSGI application and
+imports mongo_models, as a gunicorn worker does. It is timed once with the
+configured MongoDB and once with an unreachable one; startup should not
+depend on whether the database answers.
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --unreachable mongodb://192.0.2.1:27017
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = (
+    'from poojapath_api.wsgi import application\n'
+    'import mongo_models\n'
+)
+
+
+def time_startup(connection_string, runs):
+    """Median and max wall time of `runs` cold starts, in seconds"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='poojapath_api.settings', USE_MONGODB='True')
+    if connection_string:
+        env['MONGODB_CONNECTION_STRING'] = connection_string
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', STARTUP_CODE], cwd=ROOT, env=env, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), max(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--unreachable', default='mongodb://192.0.2.1:27017',
+                        help='Connection string of a MongoDB that does not answer')
+    args = parser.parse_args()
+
+    scenarios = [
+        ('configured', None),
+        ('unreachable', args.unreachable),
+    ]
+    print(f'{"mongodb":<12} {"median s":>9} {"max s":>7}')
+    for label, connection_string in scenarios:
+        median, worst = time_startup(connection_string, args.runs)
+        print(f'{label:<12} {median:>9.3f} {worst:>7.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Concurrent load: sync WSGI (gunicorn) vs ASGI (uvicorn) with sync and async views
+
+Starts each deployment on a local port against the same MongoDB database,
+drives it with --concurrency simultaneous clients and reports requests/second
+and latency percentiles. The pandit read cache is disabled in the servers so
+every request waits on MongoDB.
+
+    python benchmarks/bench_wsgi_vs_asgi.py --endpoint location --concurrency 200
+    python benchmarks/bench_wsgi_vs_asgi.py --deployments wsgi asgi-async --wsgi-threads 16
+
+Needs a real MongoDB (MONGODB_CONNECTION_STRING); the servers run in separate
+processes, so an in-memory mongomock database cannot be shared with them.
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'poojapath_api.settings')
+
+DEPLOYMENTS = ('wsgi', 'asgi-sync', 'asgi-async')
+PASSWORD = 'BenchPass123!'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(deployment, port, args):
+    if deployment == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'poojapath_api.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(args.wsgi_workers),
+            '--threads', str(args.wsgi_threads), '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'poojapath_api.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', '1',
+        '--log-level', 'warning', '--no-access-log',
+    ]
+
+
+def start_server(deployment, args):
+    port = free_port()
+    env = dict(
+        os.environ,
+        USE_MONGODB='True',
+        USE_ASYNC_VIEWS=str(deployment == 'asgi-async'),
+        MONGODB_DATABASE_NAME=args.database,
+        PANDIT_CACHE_TTL_SECONDS='0',
+        EMAIL_OUTBOX_WORKERS='0',
+        LOGIN_SESSION_BUFFERED='True',
+    )
+    process = subprocess.Popen(server_command(deployment, port, args), cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f'{deployment} server exited with code {process.returncode}')
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f'{deployment} server did not start within 30s')
+
+
+def seed(args):
+    """Create a verified user and some pandits; returns an access token"""
+    from mongodb_handler import mongo_handler
+    from mongo_indexes import ensure_indexes
+    from mongo_models import MongoPandit, MongoUser
+    from authentication.views_mongo import generate_jwt_tokens
+
+    mongo_handler.get_database().client.drop_database(args.database)
+    ensure_indexes()
+    user = MongoUser.create_user('bench', 'bench@example.com', PASSWORD)
+    MongoUser.mark_verified(user.email)
+    for number in range(args.pandits):
+        MongoPandit.create_pandit(f'Pandit {number}', '9999999999', f'City {number % 20}')
+    return generate_jwt_tokens(user)['access']
+
+
+def request_factory(endpoint, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    if endpoint == 'list':
+        return lambda session, url: session.get(f'{url}/api/pandit/list/', headers=headers)
+    if endpoint == 'location':
+        return lambda session, url: session.get(f'{url}/api/pandit/location/City%201/', headers=headers)
+    payload = {'email': 'bench@example.com', 'password': PASSWORD}
+    return lambda session, url: session.post(f'{url}/api/user/login/', json=payload)
+
+
+def load(url, send, concurrency, total):
+    """Send `total` requests from `concurrency` clients; returns (elapsed, latencies, errors)"""
+    local = threading.local()
+    latencies = []
+    errors = []
+
+    def one(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = send(session, url)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        latencies.append(time.perf_counter() - started)
+        if not ok:
+            errors.append(1)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(one, range(total)))
+    return time.perf_counter() - started, sorted(latencies), len(errors)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deployments', nargs='+', choices=DEPLOYMENTS, default=list(DEPLOYMENTS))
+    parser.add_argument('--endpoint', choices=['list', 'location', 'login'], default='location')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--pandits', type=int, default=1000)
+    parser.add_argument('--wsgi-workers', type=int, default=1)
+    parser.add_argument('--wsgi-threads', type=int, default=8)
+    parser.add_argument('--database', default='poojapath_bench')
+    args = parser.parse_args()
+
+    from decouple import config
+    if config('MONGODB_CONNECTION_STRING', default='mongodb://localhost:27017').startswith('mongomock://'):
+        parser.error('a real MongoDB is required; set MONGODB_CONNECTION_STRING')
+    os.environ['MONGODB_DATABASE_NAME'] = args.database
+
+    import django
+    django.setup()
+    token = seed(args)
+    send = request_factory(args.endpoint, token)
+    print(f'endpoint={args.endpoint} concurrency={args.concurrency} requests={args.requests} '
+          f'wsgi={args.wsgi_workers}x{args.wsgi_threads} threads, asgi=1 worker')
+
+    print(f'{"deployment":<12} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for deployment in args.deployments:
+        process, url = start_server(deployment, args)
+        try:
+            # Warm up connections, caches and lazily created pools
+            load(url, send, min(args.concurrency, 10), 50)
+            elapsed, latencies, errors = load(url, send, args.concurrency, args.requests)
+        finally:
+            process.terminate()
+            process.wait()
+        print(f'{deployment:<12} {args.requests / elapsed:>8.1f} {percentile(latencies, 0.50):>8.1f} '
+              f'{percentile(latencies, 0.95):>8.1f} {percentile(latencies, 0.99):>8.1f} {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Load test for the PoojaPath API flows
+
+Runs --vus virtual users against a local server through a weighted mix of
+operations and reports throughput, p50/p95/p99 latency and error rate per
+endpoint. Operations are the API flows a client performs:
+
+    list            GET  /api/pandit/list/
+    location        GET  /api/pandit/location/<city>/
+    login           POST /api/user/login/
+    signup          POST /api/user/signup/ + POST /api/user/verify-otp/
+    pandit_crud     POST /api/pandit/add/ + DELETE /api/pandit/delete/
+    password_reset  POST /api/user/forgot-password/ + POST /api/user/reset-password/
+
+With --rate the operations arrive as a Poisson process at that rate (open
+model; latency includes time spent waiting for a free virtual user), without
+it every virtual user runs operations back to back (closed model).
+
+By default the API is served in-process against an in-memory mongomock
+database; --server gunicorn/uvicorn starts a real server process, which
+needs a real MongoDB. The harness drops --database before the run, so
+MONGODB_CONNECTION_STRING must be set in the environment (a value from .env
+is not used). OTPs are read from the database, as a user would read them
+from their inbox.
+
+--url tests a server the harness did not start, against the data it already
+has. Its database is never dropped or read and nothing is seeded: the run
+logs in as existing verified --account users and cannot include the signup
+or password_reset operations, which need OTPs. pandit_crud still adds (and
+deletes again) pandits named after the run id.
+
+    python benchmarks/loadtest.py --vus 20 --duration 30
+    python benchmarks/loadtest.py --rate 50 --mix list=45,location=45,login=5,signup=3,pandit_crud=2
+    python benchmarks/loadtest.py --server gunicorn --workers 4 --output after.json --compare before.json
+    python benchmarks/loadtest.py --url https://staging.example.com --account a@example.com --password ... \
+        --mix list=45,location=45,login=5,pandit_crud=5
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'poojapath_api.settings')
+
+DEFAULT_MIX = 'list=45,location=45,login=5,signup=3,pandit_crud=2'
+PASSWORD = 'LoadTest123!'
+CITIES = [
+    'Varanasi', 'Pune', 'Mumbai', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata', 'Jaipur',
+    'Ujjain', 'Haridwar', 'Rishikesh', 'Prayagraj', 'Ayodhya', 'Mathura', 'Nashik', 'Puri',
+]
+
+# Environment shared by the harness and any server it starts
+SERVER_ENV = {
+    'USE_MONGODB': 'True',
+    'DEBUG': 'False',
+    'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend',
+    'LOG_LEVEL': 'WARNING',
+}
+
+# Operations that read an OTP from the database
+OTP_OPERATIONS = {'signup', 'password_reset'}
+
+
+class Recorder:
+    """Thread-safe latency/outcome samples per endpoint"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, latency, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((latency, ok))
+
+    def summary(self, elapsed):
+        endpoints = {
+            endpoint: summarize(samples, elapsed)
+            for endpoint, samples in sorted(self.samples.items())
+        }
+        all_samples = [sample for samples in self.samples.values() for sample in samples]
+        return endpoints, summarize(all_samples, elapsed)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] if latencies else None,
+    }
+
+
+def latest_otp(email, purpose):
+    from mongo_models import MongoOTP
+
+    otp = MongoOTP.get_latest_unused(email, purpose)
+    return otp.otp if otp else '000000'
+
+
+class VirtualUser:
+    """One simulated client with its own HTTP session and login"""
+
+    def __init__(self, number, harness):
+        self.number = number
+        self.harness = harness
+        self.session = requests.Session()
+        self.random = random.Random(harness.seed + number)
+        self.token = None
+        self.sequence = 0
+
+    def call(self, endpoint, method, path, expected, started=None, **kwargs):
+        """Send one request and record it; latency starts at ``started`` if given"""
+        if started is None:
+            started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.harness.url + path, timeout=30, **kwargs)
+            ok = response.status_code == expected
+        except requests.RequestException:
+            response, ok = None, False
+        self.harness.recorder.add(endpoint, time.perf_counter() - started, ok)
+        return response if ok else None
+
+    def auth_headers(self):
+        if self.token is None:
+            self.token = self.harness.login(self.session, self.random.choice(self.harness.accounts))
+        return {'Authorization': f'Bearer {self.token}'}
+
+    def unique(self, prefix):
+        self.sequence += 1
+        return f'{prefix}-{self.harness.run_id}-{self.number}-{self.sequence}'
+
+    # Operations; each takes the time the operation was scheduled (open model) or None
+
+    def op_list(self, started):
+        self.call('list', 'GET', '/api/pandit/list/', 200, started, headers=self.auth_headers())
+
+    def op_location(self, started):
+        city = self.random.choice(CITIES)
+        self.call('location', 'GET', f'/api/pandit/location/{city}/', 200, started, headers=self.auth_headers())
+
+    def op_login(self, started):
+        email = self.random.choice(self.harness.accounts)
+        self.call('login', 'POST', '/api/user/login/', 200, started, json={'email': email, 'password': self.harness.password})
+
+    def op_signup(self, started):
+        name = self.unique('vu')
+        email = f'{name}@loadtest.example.com'
+        if self.call('signup', 'POST', '/api/user/signup/', 201, started, json={
+            'user_name': name, 'email': email, 'password': PASSWORD, 'reEnterPassword': PASSWORD,
+        }):
+            self.call('verify_otp', 'POST', '/api/user/verify-otp/', 200,
+                      json={'email': email, 'otp': latest_otp(email, 'signup')})
+
+    def op_pandit_crud(self, started):
+        pandit = {'Pandit_name': self.unique('Pandit'), 'phone': '9999999999',
+                  'Location': self.random.choice(CITIES)}
+        headers = self.auth_headers()
+        if self.call('add_pandit', 'POST', '/api/pandit/add/', 201, started, json=pandit, headers=headers):
+            self.call('delete_pandit', 'DELETE', '/api/pandit/delete/', 200, json={
+                'Pandit_name': pandit['Pandit_name'], 'Location': pandit['Location'],
+            }, headers=headers)
+
+    def op_password_reset(self, started):
+        email = self.random.choice(self.harness.accounts)
+        if self.call('forgot_password', 'POST', '/api/user/forgot-password/', 200, started, json={'email': email}):
+            self.call('reset_password', 'POST', '/api/user/reset-password/', 200, json={
+                'email': email, 'otp': latest_otp(email, 'forgot_password'),
+                'new_password': PASSWORD, 'confirm_password': PASSWORD,
+            })
+
+
+OPERATIONS = [name[3:] for name in dir(VirtualUser) if name.startswith('op_')]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.url = None
+        self.seed = args.seed
+        self.run_id = f'{int(time.time())}{os.getpid()}'
+        self.recorder = Recorder()
+        self.accounts = list(args.account)
+        self.password = args.password
+        self.mix = parse_mix(args.mix)
+
+    def login(self, session, email):
+        response = session.post(f'{self.url}/api/user/login/', json={'email': email, 'password': self.password},
+                                timeout=30)
+        response.raise_for_status()
+        return response.json()['tokens']['access']
+
+    def setup(self):
+        """Create verified accounts and pandits through the API (nothing with --url)"""
+        session = requests.Session()
+        for number in range(0 if self.accounts else self.args.accounts):
+            email = f'account-{self.run_id}-{number}@loadtest.example.com'
+            response = session.post(f'{self.url}/api/user/signup/', json={
+                'user_name': f'account{number}', 'email': email,
+                'password': PASSWORD, 'reEnterPassword': PASSWORD,
+            }, timeout=30)
+            response.raise_for_status()
+            session.post(f'{self.url}/api/user/verify-otp/', json={
+                'email': email, 'otp': latest_otp(email, 'signup'),
+            }, timeout=30).raise_for_status()
+            self.accounts.append(email)
+
+        if self.args.url:
+            return
+        headers = {'Authorization': f'Bearer {self.login(session, self.accounts[0])}'}
+        for number in range(self.args.pandits):
+            session.post(f'{self.url}/api/pandit/add/', json={
+                'Pandit_name': f'Seed Pandit {self.run_id}-{number}', 'phone': '9999999999',
+                'Location': CITIES[number % len(CITIES)],
+            }, headers=headers, timeout=30).raise_for_status()
+
+    def choose(self, rng):
+        return rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    def run(self):
+        users = [VirtualUser(number, self) for number in range(self.args.vus)]
+        deadline = None
+        arrivals = queue.Queue()
+        threads = []
+
+        def closed_loop(user):
+            while time.perf_counter() < deadline:
+                getattr(user, f'op_{self.choose(user.random)}')(None)
+                if self.args.think:
+                    time.sleep(user.random.expovariate(1 / self.args.think))
+
+        def open_loop(user):
+            while True:
+                item = arrivals.get()
+                if item is None:
+                    return
+                scheduled, operation = item
+                getattr(user, f'op_{operation}')(scheduled)
+
+        target = open_loop if self.args.rate else closed_loop
+        for user in users:
+            # Log in before the measured window
+            user.auth_headers()
+            thread = threading.Thread(target=target, args=(user,), daemon=True)
+            threads.append(thread)
+
+        started = time.perf_counter()
+        deadline = started + self.args.duration
+        for thread in threads:
+            thread.start()
+        if self.args.rate:
+            rng = random.Random(self.seed)
+            scheduled = started
+            while True:
+                scheduled += rng.expovariate(self.args.rate)
+                if scheduled >= deadline:
+                    break
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+                arrivals.put((scheduled, self.choose(rng)))
+            for _ in users:
+                arrivals.put(None)
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_inprocess_server():
+    """Serve the WSGI app from a thread of this process (shares the mongomock database)"""
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    port = free_port()
+    server = ThreadedWSGIServer(('127.0.0.1', port), QuietHandler)
+    server.set_app(get_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown, f'http://127.0.0.1:{port}'
+
+
+def start_server_process(kind, workers):
+    port = free_port()
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', 'poojapath_api.wsgi:application',
+                   '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'poojapath_api.asgi:application', '--host', '127.0.0.1',
+                   '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+    process = subprocess.Popen(command, cwd=ROOT, env=os.environ.copy())
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            break
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f'{kind} exited with code {process.returncode}')
+            time.sleep(0.1)
+    else:
+        process.terminate()
+        raise RuntimeError(f'{kind} did not start within 30s')
+
+    def stop():
+        process.terminate()
+        process.wait()
+    return stop, f'http://127.0.0.1:{port}'
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(value):
+    return f'{value:.1f}' if value is not None else '-'
+
+
+def print_report(endpoints, total):
+    print(f'{"endpoint":<16} {"requests":>9} {"req/s":>8} {"errors":>7} {"p50 ms":>8} '
+          f'{"p95 ms":>8} {"p99 ms":>8} {"max ms":>8}')
+    for endpoint, stats in list(endpoints.items()) + [('TOTAL', total)]:
+        print(f'{endpoint:<16} {stats["requests"]:>9} {stats["throughput_rps"]:>8.1f} '
+              f'{stats["error_rate"]:>6.1%} {format_ms(stats["p50_ms"]):>8} {format_ms(stats["p95_ms"]):>8} '
+              f'{format_ms(stats["p99_ms"]):>8} {format_ms(stats["max_ms"]):>8}')
+
+
+def change(new, old):
+    if new is None or not old:
+        return '-'
+    return f'{(new - old) / old:+.1%}'
+
+
+def print_comparison(result, baseline):
+    print(f'\ncompared with {baseline.get("git_commit")} ({baseline.get("started_at")}):')
+    print(f'{"endpoint":<16} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"errors":>8}')
+    rows = dict(result['endpoints'], TOTAL=result['total'])
+    old_rows = dict(baseline['endpoints'], TOTAL=baseline['total'])
+    for endpoint, stats in rows.items():
+        old = old_rows.get(endpoint)
+        if old is None:
+            print(f'{endpoint:<16} (not in baseline)')
+            continue
+        print(f'{endpoint:<16} {change(stats["throughput_rps"], old["throughput_rps"]):>8} '
+              f'{change(stats["p50_ms"], old["p50_ms"]):>8} {change(stats["p95_ms"], old["p95_ms"]):>8} '
+              f'{change(stats["p99_ms"], old["p99_ms"]):>8} '
+              f'{stats["error_rate"] - old["error_rate"]:>+8.1%}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['inprocess', 'gunicorn', 'uvicorn'], default='inprocess')
+    parser.add_argument('--url', help='Test an already running server instead of starting one')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn/uvicorn worker processes')
+    parser.add_argument('--vus', type=int, default=10, help='Virtual users (concurrent clients)')
+    parser.add_argument('--rate', type=float, default=0, help='Operations/second (open model); 0 = closed loop')
+    parser.add_argument('--think', type=float, default=0, help='Mean think time between operations (closed model)')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of measured load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Operation weights (default {DEFAULT_MIX})')
+    parser.add_argument('--accounts', type=int, default=10, help='Verified accounts created before the run')
+    parser.add_argument('--account', action='append', default=[],
+                        help='Existing verified account to log in as instead (repeatable; required with --url)')
+    parser.add_argument('--password', default=PASSWORD, help='Password of the --account users')
+    parser.add_argument('--pandits', type=int, default=200, help='Pandits created before the run (not with --url)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database', default='poojapath_loadtest',
+                        help='Database of the server the harness starts; dropped before the run')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    harness = Harness(args)
+    if args.url:
+        # Not our server: its database is neither dropped nor read (so no OTPs)
+        if not args.account:
+            parser.error('--url needs at least one existing verified --account')
+        otp_operations = sorted(OTP_OPERATIONS.intersection(name for name, weight in mix.items() if weight))
+        if otp_operations:
+            parser.error(f"--url cannot run operations that read OTPs from the database: {', '.join(otp_operations)}")
+        stop, harness.url = (lambda: None), args.url.rstrip('/')
+        return run_load_test(args, harness, stop)
+
+    for name, value in SERVER_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ['MONGODB_DATABASE_NAME'] = args.database
+    if args.server == 'inprocess':
+        os.environ.setdefault('MONGODB_CONNECTION_STRING', 'mongomock://')
+    elif os.environ.get('MONGODB_CONNECTION_STRING', 'mongomock://').startswith('mongomock://'):
+        # Only an explicit setting: a cluster configured in .env must not be dropped by accident
+        parser.error(f'--server {args.server} drops --database on a real MongoDB; '
+                     'set MONGODB_CONNECTION_STRING in the environment')
+
+    import django
+    django.setup()
+    from mongodb_handler import mongo_handler
+    from mongo_indexes import ensure_indexes
+
+    mongo_handler.get_client().drop_database(args.database)
+    ensure_indexes()
+
+    if args.server == 'inprocess':
+        stop, harness.url = start_inprocess_server()
+    else:
+        stop, harness.url = start_server_process(args.server, args.workers)
+    run_load_test(args, harness, stop)
+
+
+def run_load_test(args, harness, stop):
+    try:
+        print(f'server={args.url or args.server} vus={args.vus} '
+              f'{"rate=%g/s" % args.rate if args.rate else "closed loop"} duration={args.duration:g}s mix={args.mix}')
+        harness.setup()
+        started_at = datetime.now(timezone.utc).isoformat()
+        elapsed = harness.run()
+    finally:
+        stop()
+
+    endpoints, total = harness.recorder.summary(elapsed)
+    print_report(endpoints, total)
+    result = {
+        'started_at': started_at,
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': dict(vars(args), mix=harness.mix, password=None),
+        'elapsed_s': elapsed,
+        'endpoints': endpoints,
+        'total': total,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(result, output, indent=2)
+        print(f'\nresults written to {args.output}')
+    if args.compare:
+        with open(args.compare) as baseline:
+            print_comparison(result, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,4 +4,6 @@ set -o errexit
 
 pip install -r requirements.txt
 python manage.py collectstatic --no-input
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+# Unique and TTL indexes the MongoDB code relies on (duplicate signups, OTP expiry)
+python manage.py ensure_mongo_indexes
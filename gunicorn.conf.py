@@ -0,0 +1,29 @@
+"""
+gunicorn configuration for PoojaPath API (loaded automatically from the project root)
+
+Bind address and worker count keep gunicorn's defaults ($PORT, $WEB_CONCURRENCY).
+This file only prepares Prometheus multiprocess mode: every worker writes its
+metric samples to PROMETHEUS_MULTIPROC_DIR and /metrics aggregates them.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Must be set before any worker imports prometheus_client
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'poojapath-prometheus')
+)
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be added to this run's totals
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-flight requests, pool connections)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
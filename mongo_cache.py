@@ -0,0 +1,114 @@
+"""
+Process-local read-through caches for PoojaPath API
+
+Caches are bounded LRUs with a TTL. A cache also carries a monotonically
+increasing version: writers bump it and entries stored under an older
+version are dropped on their next read instead of waiting for the TTL.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+from django.conf import settings
+
+
+class ReadThroughCache:
+    """Bounded LRU cache with TTL, version invalidation and hit/miss counters"""
+    
+    def __init__(self, max_entries=1024, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+    
+    def get(self, key):
+        """Return (True, value) for a fresh entry, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, version, expires_at = entry
+                if version != self.version:
+                    del self._entries[key]
+                    self._stats['invalidations'] += 1
+                elif expires_at <= time.monotonic():
+                    del self._entries[key]
+                    self._stats['expirations'] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return True, value
+            self._stats['misses'] += 1
+            return False, None
+    
+    def set(self, key, value, version=None):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            if version is None:
+                version = self.version
+            elif version != self.version:
+                # Loaded before a concurrent write bumped the version
+                return
+            self._entries[key] = (value, version, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() to fill it on a miss"""
+        hit, value = self.get(key)
+        if hit:
+            return value
+        version = self.version
+        value = loader()
+        self.set(key, value, version=version)
+        return value
+    
+    async def aget_or_load(self, key, loader):
+        """Async get_or_load; loader is a coroutine function"""
+        hit, value = self.get(key)
+        if hit:
+            return value
+        version = self.version
+        value = await loader()
+        self.set(key, value, version=version)
+        return value
+    
+    def bump_version(self):
+        """Invalidate every entry currently in the cache"""
+        with self._lock:
+            self.version += 1
+            return self.version
+    
+    def delete(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+    
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            return dict(
+                self._stats,
+                size=len(self._entries),
+                max_entries=self.max_entries,
+                ttl_seconds=self.ttl_seconds,
+                version=self.version,
+            )
+
+
+# Pandit directory reads (pages, location lookups, counts)
+pandit_cache = ReadThroughCache(
+    max_entries=getattr(settings, 'PANDIT_CACHE_MAX_ENTRIES', 1024),
+    ttl_seconds=getattr(settings, 'PANDIT_CACHE_TTL_SECONDS', 60),
+)
@@ -0,0 +1,147 @@
+"""
+Declarative index registry for the MongoDB collections used by mongo_models
+
+``python manage.py ensure_mongo_indexes`` builds every index listed here;
+set MONGODB_CHECK_INDEXES_ON_STARTUP=True to log any that are missing when
+Django starts.
+"""
+
+import logging
+
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from mongo_models import OTP_EXPIRY_SECONDS
+from mongodb_handler import mongo_handler
+
+logger = logging.getLogger(__name__)
+
+
+def otp_indexes(ttl_index):
+    """Indexes of the otps collection, with or without the TTL index (MONGODB_OTP_TTL_INDEX)"""
+    return [
+        # MongoOTP.get_latest_unused(email, purpose) sorted by created_at
+        IndexModel([
+            ('email', ASCENDING),
+            ('purpose', ASCENDING),
+            ('is_used', ASCENDING),
+            ('created_at', DESCENDING),
+        ]),
+        # Expired OTPs are deleted by MongoDB's TTL monitor instead of the request path
+        IndexModel([('created_at', ASCENDING)], expireAfterSeconds=OTP_EXPIRY_SECONDS)
+        if ttl_index else
+        # Supports the range delete of the sweep_expired_otps command
+        IndexModel([('created_at', ASCENDING)]),
+    ]
+
+
+MONGO_INDEXES = {
+    'users': [
+        # MongoUser.get_by_email / create_user
+        IndexModel([('email', ASCENDING)], unique=True),
+    ],
+    'otps': otp_indexes(getattr(settings, 'MONGODB_OTP_TTL_INDEX', True)),
+    'pandits': [
+        # Duplicate detection in create_pandit and the bulk import
+        IndexModel([('Pandit_name', ASCENDING), ('Location', ASCENDING)], unique=True),
+        # MongoPandit.get_by_location exact and prefix lookups
+        IndexModel([('location_key', ASCENDING)]),
+        IndexModel([('location_key', ASCENDING), ('Pandit_name', ASCENDING)]),
+    ],
+    'email_outbox': [
+        # OutboxDispatcher.claim_batch: due pending messages and expired leases
+        IndexModel([('status', ASCENDING), ('next_attempt_at', ASCENDING)]),
+        IndexModel([('status', ASCENDING), ('locked_until', ASCENDING)]),
+        # Delivered messages are kept for a week for auditing
+        IndexModel([('sent_at', ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ],
+    'revoked_tokens': [
+        # RevocationStore.is_revoked confirmation lookup
+        IndexModel([('jti', ASCENDING)], unique=True),
+        # Entries expire together with the token they revoke
+        IndexModel([('expires_at', ASCENDING)], expireAfterSeconds=0),
+        # Incremental Bloom filter refresh
+        IndexModel([('revoked_at', ASCENDING)]),
+    ],
+    'login_sessions': [
+        # Sessions of a user, newest first
+        IndexModel([('user_id', ASCENDING), ('login_time', DESCENDING)]),
+    ],
+}
+
+
+def _index_matches(existing, document):
+    """Whether an entry of index_information() satisfies a registry IndexModel document"""
+    if list(existing['key']) != list(document['key'].items()):
+        return False
+    for option in ('unique', 'expireAfterSeconds'):
+        if existing.get(option) != document.get(option):
+            return False
+    return True
+
+
+def missing_indexes(collection_names=None):
+    """Return [(collection_name, index_name)] for registry indexes not present in MongoDB"""
+    missing = []
+    for collection_name in collection_names or MONGO_INDEXES:
+        existing = mongo_handler.get_collection(collection_name).index_information().values()
+        for index in MONGO_INDEXES[collection_name]:
+            if not any(_index_matches(info, index.document) for info in existing):
+                missing.append((collection_name, index.document['name']))
+    return missing
+
+
+def drop_conflicting_indexes(collection, indexes):
+    """Drop existing indexes that share a name or keys with a registry index but not its options
+
+    MongoDB refuses to create such an index (IndexOptionsConflict), e.g. the
+    otps created_at index after MONGODB_OTP_TTL_INDEX is switched. Returns the
+    dropped index names.
+    """
+    dropped = []
+    for name, existing in collection.index_information().items():
+        for index in indexes:
+            document = index.document
+            same_keys = list(existing['key']) == list(document['key'].items())
+            if (name == document['name'] or same_keys) and not _index_matches(existing, document):
+                logger.warning(f"Dropping MongoDB index {collection.name}.{name}: it conflicts with the registry")
+                collection.drop_index(name)
+                dropped.append(name)
+                break
+    return dropped
+
+
+def ensure_indexes(collection_names=None):
+    """Create every registry index (a no-op for indexes that already exist)
+
+    An existing index whose options changed in the registry is dropped and
+    rebuilt. Returns {collection_name: [index_name, ...]}.
+    """
+    created = {}
+    for collection_name in collection_names or MONGO_INDEXES:
+        collection = mongo_handler.get_collection(collection_name)
+        indexes = MONGO_INDEXES[collection_name]
+        try:
+            created[collection_name] = collection.create_indexes(indexes)
+        except OperationFailure:
+            if not drop_conflicting_indexes(collection, indexes):
+                raise
+            created[collection_name] = collection.create_indexes(indexes)
+    return created
+
+
+def check_indexes():
+    """Log a warning for each registry index missing from MongoDB"""
+    try:
+        missing = missing_indexes()
+    except Exception as e:
+        logger.warning(f"Could not verify MongoDB indexes: {e}")
+        return None
+    
+    for collection_name, index_name in missing:
+        logger.warning(
+            f"MongoDB index {collection_name}.{index_name} is missing; "
+            f"run 'python manage.py ensure_mongo_indexes'"
+        )
+    return missing
@@ -5,81 +5,322 @@ These models use MongoDB directly while Django uses SQLite for its internal oper
 """
 
 from datetime import datetime, timedelta
+import base64
+import hmac
 import random
 import string
+import time
 from bson import ObjectId
+from django.conf import settings
+from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 from mongodb_handler import mongo_handler
-from django.contrib.auth.hashers import make_password, check_password
+from mongo_cache import pandit_cache
+from mongo_writers import session_writer
+from pandit_management.locations import normalize_location, location_prefix_pattern
+from authentication.hashing import password_hasher
 
 
-class MongoUserManager:
-    """Django-like manager for MongoUser"""
+# Pandit listing is keyset-paginated on _id; page size is capped so a single
+# request never materializes the whole directory
+PANDIT_PAGE_SIZE = 50
+PANDIT_MAX_PAGE_SIZE = 200
+# OTPs expire 10 minutes after creation; the otps TTL index uses the same window
+OTP_EXPIRY_SECONDS = 600
+
+PANDIT_LIST_PROJECTION = {
+    'Pandit_name': 1,
+    'phone': 1,
+    'Location': 1,
+    'created_at': 1,
+    'updated_at': 1,
+}
+
+
+# Django-style lookup suffixes supported by MongoQuerySet.filter
+LOOKUP_OPERATORS = {
+    'gt': '$gt',
+    'gte': '$gte',
+    'lt': '$lt',
+    'lte': '$lte',
+    'ne': '$ne',
+    'in': '$in',
+    'nin': '$nin',
+    'exists': '$exists',
+}
+
+
+class MongoQuerySet:
+    """Lazy, chainable Django-like queryset
+
+    Nothing is sent to MongoDB until the queryset is iterated, indexed or one
+    of count()/exists()/delete()/update()/get() is called, and each of those
+    maps to a single server-side operation.
+    """
+    
+    def __init__(self, model, query=None, sort=None, projection=None, skip=0, limit=None, batch_size=None):
+        self.model = model
+        self.query = query or {}
+        self.sort = sort or []
+        self.projection = projection
+        self.skip = skip
+        self.limit = limit
+        self.batch_size = batch_size
+    
+    def _clone(self, **changes):
+        options = {
+            'query': self.query,
+            'sort': self.sort,
+            'projection': self.projection,
+            'skip': self.skip,
+            'limit': self.limit,
+            'batch_size': self.batch_size,
+        }
+        options.update(changes)
+        return self.__class__(self.model, **options)
+    
+    @property
+    def collection(self):
+        return mongo_handler.get_collection(self.model.collection_name)
+    
+    def _cursor(self):
+        if self.limit == 0:
+            # pymongo treats limit(0) as "no limit"
+            return iter(())
+        cursor = self.collection.find(self.query, self.projection)
+        if self.sort:
+            cursor = cursor.sort(self.sort)
+        if self.skip:
+            cursor = cursor.skip(self.skip)
+        if self.limit is not None:
+            cursor = cursor.limit(self.limit)
+        if self.batch_size:
+            cursor = cursor.batch_size(self.batch_size)
+        return cursor
+    
+    def _assert_unsliced(self, operation):
+        if self.skip or self.limit is not None:
+            raise TypeError(f"Cannot {operation} a sliced queryset")
+    
+    def all(self):
+        return self._clone()
     
     def filter(self, **kwargs):
-        """Filter users by criteria"""
-        collection = mongo_handler.get_collection('users')
-        
-        # Build filter criteria
-        filter_dict = {}
+        """Narrow the query; supports field__gt/gte/lt/lte/ne/in/nin/exists lookups"""
+        query = dict(self.query)
         for key, value in kwargs.items():
-            filter_dict[key] = value
+            field, _, lookup = key.partition('__')
+            if lookup:
+                if lookup not in LOOKUP_OPERATORS:
+                    raise ValueError(f"Unsupported lookup '{lookup}'")
+                condition = dict(query.get(field) or {})
+                condition[LOOKUP_OPERATORS[lookup]] = value
+                query[field] = condition
+            else:
+                query[field] = value
+        return self._clone(query=query)
+    
+    def order_by(self, *fields):
+        """Sort by fields; prefix a field with '-' for descending order"""
+        sort = [
+            (field[1:], -1) if field.startswith('-') else (field, 1)
+            for field in fields
+        ]
+        return self._clone(sort=sort)
+    
+    def only(self, *fields):
+        """Fetch only these fields (plus _id)"""
+        return self._clone(projection={field: 1 for field in fields})
+    
+    def iterator(self, batch_size=1000):
+        """Stream results in server batches of batch_size"""
+        return iter(self._clone(batch_size=batch_size))
+    
+    def __iter__(self):
+        for document in self._cursor():
+            yield self.model(**document)
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                raise ValueError("Slice steps are not supported")
+            start = key.start or 0
+            if start < 0 or (key.stop is not None and key.stop < 0):
+                raise ValueError("Negative indexing is not supported")
+            limit = None if key.stop is None else max(key.stop - start, 0)
+            if self.limit is not None:
+                remaining = max(self.limit - start, 0)
+                limit = remaining if limit is None else min(limit, remaining)
+            return self._clone(skip=self.skip + start, limit=limit)
         
-        # Find matching documents
-        cursor = collection.find(filter_dict)
-        return MongoUserQuerySet(cursor)
+        if key < 0:
+            raise ValueError("Negative indexing is not supported")
+        if self.limit is not None and key >= self.limit:
+            raise IndexError("Queryset index out of range")
+        documents = list(self._clone(skip=self.skip + key, limit=1)._cursor())
+        if not documents:
+            raise IndexError("Queryset index out of range")
+        return self.model(**documents[0])
+    
+    def count(self):
+        """Count matching documents on the server"""
+        if self.limit == 0:
+            return 0
+        options = {}
+        if self.skip:
+            options['skip'] = self.skip
+        if self.limit is not None:
+            options['limit'] = self.limit
+        return self.collection.count_documents(self.query, **options)
+    
+    def __len__(self):
+        return self.count()
+    
+    def exists(self):
+        """Whether any document matches (fetches at most one _id)"""
+        return bool(list(self._clone(projection={'_id': 1}, limit=1)._cursor()))
+    
+    def __bool__(self):
+        return self.exists()
+    
+    def first(self):
+        documents = list(self._clone(limit=1)._cursor())
+        return self.model(**documents[0]) if documents else None
+    
+    def latest(self, field='created_at'):
+        """Get the document with the greatest value of field"""
+        instance = self.order_by(f'-{field}').first()
+        if instance is None:
+            raise ObjectDoesNotExist(f"{self.model.__name__} matching query does not exist")
+        return instance
     
     def get(self, **kwargs):
-        """Get single user by criteria"""
-        results = self.filter(**kwargs)
-        if len(results) == 0:
-            raise Exception("User not found")
-        elif len(results) > 1:
-            raise Exception("Multiple users found")
-        
-        # Access the actual results
-        if results._results is None:
-            results._results = list(results.cursor)
-        
-        # Create MongoUser instance from the result
-        user_data = results._results[0]
-        return MongoUser(**user_data)
+        """Get exactly one matching document"""
+        documents = list(self.filter(**kwargs)._clone(limit=2)._cursor())
+        if not documents:
+            raise ObjectDoesNotExist(f"{self.model.__name__} matching query does not exist")
+        if len(documents) > 1:
+            raise MultipleObjectsReturned(f"Multiple {self.model.__name__} documents returned")
+        return self.model(**documents[0])
+    
+    def delete(self):
+        """Delete all matching documents with one delete_many; returns the count"""
+        self._assert_unsliced('delete')
+        return self.collection.delete_many(self.query).deleted_count
+    
+    def update(self, **fields):
+        """$set fields on all matching documents with one update_many; returns the count"""
+        self._assert_unsliced('update')
+        return self.collection.update_many(self.query, {'$set': fields}).modified_count
 
 
-class MongoUserQuerySet:
-    """Django-like queryset for MongoUser"""
+class MongoManager:
+    """Django-like ``objects`` manager; binds to the model it is declared on"""
+    
+    def __set_name__(self, owner, name):
+        self.model = owner
+    
+    def get_queryset(self):
+        return MongoQuerySet(self.model)
     
-    def __init__(self, cursor):
-        self.cursor = cursor
-        self._results = None
+    def all(self):
+        return self.get_queryset()
+    
+    def filter(self, **kwargs):
+        return self.get_queryset().filter(**kwargs)
+    
+    def order_by(self, *fields):
+        return self.get_queryset().order_by(*fields)
+    
+    def only(self, *fields):
+        return self.get_queryset().only(*fields)
+    
+    def get(self, **kwargs):
+        return self.get_queryset().get(**kwargs)
     
     def count(self):
-        """Count matching users"""
-        if self._results is None:
-            self._results = list(self.cursor)
-        return len(self._results)
+        return self.get_queryset().count()
     
-    def __len__(self):
-        return self.count()
+    def exists(self):
+        return self.get_queryset().exists()
+
+
+class MongoModel:
+    """Base class for MongoDB models
+
+    Tracks which fields of ``data`` changed since the document was loaded or
+    last saved, so save() sends a minimal ``$set``/``$unset`` (plus the
+    timestamp field) and skips the round trip when nothing changed. Nested
+    values must be reassigned, not mutated in place, to be detected.
+    """
     
-    def delete(self):
-        """Delete all matching users"""
-        if self._results is None:
-            self._results = list(self.cursor)
+    collection_name = None
+    # Field stamped on every save that writes; None for models without one
+    timestamp_field = 'updated_at'
+    
+    def __init__(self, **kwargs):
+        self.data = kwargs
+        self._saved_data = dict(kwargs)
+    
+    @property
+    def collection(self):
+        return mongo_handler.get_collection(self.collection_name)
+    
+    def changed_fields(self):
+        """Fields set or modified since the last load/save"""
+        return {
+            key: value for key, value in self.data.items()
+            if key not in self._saved_data or self._saved_data[key] != value
+        }
+    
+    def removed_fields(self):
+        """Fields deleted from data since the last load/save"""
+        return [key for key in self._saved_data if key not in self.data]
+    
+    @property
+    def is_dirty(self):
+        return bool(self.changed_fields() or self.removed_fields())
+    
+    def pending_update(self):
+        """The $set/$unset update save() would send, or None when nothing changed
+
+        Stamps the timestamp field on ``data`` when there is something to write.
+        """
+        changed = self.changed_fields()
+        changed.pop('_id', None)
+        removed = self.removed_fields()
+        if not changed and not removed:
+            return None
         
-        collection = mongo_handler.get_collection('users')
-        for result in self._results:
-            collection.delete_one({'_id': result['_id']})
+        if self.timestamp_field:
+            self.data[self.timestamp_field] = changed[self.timestamp_field] = datetime.utcnow()
+        update = {}
+        if changed:
+            update['$set'] = changed
+        if removed:
+            update['$unset'] = {key: '' for key in removed}
+        return update
+    
+    def save(self):
+        """Write modified fields to MongoDB; returns False when there was nothing to write"""
+        update = self.pending_update()
+        if update is None:
+            return False
+        
+        self.collection.update_one({'_id': self.data['_id']}, update)
+        self._saved_data = dict(self.data)
+        return True
 
 
-class MongoUser:
+class MongoUser(MongoModel):
     """MongoDB User model"""
     
-    # Django-like objects manager
-    objects = MongoUserManager()
+    collection_name = 'users'
     
-    def __init__(self, **kwargs):
-        self.collection = mongo_handler.get_collection('users')
-        self.data = kwargs
+    # Django-like objects manager
+    objects = MongoManager()
     
     @classmethod
     def create_user(cls, username, email, password):
@@ -87,7 +328,7 @@ class MongoUser:
         user_data = {
             'username': username,
             'email': email,
-            'password': make_password(password),
+            'password': password_hasher.hash(password),
             'is_verified': False,
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
@@ -95,11 +336,11 @@ class MongoUser:
         
         collection = mongo_handler.get_collection('users')
         
-        # Check if user already exists
-        if collection.find_one({'email': email}):
+        # The unique users.email index rejects duplicates, no lookup needed first
+        try:
+            result = collection.insert_one(user_data)
+        except DuplicateKeyError:
             raise ValueError("User with this email already exists")
-        
-        result = collection.insert_one(user_data)
         user_data['_id'] = result.inserted_id
         return cls(**user_data)
     
@@ -117,21 +358,63 @@ class MongoUser:
         user_data = collection.find_one({'_id': ObjectId(user_id)})
         return cls(**user_data) if user_data else None
     
+    @classmethod
+    def is_active_user(cls, user_id):
+        """Whether a user with this id exists and has verified their email"""
+        try:
+            object_id = ObjectId(user_id)
+        except (InvalidId, TypeError):
+            return False
+        collection = mongo_handler.get_collection('users')
+        user_data = collection.find_one({'_id': object_id}, {'is_verified': 1})
+        return bool(user_data and user_data.get('is_verified'))
+    
     @classmethod
     def authenticate(cls, email, password):
-        """Authenticate user with email and password"""
+        """Authenticate user with email and password
+
+        A correct password stored with an outdated hasher or cost is rehashed
+        with the preferred hasher.
+        """
         user = cls.get_by_email(email)
-        if user and user.check_password(password):
-            return user
-        return None
+        if not user:
+            return None
+        
+        is_correct, must_update = password_hasher.verify(password, user.password)
+        if not is_correct:
+            return None
+        if must_update:
+            user.data['password'] = password_hasher.hash(password)
+            user.save()
+        return user
+    
+    @classmethod
+    def mark_verified(cls, email):
+        """Mark the user with this email as verified in one update; returns False if there is none"""
+        collection = mongo_handler.get_collection('users')
+        result = collection.update_one(
+            {'email': email},
+            {'$set': {'is_verified': True, 'updated_at': datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+    
+    @classmethod
+    def set_password_by_email(cls, email, password):
+        """Set a new password in one update; returns False if there is no such user"""
+        collection = mongo_handler.get_collection('users')
+        result = collection.update_one(
+            {'email': email},
+            {'$set': {'password': password_hasher.hash(password), 'updated_at': datetime.utcnow()}}
+        )
+        return result.matched_count > 0
     
     def check_password(self, password):
         """Check if password is correct"""
-        return check_password(password, self.data.get('password'))
+        return password_hasher.verify(password, self.data.get('password'))[0]
     
     def set_password(self, password):
         """Set new password"""
-        self.data['password'] = make_password(password)
+        self.data['password'] = password_hasher.hash(password)
         self.save()
     
     def verify_email(self):
@@ -139,15 +422,6 @@ class MongoUser:
         self.data['is_verified'] = True
         self.save()
     
-    def save(self):
-        """Save user data to MongoDB"""
-        self.data['updated_at'] = datetime.utcnow()
-        collection = mongo_handler.get_collection('users')
-        collection.update_one(
-            {'_id': self.data['_id']},
-            {'$set': self.data}
-        )
-    
     @property
     def id(self):
         return str(self.data.get('_id'))
@@ -169,89 +443,27 @@ class MongoUser:
         return self.data.get('is_verified', False)
 
 
-class MongoOTPManager:
-    """Django-like manager for MongoOTP"""
-    
-    def filter(self, **kwargs):
-        """Filter OTPs by criteria"""
-        collection = mongo_handler.get_collection('otps')
-        
-        # Build filter criteria
-        filter_dict = {}
-        for key, value in kwargs.items():
-            filter_dict[key] = value
-        
-        # Find matching documents
-        cursor = collection.find(filter_dict)
-        return MongoOTPQuerySet(cursor)
-    
-    def get(self, **kwargs):
-        """Get single OTP by criteria"""
-        results = self.filter(**kwargs)
-        if len(results) == 0:
-            from django.core.exceptions import ObjectDoesNotExist
-            raise ObjectDoesNotExist("OTP matching query does not exist")
-        elif len(results) > 1:
-            raise Exception("Multiple OTPs found")
-        return results[0]
-
-
-class MongoOTPQuerySet:
-    """Django-like queryset for MongoOTP"""
-    
-    def __init__(self, cursor):
-        self.cursor = cursor
-        self._results = None
-    
-    def latest(self, field='created_at'):
-        """Get latest OTP by field"""
-        if self._results is None:
-            self._results = list(self.cursor.sort([(field, -1)]))
-        
-        if not self._results:
-            from django.core.exceptions import ObjectDoesNotExist
-            raise ObjectDoesNotExist("OTP matching query does not exist")
-        
-        return MongoOTP(**self._results[0])
-    
-    def count(self):
-        """Count matching OTPs"""
-        if self._results is None:
-            self._results = list(self.cursor)
-        return len(self._results)
-    
-    def delete(self):
-        """Delete all matching OTPs"""
-        if self._results is None:
-            self._results = list(self.cursor)
-        
-        collection = mongo_handler.get_collection('otps')
-        deleted_count = 0
-        for result in self._results:
-            collection.delete_one({'_id': result['_id']})
-            deleted_count += 1
-        return deleted_count
-    
-    def __len__(self):
-        return self.count()
+def otp_matches(otp_data, otp_code):
+    """Whether a stored OTP document is unexpired and holds otp_code"""
+    if otp_data is None or not isinstance(otp_code, str):
+        return False
+    if otp_data['created_at'] <= datetime.utcnow() - timedelta(seconds=OTP_EXPIRY_SECONDS):
+        return False
+    return hmac.compare_digest(otp_data['otp'], otp_code)
 
 
-class MongoOTP:
+class MongoOTP(MongoModel):
     """MongoDB OTP model"""
     
-    # Django-like objects manager
-    objects = MongoOTPManager()
+    collection_name = 'otps'
+    timestamp_field = None
     
-    def __init__(self, **kwargs):
-        self.collection = mongo_handler.get_collection('otps')
-        self.data = kwargs
+    # Django-like objects manager
+    objects = MongoManager()
     
     @classmethod
     def create_otp(cls, email, purpose='signup'):
-        """Create a new OTP"""
-        # Clean up expired OTPs first (automatic maintenance)
-        cls.cleanup_expired_otps()
-        
+        """Create a new OTP (expired OTPs are removed by the TTL index, not here)"""
         otp_code = cls.generate_otp()
         otp_data = {
             'email': email,
@@ -276,6 +488,24 @@ class MongoOTP:
         )
         return cls(**otp_data) if otp_data else None
     
+    @classmethod
+    def consume(cls, email, purpose, otp_code):
+        """Delete the latest unused OTP if it is unexpired and matches; returns whether it did
+
+        Only the newest code for the email and purpose is accepted, so issuing a
+        new OTP invalidates every earlier one. The delete is keyed on the OTP's
+        _id, so two concurrent submissions of the same code cannot both succeed.
+        """
+        collection = mongo_handler.get_collection('otps')
+        otp_data = collection.find_one(
+            {'email': email, 'purpose': purpose, 'is_used': False},
+            projection={'otp': 1, 'created_at': 1},
+            sort=[('created_at', -1)]
+        )
+        if not otp_matches(otp_data, otp_code):
+            return False
+        return collection.delete_one({'_id': otp_data['_id']}).deleted_count == 1
+    
     @staticmethod
     def generate_otp():
         """Generate a 6-digit OTP"""
@@ -290,16 +520,12 @@ class MongoOTP:
         if not created_at:
             return False
         
-        return (datetime.utcnow() - created_at).total_seconds() < 600  # 10 minutes
+        return (datetime.utcnow() - created_at).total_seconds() < OTP_EXPIRY_SECONDS
     
     def mark_as_used(self):
         """Mark OTP as used"""
         self.data['is_used'] = True
-        collection = mongo_handler.get_collection('otps')
-        collection.update_one(
-            {'_id': self.data['_id']},
-            {'$set': {'is_used': True}}
-        )
+        self.save()
     
     def delete(self):
         """Delete OTP from database (security best practice after verification)"""
@@ -310,12 +536,27 @@ class MongoOTP:
         return result
     
     @classmethod
-    def cleanup_expired_otps(cls):
-        """Delete all expired OTPs (older than 10 minutes)"""
+    def cleanup_expired_otps(cls, batch_size=None, pause=0):
+        """Delete all expired OTPs (older than 10 minutes)
+
+        Only needed where the otps TTL index cannot be used. With batch_size the
+        deletes are split into small batches separated by ``pause`` seconds so
+        a sweep never holds the collection busy for long.
+        """
         collection = mongo_handler.get_collection('otps')
-        expiry_time = datetime.utcnow() - timedelta(minutes=10)
-        result = collection.delete_many({'created_at': {'$lt': expiry_time}})
-        return result.deleted_count
+        expiry_time = datetime.utcnow() - timedelta(seconds=OTP_EXPIRY_SECONDS)
+        expired = {'created_at': {'$lt': expiry_time}}
+        if not batch_size:
+            return collection.delete_many(expired).deleted_count
+        
+        deleted_count = 0
+        while True:
+            ids = [otp_data['_id'] for otp_data in collection.find(expired, {'_id': 1}).limit(batch_size)]
+            if not ids:
+                return deleted_count
+            deleted_count += collection.delete_many({'_id': {'$in': ids}}).deleted_count
+            if pause:
+                time.sleep(pause)
     
     @property
     def otp(self):
@@ -338,12 +579,13 @@ class MongoOTP:
         return self.data.get('created_at')
 
 
-class MongoPandit:
+class MongoPandit(MongoModel):
     """MongoDB Pandit model"""
     
-    def __init__(self, **kwargs):
-        self.collection = mongo_handler.get_collection('pandits')
-        self.data = kwargs
+    collection_name = 'pandits'
+    
+    # Django-like objects manager
+    objects = MongoManager()
     
     @classmethod
     def create_pandit(cls, pandit_name, phone, location):
@@ -358,11 +600,13 @@ class MongoPandit:
             'Pandit_name': pandit_name,
             'phone': phone,
             'Location': location,
+            'location_key': normalize_location(location),
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
         
         result = collection.insert_one(pandit_data)
+        pandit_cache.bump_version()
         pandit_data['_id'] = result.inserted_id
         return cls(**pandit_data)
     
@@ -379,30 +623,121 @@ class MongoPandit:
     @classmethod
     def get_all(cls):
         """Get all pandits"""
-        collection = mongo_handler.get_collection('pandits')
-        pandits = []
-        for pandit_data in collection.find():
-            pandits.append(cls(**pandit_data))
-        return pandits
+        def load():
+            collection = mongo_handler.get_collection('pandits')
+            return list(collection.find())
+        
+        return [cls(**pandit_data) for pandit_data in pandit_cache.get_or_load(('all',), load)]
+    
+    @classmethod
+    def get_page(cls, cursor=None, limit=PANDIT_PAGE_SIZE):
+        """Get one page of pandits ordered by _id, starting after the given cursor
+
+        Returns a tuple of (pandits, next_cursor); next_cursor is None on the last page.
+        """
+        limit = max(1, min(int(limit), PANDIT_MAX_PAGE_SIZE))
+        query = {}
+        if cursor:
+            query['_id'] = {'$gt': cls.decode_cursor(cursor)}
+        
+        def load():
+            collection = mongo_handler.get_collection('pandits')
+            # Fetch one extra document to know whether another page exists
+            documents = list(
+                collection.find(query, PANDIT_LIST_PROJECTION).sort('_id', 1).limit(limit + 1)
+            )
+            next_cursor = None
+            if len(documents) > limit:
+                documents = documents[:limit]
+                next_cursor = cls.encode_cursor(documents[-1]['_id'])
+            return documents, next_cursor
+        
+        documents, next_cursor = pandit_cache.get_or_load(('page', cursor, limit), load)
+        return [cls(**pandit_data) for pandit_data in documents], next_cursor
+    
+    @staticmethod
+    def encode_cursor(object_id):
+        """Encode an _id as an opaque pagination cursor"""
+        return base64.urlsafe_b64encode(str(object_id).encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decode an opaque pagination cursor back into an _id"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            return ObjectId(base64.urlsafe_b64decode(padded.encode()).decode())
+        except (InvalidId, ValueError, TypeError):
+            raise ValueError("Invalid cursor")
     
     @classmethod
-    def get_by_location(cls, location):
-        """Get pandits by location"""
+    def count(cls):
+        """Get the (approximate) number of pandits"""
+        def load():
+            collection = mongo_handler.get_collection('pandits')
+            return collection.estimated_document_count()
+        
+        return pandit_cache.get_or_load(('count',), load)
+    
+    @classmethod
+    def get_by_location(cls, location, prefix=False):
+        """Get pandits by normalized location, as an exact or prefix match"""
+        location_key = normalize_location(location)
+        if prefix:
+            query = {'location_key': {'$regex': location_prefix_pattern(location)}}
+        else:
+            query = {'location_key': location_key}
+        
+        def load():
+            # The (location_key, Pandit_name) index finds the documents in sort order;
+            # the projection needs fields outside it, so they are still fetched
+            collection = mongo_handler.get_collection('pandits')
+            return list(collection.find(query, PANDIT_LIST_PROJECTION).sort(
+                [('location_key', 1), ('Pandit_name', 1)]
+            ))
+        
+        documents = pandit_cache.get_or_load(('location', location_key, prefix), load)
+        return [cls(**pandit_data) for pandit_data in documents]
+    
+    @classmethod
+    def backfill_location_keys(cls, batch_size=1000):
+        """Set location_key on documents written before it existed"""
         collection = mongo_handler.get_collection('pandits')
-        pandits = []
-        for pandit_data in collection.find({'Location': {'$regex': location, '$options': 'i'}}):
-            pandits.append(cls(**pandit_data))
-        return pandits
+        updated = 0
+        batch = []
+        for pandit_data in collection.find({'location_key': {'$exists': False}}, {'Location': 1}):
+            batch.append(UpdateOne(
+                {'_id': pandit_data['_id']},
+                {'$set': {'location_key': normalize_location(pandit_data.get('Location'))}}
+            ))
+            if len(batch) >= batch_size:
+                updated += collection.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+        if updated:
+            pandit_cache.bump_version()
+        return updated
+    
+    def save(self):
+        """Save changed fields, keeping location_key in sync and invalidating cached reads"""
+        if 'Location' in self.changed_fields():
+            self.data['location_key'] = normalize_location(self.data['Location'])
+        saved = super().save()
+        if saved:
+            pandit_cache.bump_version()
+        return saved
     
     def delete(self):
         """Delete pandit"""
         collection = mongo_handler.get_collection('pandits')
         collection.delete_one({'_id': self.data['_id']})
+        pandit_cache.bump_version()
     
     def to_dict(self):
         """Convert to dictionary"""
         data = self.data.copy()
         data['id'] = str(data.pop('_id'))
+        data.pop('location_key', None)
         return data
     
     @property
@@ -422,24 +757,33 @@ class MongoPandit:
         return self.data.get('Location')
 
 
-class MongoLoginSession:
+class MongoLoginSession(MongoModel):
     """MongoDB Login Session model"""
     
-    def __init__(self, **kwargs):
-        self.collection = mongo_handler.get_collection('login_sessions')
-        self.data = kwargs
+    collection_name = 'login_sessions'
+    timestamp_field = None
+    
+    # Django-like objects manager
+    objects = MongoManager()
     
     @classmethod
     def create_session(cls, user_id, device_type):
-        """Create a new login session"""
+        """Create a new login session
+
+        Sessions are write-only audit records, so by default they are queued on
+        the buffered session writer and inserted in batches off the request path.
+        """
         session_data = {
+            '_id': ObjectId(),
             'user_id': user_id,
             'device_type': device_type,
             'login_time': datetime.utcnow(),
             'is_active': True
         }
         
-        collection = mongo_handler.get_collection('login_sessions')
-        result = collection.insert_one(session_data)
-        session_data['_id'] = result.inserted_id
+        if getattr(settings, 'LOGIN_SESSION_BUFFERED', True):
+            session_writer.write(session_data)
+        else:
+            collection = mongo_handler.get_collection('login_sessions')
+            collection.insert_one(session_data)
         return cls(**session_data)
@@ -0,0 +1,400 @@
+"""
+Async MongoDB models for PoojaPath API
+
+Mirror of ``mongo_models`` for the async views, backed by motor through
+``async_mongo_handler``. Each class subclasses its sync model, so document
+properties and helpers (to_dict, check fields, cursors) are shared, and adds
+``a``-prefixed coroutines in the style of Django's async ORM API
+(``aget_by_email``, ``objects.filter(...).aexists()``, ``async for``).
+"""
+
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from pymongo.errors import DuplicateKeyError
+
+from mongodb_handler import async_mongo_handler
+from mongo_cache import pandit_cache
+from mongo_models import (
+    MongoLoginSession,
+    MongoManager,
+    MongoOTP,
+    MongoPandit,
+    MongoQuerySet,
+    MongoUser,
+    PANDIT_LIST_PROJECTION,
+    PANDIT_MAX_PAGE_SIZE,
+    PANDIT_PAGE_SIZE,
+    otp_matches,
+)
+from mongo_writers import session_writer
+from pandit_management.locations import normalize_location, location_prefix_pattern
+from authentication.hashing import password_hasher
+
+
+class AsyncMongoQuerySet(MongoQuerySet):
+    """MongoQuerySet whose terminal operations are coroutines
+    
+    Chaining (filter/order_by/only/slicing) is unchanged; results are read
+    with ``async for`` or the ``a``-prefixed methods.
+    """
+    
+    @property
+    def collection(self):
+        return async_mongo_handler.get_collection(self.model.collection_name)
+    
+    async def _documents(self):
+        if self.limit == 0:
+            return []
+        return await self._cursor().to_list(None)
+    
+    async def __aiter__(self):
+        if self.limit == 0:
+            return
+        async for document in self._cursor():
+            yield self.model(**document)
+    
+    async def acount(self):
+        """Count matching documents on the server"""
+        if self.limit == 0:
+            return 0
+        options = {}
+        if self.skip:
+            options['skip'] = self.skip
+        if self.limit is not None:
+            options['limit'] = self.limit
+        return await self.collection.count_documents(self.query, **options)
+    
+    async def aexists(self):
+        """Whether any document matches (fetches at most one _id)"""
+        return bool(await self._clone(projection={'_id': 1}, limit=1)._documents())
+    
+    async def afirst(self):
+        documents = await self._clone(limit=1)._documents()
+        return self.model(**documents[0]) if documents else None
+    
+    async def alatest(self, field='created_at'):
+        """Get the document with the greatest value of field"""
+        instance = await self.order_by(f'-{field}').afirst()
+        if instance is None:
+            raise ObjectDoesNotExist(f"{self.model.__name__} matching query does not exist")
+        return instance
+    
+    async def aget(self, **kwargs):
+        """Get exactly one matching document"""
+        documents = await self.filter(**kwargs)._clone(limit=2)._documents()
+        if not documents:
+            raise ObjectDoesNotExist(f"{self.model.__name__} matching query does not exist")
+        if len(documents) > 1:
+            raise MultipleObjectsReturned(f"Multiple {self.model.__name__} documents returned")
+        return self.model(**documents[0])
+    
+    async def adelete(self):
+        """Delete all matching documents with one delete_many; returns the count"""
+        self._assert_unsliced('delete')
+        return (await self.collection.delete_many(self.query)).deleted_count
+    
+    async def aupdate(self, **fields):
+        """$set fields on all matching documents with one update_many; returns the count"""
+        self._assert_unsliced('update')
+        return (await self.collection.update_many(self.query, {'$set': fields})).modified_count
+
+
+class AsyncMongoManager(MongoManager):
+    """``objects`` manager returning AsyncMongoQuerySets"""
+    
+    def get_queryset(self):
+        return AsyncMongoQuerySet(self.model)
+    
+    async def aget(self, **kwargs):
+        return await self.get_queryset().aget(**kwargs)
+    
+    async def acount(self):
+        return await self.get_queryset().acount()
+    
+    async def aexists(self):
+        return await self.get_queryset().aexists()
+
+
+class AsyncMongoModel:
+    """Mixin adding motor-backed persistence to a MongoModel subclass"""
+    
+    @property
+    def async_collection(self):
+        return async_mongo_handler.get_collection(self.collection_name)
+    
+    async def asave(self):
+        """Write modified fields to MongoDB; returns False when there was nothing to write"""
+        update = self.pending_update()
+        if update is None:
+            return False
+        
+        await self.async_collection.update_one({'_id': self.data['_id']}, update)
+        self._saved_data = dict(self.data)
+        return True
+
+
+class AsyncMongoUser(AsyncMongoModel, MongoUser):
+    """Async MongoDB User model"""
+    
+    objects = AsyncMongoManager()
+    
+    @classmethod
+    async def acreate_user(cls, username, email, password):
+        """Create a new user"""
+        user_data = {
+            'username': username,
+            'email': email,
+            'password': await password_hasher.ahash(password),
+            'is_verified': False,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        
+        collection = async_mongo_handler.get_collection('users')
+        
+        # The unique users.email index rejects duplicates, no lookup needed first
+        try:
+            result = await collection.insert_one(user_data)
+        except DuplicateKeyError:
+            raise ValueError("User with this email already exists")
+        user_data['_id'] = result.inserted_id
+        return cls(**user_data)
+    
+    @classmethod
+    async def aget_by_email(cls, email):
+        """Get user by email"""
+        collection = async_mongo_handler.get_collection('users')
+        user_data = await collection.find_one({'email': email})
+        return cls(**user_data) if user_data else None
+    
+    @classmethod
+    async def aget_by_id(cls, user_id):
+        """Get user by ID"""
+        collection = async_mongo_handler.get_collection('users')
+        user_data = await collection.find_one({'_id': ObjectId(user_id)})
+        return cls(**user_data) if user_data else None
+    
+    @classmethod
+    async def ais_active_user(cls, user_id):
+        """Whether a user with this id exists and has verified their email"""
+        try:
+            object_id = ObjectId(user_id)
+        except (InvalidId, TypeError):
+            return False
+        collection = async_mongo_handler.get_collection('users')
+        user_data = await collection.find_one({'_id': object_id}, {'is_verified': 1})
+        return bool(user_data and user_data.get('is_verified'))
+    
+    @classmethod
+    async def aauthenticate(cls, email, password):
+        """Authenticate user with email and password, rehashing outdated hashes"""
+        user = await cls.aget_by_email(email)
+        if not user:
+            return None
+        
+        is_correct, must_update = await password_hasher.averify(password, user.password)
+        if not is_correct:
+            return None
+        if must_update:
+            user.data['password'] = await password_hasher.ahash(password)
+            await user.asave()
+        return user
+    
+    @classmethod
+    async def amark_verified(cls, email):
+        """Mark the user with this email as verified in one update; returns False if there is none"""
+        collection = async_mongo_handler.get_collection('users')
+        result = await collection.update_one(
+            {'email': email},
+            {'$set': {'is_verified': True, 'updated_at': datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+    
+    @classmethod
+    async def aset_password_by_email(cls, email, password):
+        """Set a new password in one update; returns False if there is no such user"""
+        collection = async_mongo_handler.get_collection('users')
+        result = await collection.update_one(
+            {'email': email},
+            {'$set': {'password': await password_hasher.ahash(password), 'updated_at': datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+
+
+class AsyncMongoOTP(AsyncMongoModel, MongoOTP):
+    """Async MongoDB OTP model"""
+    
+    objects = AsyncMongoManager()
+    
+    @classmethod
+    async def acreate_otp(cls, email, purpose='signup'):
+        """Create a new OTP (expired OTPs are removed by the TTL index)"""
+        otp_data = {
+            'email': email,
+            'otp': cls.generate_otp(),
+            'purpose': purpose,
+            'is_used': False,
+            'created_at': datetime.utcnow()
+        }
+        
+        collection = async_mongo_handler.get_collection('otps')
+        result = await collection.insert_one(otp_data)
+        otp_data['_id'] = result.inserted_id
+        return cls(**otp_data)
+    
+    @classmethod
+    async def aget_latest_unused(cls, email, purpose):
+        """Get latest unused OTP for email and purpose"""
+        collection = async_mongo_handler.get_collection('otps')
+        otp_data = await collection.find_one(
+            {'email': email, 'purpose': purpose, 'is_used': False},
+            sort=[('created_at', -1)]
+        )
+        return cls(**otp_data) if otp_data else None
+    
+    @classmethod
+    async def aconsume(cls, email, purpose, otp_code):
+        """Delete the latest unused OTP if it is unexpired and matches; returns whether it did"""
+        collection = async_mongo_handler.get_collection('otps')
+        otp_data = await collection.find_one(
+            {'email': email, 'purpose': purpose, 'is_used': False},
+            projection={'otp': 1, 'created_at': 1},
+            sort=[('created_at', -1)]
+        )
+        if not otp_matches(otp_data, otp_code):
+            return False
+        result = await collection.delete_one({'_id': otp_data['_id']})
+        return result.deleted_count == 1
+
+
+class AsyncMongoPandit(AsyncMongoModel, MongoPandit):
+    """Async MongoDB Pandit model"""
+    
+    objects = AsyncMongoManager()
+    
+    @classmethod
+    async def acreate_pandit(cls, pandit_name, phone, location):
+        """Create a new pandit"""
+        collection = async_mongo_handler.get_collection('pandits')
+        
+        # Check if pandit already exists
+        if await collection.find_one({'Pandit_name': pandit_name, 'Location': location}):
+            raise ValueError("Pandit with this name and location already exists")
+        
+        pandit_data = {
+            'Pandit_name': pandit_name,
+            'phone': phone,
+            'Location': location,
+            'location_key': normalize_location(location),
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        
+        result = await collection.insert_one(pandit_data)
+        pandit_cache.bump_version()
+        pandit_data['_id'] = result.inserted_id
+        return cls(**pandit_data)
+    
+    @classmethod
+    async def aget_by_name_and_location(cls, pandit_name, location):
+        """Get pandit by name and location"""
+        collection = async_mongo_handler.get_collection('pandits')
+        pandit_data = await collection.find_one({
+            'Pandit_name': pandit_name,
+            'Location': location
+        })
+        return cls(**pandit_data) if pandit_data else None
+    
+    @classmethod
+    async def aget_page(cls, cursor=None, limit=PANDIT_PAGE_SIZE):
+        """Get one page of pandits ordered by _id; returns (pandits, next_cursor)"""
+        limit = max(1, min(int(limit), PANDIT_MAX_PAGE_SIZE))
+        query = {}
+        if cursor:
+            query['_id'] = {'$gt': cls.decode_cursor(cursor)}
+        
+        async def load():
+            collection = async_mongo_handler.get_collection('pandits')
+            # Fetch one extra document to know whether another page exists
+            documents = await collection.find(query, PANDIT_LIST_PROJECTION).sort(
+                '_id', 1
+            ).limit(limit + 1).to_list(None)
+            next_cursor = None
+            if len(documents) > limit:
+                documents = documents[:limit]
+                next_cursor = cls.encode_cursor(documents[-1]['_id'])
+            return documents, next_cursor
+        
+        # Same cache keys as MongoPandit, so sync and async views share entries
+        documents, next_cursor = await pandit_cache.aget_or_load(('page', cursor, limit), load)
+        return [cls(**pandit_data) for pandit_data in documents], next_cursor
+    
+    @classmethod
+    async def acount(cls):
+        """Get the (approximate) number of pandits"""
+        async def load():
+            collection = async_mongo_handler.get_collection('pandits')
+            return await collection.estimated_document_count()
+        
+        return await pandit_cache.aget_or_load(('count',), load)
+    
+    @classmethod
+    async def aget_by_location(cls, location, prefix=False):
+        """Get pandits by normalized location, as an exact or prefix match"""
+        location_key = normalize_location(location)
+        if prefix:
+            query = {'location_key': {'$regex': location_prefix_pattern(location)}}
+        else:
+            query = {'location_key': location_key}
+        
+        async def load():
+            collection = async_mongo_handler.get_collection('pandits')
+            return await collection.find(query, PANDIT_LIST_PROJECTION).sort(
+                [('location_key', 1), ('Pandit_name', 1)]
+            ).to_list(None)
+        
+        documents = await pandit_cache.aget_or_load(('location', location_key, prefix), load)
+        return [cls(**pandit_data) for pandit_data in documents]
+    
+    async def asave(self):
+        """Save changed fields, keeping location_key in sync and invalidating cached reads"""
+        if 'Location' in self.changed_fields():
+            self.data['location_key'] = normalize_location(self.data['Location'])
+        saved = await super().asave()
+        if saved:
+            pandit_cache.bump_version()
+        return saved
+    
+    async def adelete(self):
+        """Delete pandit"""
+        await self.async_collection.delete_one({'_id': self.data['_id']})
+        pandit_cache.bump_version()
+
+
+class AsyncMongoLoginSession(AsyncMongoModel, MongoLoginSession):
+    """Async MongoDB Login Session model"""
+    
+    objects = AsyncMongoManager()
+    
+    @classmethod
+    async def acreate_session(cls, user_id, device_type):
+        """Create a new login session (queued on the buffered writer by default)"""
+        session_data = {
+            '_id': ObjectId(),
+            'user_id': user_id,
+            'device_type': device_type,
+            'login_time': datetime.utcnow(),
+            'is_active': True
+        }
+        
+        if getattr(settings, 'LOGIN_SESSION_BUFFERED', True):
+            # Only appends to an in-memory queue; never blocks the event loop
+            session_writer.write(session_data)
+        else:
+            collection = async_mongo_handler.get_collection('login_sessions')
+            await collection.insert_one(session_data)
+        return cls(**session_data)
@@ -0,0 +1,193 @@
+"""
+MongoDB command monitoring for PoojaPath API
+
+``CommandTimingListener`` is registered on every client created by
+``MongoDBHandler`` and attributes each command (count, duration, collection)
+to the current request through a context variable, which the request timing
+middleware turns into a ``Server-Timing`` header and a structured log line.
+Commands slower than MONGODB_SLOW_COMMAND_MS are logged with the redacted
+shape of their filter (field names and operators, never values).
+
+Context variables follow the request into sync_to_async worker threads and
+into motor's executor, so sync and async views are both covered. The same
+listener feeds ``record_commands``, which the tests use to pin the commands
+a request sends. mongomock clients do not emit monitoring events
+(mongo_testing publishes equivalent ones for the tests).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import time
+
+from django.conf import settings
+from pymongo import monitoring
+
+slow_logger = logging.getLogger('poojapath.mongo')
+
+# Commands whose first field names the collection
+COLLECTION_COMMANDS = {
+    'aggregate', 'count', 'createIndexes', 'delete', 'distinct', 'drop', 'find',
+    'findAndModify', 'insert', 'listIndexes', 'update',
+}
+
+_current_stats = ContextVar('mongo_request_stats', default=None)
+# Lists that record_commands blocks active in this context append to
+_command_logs = ContextVar('mongo_command_logs', default=())
+
+
+class MongoRequestStats:
+    """MongoDB commands issued while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.collections = {}
+        self.started = time.perf_counter()
+
+    def add(self, collection, duration):
+        self.count += 1
+        self.duration += duration
+        count, total = self.collections.get(collection, (0, 0.0))
+        self.collections[collection] = (count + 1, total + duration)
+
+    def server_timing(self, total_duration=None):
+        """Server-Timing header value (durations in milliseconds)"""
+        metrics = []
+        if total_duration is not None:
+            metrics.append(f'app;dur={total_duration * 1000:.1f}')
+        metrics.append(f'mongo;dur={self.duration * 1000:.1f};desc="{self.count} commands"')
+        for collection, (count, duration) in sorted(self.collections.items()):
+            metrics.append(f'mongo.{collection};dur={duration * 1000:.1f};desc="{count} commands"')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'mongo_commands': self.count,
+            'mongo_ms': round(self.duration * 1000, 2),
+            'mongo_collections': {
+                collection: {'commands': count, 'ms': round(duration * 1000, 2)}
+                for collection, (count, duration) in self.collections.items()
+            },
+        }
+
+
+def start_request():
+    """Begin attributing commands to a new request; returns (stats, reset token)"""
+    stats = MongoRequestStats()
+    return stats, _current_stats.set(stats)
+
+
+def end_request(token):
+    _current_stats.reset(token)
+
+
+def current_stats():
+    """Stats of the request being handled in this context, or None"""
+    return _current_stats.get()
+
+
+@contextmanager
+def record_commands(log=None):
+    """Collect (collection, command_name) for every command sent from this context inside the block
+
+    Commands of other threads (e.g. background writers) are not recorded;
+    blocks may be nested, and an outer block also sees the inner one's commands.
+    """
+    log = [] if log is None else log
+    token = _command_logs.set(_command_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _command_logs.reset(token)
+
+
+def redact_shape(value):
+    """Replace every value in a filter with '?', keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: redact_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        branches = [redact_shape(item) for item in value if isinstance(item, dict)]
+        return branches or '?'
+    return '?'
+
+
+def command_collection(command_name, command):
+    if command_name in COLLECTION_COMMANDS:
+        return command.get(command_name)
+    if command_name == 'getMore':
+        return command.get('collection')
+    return None
+
+
+def command_filter(command_name, command):
+    """The filter document of a command, if it has one"""
+    if command_name == 'find':
+        return command.get('filter')
+    if command_name in ('findAndModify', 'count', 'distinct'):
+        return command.get('query')
+    if command_name in ('update', 'delete'):
+        statements = command.get('updates') or command.get('deletes') or []
+        return statements[0].get('q') if statements else None
+    if command_name == 'aggregate':
+        pipeline = command.get('pipeline') or []
+        return pipeline[0].get('$match') if pipeline else None
+    return None
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Attributes command timings to the current request and logs slow commands"""
+
+    def __init__(self, slow_threshold_ms=100):
+        self.slow_threshold = slow_threshold_ms / 1000
+        self._pending = {}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(slow_threshold_ms=getattr(settings, 'MONGODB_SLOW_COMMAND_MS', 100))
+
+    def started(self, event):
+        command_name = event.command_name
+        collection = command_collection(command_name, event.command)
+        if collection is None:
+            # Handshakes, authentication, admin commands
+            collection = command_name
+        else:
+            for log in _command_logs.get():
+                log.append((collection, command_name))
+        filter_document = command_filter(command_name, event.command)
+        self._pending[(event.connection_id, event.request_id)] = (
+            current_stats(),
+            collection,
+            redact_shape(filter_document) if filter_document is not None else None,
+        )
+
+    def _finished(self, event, failure=None):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        stats, collection, shape = pending
+        duration = event.duration_micros / 1e6
+        if stats is not None:
+            stats.add(collection, duration)
+        if duration >= self.slow_threshold:
+            fields = {
+                'command': event.command_name,
+                'collection': collection,
+                'database': event.database_name,
+                'duration_ms': round(duration * 1000, 2),
+                'filter': shape,
+            }
+            if failure is not None:
+                fields['failure'] = failure
+            slow_logger.warning(f'slow mongo command {json.dumps(fields, default=str)}', extra={'mongo_command': fields})
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event, failure=str(event.failure.get('errmsg', event.failure)))
+
+
+command_listener = CommandTimingListener.from_settings()
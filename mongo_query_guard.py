@@ -0,0 +1,357 @@
+"""
+Explain-plan guard for the MongoDB queries of PoojaPath API
+
+``MongoDBHandler.get_collection`` wraps collections in a ``GuardedCollection``
+when MONGODB_QUERY_GUARD is enabled. The first time a query shape is seen
+(collection, filter with values redacted, sort), the guard runs ``explain``
+on it and checks the winning plan for a collection scan (COLLSCAN) or an
+in-memory sort of more than MONGODB_QUERY_GUARD_SORT_DOCS documents. The
+explain uses ``queryPlanner`` verbosity, which plans the query without
+running it; a SORT stage counts as sorting its limit, or the whole collection
+(estimated_document_count) when unbounded. The verdict is cached per shape,
+so each shape costs one explain per process.
+
+Modes:
+
+    off     no checks (default)
+    raise   raise UnindexedQuery (the tests run in this mode)
+    log     log a warning on 'poojapath.mongo' and count the violation in the
+            poojapath_mongo_query_guard_violations_total metric; only a
+            MONGODB_QUERY_GUARD_SAMPLE_RATE fraction of calls with an unchecked
+            shape runs the explain, spreading its cost
+
+Writes are explained as the equivalent find, which selects the same index.
+A find without filter or sort is a deliberate full read and is not checked.
+
+mongomock has no explain. Against it (the test suite's default) the guard
+checks each shape statically against the ``mongo_indexes.MONGO_INDEXES``
+registry instead: the filter must constrain the leading key of a registry
+index (or ``_id``), and a sort must follow an index after the filter's
+equality fields. That catches a query without any supporting index, but not
+a plan where the server would pick a worse index than the registry offers.
+
+Only ``mongo_handler`` (pymongo) collections are guarded; the motor
+collections of ``async_mongo_handler`` are not.
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+
+from django.conf import settings
+from pymongo.errors import OperationFailure
+
+from mongo_monitoring import redact_shape
+
+guard_logger = logging.getLogger('poojapath.mongo')
+
+QUERY_GUARD_MODES = ('off', 'log', 'raise')
+
+# Collection methods taking a filter as their first argument
+FILTER_METHODS = {
+    'count_documents',
+    'delete_many',
+    'delete_one',
+    'find_one',
+    'find_one_and_delete',
+    'find_one_and_replace',
+    'find_one_and_update',
+    'replace_one',
+    'update_many',
+    'update_one',
+}
+
+
+class UnindexedQuery(Exception):
+    """A query whose winning plan scans the collection or sorts in memory"""
+
+
+def sort_document(key_or_list, direction=None):
+    """Normalize the sort argument forms pymongo accepts into a dict"""
+    if key_or_list is None:
+        return None
+    if isinstance(key_or_list, str):
+        return {key_or_list: direction if direction is not None else 1}
+    if isinstance(key_or_list, dict):
+        return dict(key_or_list)
+    return {
+        item if isinstance(item, str) else item[0]: 1 if isinstance(item, str) else item[1]
+        for item in key_or_list
+    }
+
+
+def query_shape(collection_name, query_filter, sort):
+    """Hashable description of a query, without any of its values"""
+    return (
+        collection_name,
+        json.dumps(redact_shape(query_filter or {}), sort_keys=True),
+        json.dumps(list((sort or {}).items())),
+    )
+
+
+def plan_stages(plan):
+    """Every stage of an explain plan (classic, slot-based and sharded formats)"""
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        yield plan
+    for key in ('queryPlan', 'inputStage', 'thenStage', 'elseStage', 'winningPlan'):
+        yield from plan_stages(plan.get(key))
+    for key in ('inputStages', 'shards'):
+        for child in plan.get(key) or []:
+            yield from plan_stages(child)
+
+
+def sort_problem(limit, collection_size, sort_threshold):
+    """The problem of an in-memory sort of at most ``limit`` (or the collection), if too big"""
+    bounds = [bound for bound in (limit, collection_size) if bound]
+    sorted_docs = min(bounds) if bounds else None
+    if sorted_docs is not None and sorted_docs <= sort_threshold:
+        return None
+    return f'in-memory SORT of up to {sorted_docs} documents' if sorted_docs else 'in-memory SORT'
+
+
+def plan_problems(explanation, sort_threshold=0, collection_size=None):
+    """Problems of the winning plan in a queryPlanner explain result, e.g. ['COLLSCAN']
+
+    A SORT stage sorts at most its limitAmount, or the whole collection
+    (``collection_size``, a callable so the count only runs for sort plans).
+    """
+    problems = []
+    stages = list(plan_stages(explanation.get('queryPlanner', {}).get('winningPlan')))
+    if any(stage['stage'] == 'COLLSCAN' for stage in stages):
+        problems.append('COLLSCAN')
+    for stage in stages:
+        if stage['stage'] == 'SORT':
+            limit = stage.get('limitAmount')
+            problem = sort_problem(limit, None if limit or collection_size is None else collection_size(),
+                                   sort_threshold)
+            if problem:
+                problems.append(problem)
+            break
+    return problems
+
+
+def equality_condition(condition):
+    """Whether a filter condition matches one value (so an index can sort after it)"""
+    if isinstance(condition, dict):
+        return set(condition) == {'$eq'}
+    return not isinstance(condition, (re.Pattern, list))
+
+
+def filter_supported(query_filter, leading_keys):
+    """Whether some index whose first key is in ``leading_keys`` can serve the filter"""
+    for field, condition in query_filter.items():
+        if field in leading_keys:
+            return True
+        if field == '$and' and any(filter_supported(branch, leading_keys) for branch in condition):
+            return True
+    branches = query_filter.get('$or')
+    return bool(branches) and all(filter_supported(branch, leading_keys) for branch in branches)
+
+
+def sort_supported(index_keys, query_filter, sort):
+    """Whether the index returns the filter's documents already in ``sort`` order"""
+    equality_fields = {field for field, condition in query_filter.items()
+                       if not field.startswith('$') and equality_condition(condition)}
+    position = 0
+    while position < len(index_keys) and index_keys[position][0] in equality_fields:
+        position += 1
+    if query_filter and position == 0 and index_keys[0][0] not in query_filter:
+        return False
+    following = index_keys[position:position + len(sort)]
+    if [field for field, _ in following] != list(sort):
+        return False
+    same = [direction == sort[field] for field, direction in following]
+    return all(same) or not any(same)
+
+
+def registry_problems(collection_name, query_filter, sort, limit=0, sort_threshold=0):
+    """Problems of a query without an explain: checked against the MONGO_INDEXES registry"""
+    from mongo_indexes import MONGO_INDEXES
+
+    indexes = [[('_id', 1)]] + [list(index.document['key'].items())
+                                 for index in MONGO_INDEXES.get(collection_name, [])]
+    query_filter = query_filter or {}
+    problems = []
+    if query_filter and not filter_supported(query_filter, {keys[0][0] for keys in indexes}):
+        problems.append('COLLSCAN')
+    if sort and not any(sort_supported(keys, query_filter, sort) for keys in indexes):
+        problem = sort_problem(limit, None, sort_threshold)
+        if problem:
+            problems.append(problem)
+    return problems
+
+
+def explain_supported(database):
+    return not type(database).__module__.startswith('mongomock')
+
+
+class QueryGuard:
+    """Explains each new query shape once and reports collection scans and in-memory sorts"""
+
+    def __init__(self, mode='off', sample_rate=1.0, sort_threshold=0):
+        if mode not in QUERY_GUARD_MODES:
+            raise ValueError(f"MONGODB_QUERY_GUARD must be one of: {', '.join(QUERY_GUARD_MODES)}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.sort_threshold = sort_threshold
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            mode=getattr(settings, 'MONGODB_QUERY_GUARD', 'off'),
+            sample_rate=getattr(settings, 'MONGODB_QUERY_GUARD_SAMPLE_RATE', 1.0),
+            sort_threshold=getattr(settings, 'MONGODB_QUERY_GUARD_SORT_DOCS', 0),
+        )
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def wrap(self, collection):
+        if not self.enabled:
+            return collection
+        return GuardedCollection(collection, self)
+
+    def check(self, collection, query_filter, sort=None, limit=0):
+        """Explain the query if its shape is new; raise or log if the plan is unindexed"""
+        if not query_filter and not sort:
+            return
+        shape = query_shape(collection.name, query_filter, sort)
+        problems = self._checked.get(shape)
+        new_shape = problems is None
+        if new_shape:
+            if self.mode == 'log' and random.random() >= self.sample_rate:
+                return
+            problems = self.explain(collection, query_filter, sort, limit)
+            with self._lock:
+                self._checked[shape] = problems
+        if problems:
+            self.report(shape, problems, new_shape)
+
+    def explain(self, collection, query_filter, sort, limit):
+        if not explain_supported(collection.database):
+            return registry_problems(collection.name, query_filter, sort, limit, self.sort_threshold)
+        command = {'find': collection.name, 'filter': query_filter or {}}
+        if sort:
+            command['sort'] = sort
+        if limit:
+            command['limit'] = limit
+        try:
+            explanation = collection.database.command('explain', command, verbosity='queryPlanner')
+        except OperationFailure as e:
+            # e.g. explain not permitted for this user: note it once, then leave the shape alone
+            guard_logger.info(f'Could not explain a query on {collection.name}: {e}')
+            return []
+        return plan_problems(explanation, self.sort_threshold, collection.estimated_document_count)
+
+    def report(self, shape, problems, new_shape):
+        """Raise, or log the shape once and count every execution"""
+        collection_name, filter_shape, sort_shape = shape
+        message = (
+            f"Unindexed query on {collection_name} ({', '.join(problems)}): "
+            f"filter {filter_shape}, sort {sort_shape}"
+        )
+        if self.mode == 'raise':
+            raise UnindexedQuery(message)
+        if new_shape:
+            guard_logger.warning(message)
+        if getattr(settings, 'METRICS_ENABLED', False):
+            from poojapath_api.metrics import MONGO_QUERY_GUARD_VIOLATIONS
+            for problem in problems:
+                MONGO_QUERY_GUARD_VIOLATIONS.labels(collection_name, problem.split(' of ')[0]).inc()
+
+
+class GuardedCursor:
+    """Cursor proxy that checks the query when it is first iterated"""
+
+    def __init__(self, cursor, collection, guard, query_filter, sort=None, limit=0):
+        self._cursor = cursor
+        self._collection = collection
+        self._guard = guard
+        self._filter = query_filter
+        self._sort = sort
+        self._limit = limit
+        self._checked = False
+
+    def sort(self, key_or_list, direction=None):
+        self._cursor.sort(key_or_list, direction)
+        self._sort = sort_document(key_or_list, direction)
+        return self
+
+    def limit(self, limit):
+        self._cursor.limit(limit)
+        self._limit = limit
+        return self
+
+    def _check(self):
+        if not self._checked:
+            self._checked = True
+            self._guard.check(self._collection, self._filter, self._sort, self._limit)
+
+    def __iter__(self):
+        self._check()
+        return self
+
+    def __next__(self):
+        self._check()
+        return next(self._cursor)
+
+    next = __next__
+
+    def __getattr__(self, name):
+        attribute = getattr(self._cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        def chained(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            return self if result is self._cursor else result
+        return chained
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+
+class GuardedCollection:
+    """Collection proxy that passes every query through the QueryGuard first"""
+
+    def __init__(self, collection, guard):
+        self._collection = collection
+        self._guard = guard
+
+    def find(self, filter=None, *args, **kwargs):
+        cursor = self._collection.find(filter, *args, **kwargs)
+        return GuardedCursor(
+            cursor, self._collection, self._guard, filter,
+            sort=sort_document(kwargs.get('sort')), limit=kwargs.get('limit', 0),
+        )
+
+    def distinct(self, key, filter=None, *args, **kwargs):
+        self._guard.check(self._collection, filter)
+        return self._collection.distinct(key, filter, *args, **kwargs)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name not in FILTER_METHODS:
+            return attribute
+
+        def guarded(*args, **kwargs):
+            query_filter = args[0] if args else kwargs.get('filter')
+            self._guard.check(self._collection, query_filter, sort_document(kwargs.get('sort')))
+            return attribute(*args, **kwargs)
+        return guarded
+
+    def __getitem__(self, name):
+        return self._collection[name]
+
+
+query_guard = QueryGuard.from_settings()
@@ -0,0 +1,242 @@
+"""
+Synthetic dataset generator for scale testing
+
+Generates users, OTPs, login sessions and pandits in the shapes written by
+mongo_models, so production-sized collections can be reproduced locally.
+Every batch is generated from its own random stream derived from the seed, the
+collection and the batch position, so a given seed produces the same dataset
+whatever the number of worker processes. Pandit locations follow a Zipf-like
+popularity curve: a few cities hold most pandits, the rest form a long tail.
+
+Creation times are counted back from a fixed end time (SEED_EPOCH unless
+one is given), and _ids are derived from the creation time and the document
+number, so they are deterministic too and sort in creation order like
+ObjectIds assigned by the driver. Re-running with the same arguments therefore
+skips every document already inserted. Login sessions reference the users
+they belong to.
+"""
+
+from datetime import datetime, timedelta
+from itertools import accumulate
+import bisect
+import multiprocessing
+import random
+import struct
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from mongodb_handler import mongo_handler
+from pandit_management.locations import normalize_location
+
+SEED_COLLECTIONS = ('users', 'otps', 'login_sessions', 'pandits')
+SEED_BATCH_SIZE = 10000
+SEED_EMAIL_DOMAIN = 'seed.poojapath.test'
+# Default end of the seeded period; a fixed time keeps _ids stable across runs
+SEED_EPOCH = datetime(2025, 1, 1)
+
+CITIES = [
+    'Varanasi', 'Delhi', 'Mumbai', 'Pune', 'Bengaluru', 'Kolkata', 'Chennai', 'Hyderabad',
+    'Ahmedabad', 'Jaipur', 'Ujjain', 'Haridwar', 'Rishikesh', 'Prayagraj', 'Ayodhya', 'Mathura',
+    'Vrindavan', 'Nashik', 'Puri', 'Tirupati', 'Madurai', 'Dwarka', 'Somnath', 'Gaya',
+    'Lucknow', 'Kanpur', 'Nagpur', 'Indore', 'Bhopal', 'Patna', 'Surat', 'Vadodara',
+    'Rameswaram', 'Kanchipuram', 'Guwahati', 'Bhubaneswar', 'Amritsar', 'Chandigarh', 'Dehradun',
+    'Kochi', 'Thiruvananthapuram', 'Mysuru', 'Udupi', 'Shirdi', 'Kolhapur', 'Pandharpur',
+    'Omkareshwar', 'Pushkar', 'Ajmer', 'Kurukshetra', 'Jammu', 'Shimla', 'Nainital',
+    'Darbhanga', 'Bhagalpur', 'Deoghar', 'Ranchi', 'Raipur', 'Visakhapatnam', 'Vijayawada',
+]
+FIRST_NAMES = [
+    'Ramesh', 'Suresh', 'Mahesh', 'Ganesh', 'Dinesh', 'Rajesh', 'Mukesh', 'Umesh', 'Naresh',
+    'Shiv', 'Hari', 'Krishna', 'Gopal', 'Govind', 'Madhav', 'Keshav', 'Narayan', 'Vishnu',
+    'Shankar', 'Mohan', 'Anil', 'Sunil', 'Vijay', 'Ajay', 'Sanjay', 'Pradeep', 'Deepak',
+]
+SURNAMES = [
+    'Sharma', 'Mishra', 'Tiwari', 'Pandey', 'Shukla', 'Dubey', 'Trivedi', 'Chaturvedi',
+    'Dwivedi', 'Upadhyay', 'Joshi', 'Bhatt', 'Iyer', 'Iyengar', 'Shastri', 'Acharya',
+    'Dixit', 'Pathak', 'Tripathi', 'Awasthi', 'Bajpai', 'Kulkarni', 'Deshpande', 'Rao',
+]
+DEVICE_TYPES = ['mobile', 'web', 'tablet']
+DEVICE_WEIGHTS = [70, 25, 5]
+
+# Leading byte of the non-timestamp part of generated _ids, one per collection
+_ID_TAGS = {name: tag for tag, name in enumerate(SEED_COLLECTIONS, start=1)}
+
+
+class SeedPlan:
+    """Everything that determines a generated dataset
+
+    counts maps each collection in SEED_COLLECTIONS to the number of
+    documents to generate. Documents are created between ``now - days`` and
+    ``now``, which defaults to SEED_EPOCH. That includes OTPs, so seeded OTPs
+    are already expired: with the otps TTL index (MONGODB_OTP_TTL_INDEX)
+    MongoDB deletes them within a minute or so of seeding.
+    """
+
+    def __init__(self, counts, seed=0, locations=len(CITIES), zipf=1.1, days=365,
+                 password_hash='', now=None):
+        self.counts = counts
+        self.seed = seed
+        self.zipf = zipf
+        self.days = days
+        self.password_hash = password_hash
+        self.now = now or SEED_EPOCH
+        self.locations = location_names(locations)
+        # Rank r (1-based) is chosen with probability proportional to 1 / r**zipf
+        self.location_weights = list(accumulate(1 / rank ** zipf for rank in range(1, len(self.locations) + 1)))
+
+    def batches(self, batch_size=SEED_BATCH_SIZE):
+        """(collection_name, start, stop) for every batch to insert"""
+        return [
+            (collection_name, start, min(start + batch_size, self.counts.get(collection_name, 0)))
+            for collection_name in SEED_COLLECTIONS
+            for start in range(0, self.counts.get(collection_name, 0), batch_size)
+        ]
+
+    def random_for(self, collection_name, start):
+        return random.Random(f'{self.seed}:{collection_name}:{start}')
+
+    def created_at(self, collection_name, number):
+        """Creation time of document `number`, spread evenly over the seeded period"""
+        count = max(self.counts.get(collection_name, 0), 1)
+        return self.now - timedelta(days=self.days) * (1 - number / count)
+
+    def location(self, rng):
+        position = rng.random() * self.location_weights[-1]
+        return self.locations[min(bisect.bisect(self.location_weights, position), len(self.locations) - 1)]
+
+    def documents(self, collection_name, start, stop):
+        rng = self.random_for(collection_name, start)
+        build = getattr(self, f'_{collection_name}')
+        return [build(rng, number) for number in range(start, stop)]
+
+    def user_id(self, number):
+        return seed_object_id('users', number, self.created_at('users', number))
+
+    def user_email(self, number):
+        return f'user{number}@{SEED_EMAIL_DOMAIN}'
+
+    def _users(self, rng, number):
+        created_at = self.created_at('users', number)
+        return {
+            '_id': self.user_id(number),
+            'username': f'user{number}',
+            'email': self.user_email(number),
+            'password': self.password_hash,
+            'is_verified': rng.random() < 0.9,
+            'created_at': created_at,
+            'updated_at': created_at + timedelta(seconds=rng.randrange(0, 600)),
+        }
+
+    def _otps(self, rng, number):
+        created_at = self.created_at('otps', number)
+        return {
+            '_id': seed_object_id('otps', number, created_at),
+            'email': self.user_email(rng.randrange(max(self.counts.get('users', 0), 1))),
+            'otp': f'{rng.randrange(1000000):06d}',
+            'purpose': 'signup' if rng.random() < 0.7 else 'forgot_password',
+            'is_used': rng.random() < 0.8,
+            'created_at': created_at,
+        }
+
+    def _login_sessions(self, rng, number):
+        users = max(self.counts.get('users', 0), 1)
+        # Skewed towards recently created users, who log in more often
+        user_number = min(int(users * rng.random() ** 0.5), users - 1)
+        user_created_at = self.created_at('users', user_number)
+        login_time = user_created_at + (self.now - user_created_at) * rng.random()
+        return {
+            '_id': seed_object_id('login_sessions', number, login_time),
+            'user_id': str(self.user_id(user_number)),
+            'device_type': rng.choices(DEVICE_TYPES, DEVICE_WEIGHTS)[0],
+            'login_time': login_time,
+            'is_active': rng.random() < 0.3,
+        }
+
+    def _pandits(self, rng, number):
+        created_at = self.created_at('pandits', number)
+        location = self.location(rng)
+        return {
+            '_id': seed_object_id('pandits', number, created_at),
+            'Pandit_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {number}',
+            'phone': f'{rng.randrange(6, 10)}{rng.randrange(10 ** 9):09d}',
+            'Location': location,
+            'location_key': normalize_location(location),
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+
+def location_names(count):
+    """`count` location names, most popular first; synthetic names extend the city list"""
+    names = CITIES[:count]
+    names += [f'{CITIES[number % len(CITIES)]} {number // len(CITIES) + 1}' for number in range(len(names), count)]
+    return names
+
+
+def seed_object_id(collection_name, number, when):
+    """Deterministic ObjectId: the creation time, then a collection tag and the document number"""
+    timestamp = int((when - datetime(1970, 1, 1)).total_seconds())
+    return ObjectId(struct.pack('>IB', timestamp, _ID_TAGS[collection_name]) + number.to_bytes(7, 'big'))
+
+
+def insert_batch(plan, collection_name, start, stop):
+    """Insert one batch; returns (inserted, duplicates)
+
+    Documents already present (same _id or unique key, e.g. when re-running
+    with the same seed) are skipped.
+    """
+    collection = mongo_handler.get_collection(collection_name)
+    documents = plan.documents(collection_name, start, stop)
+    try:
+        collection.insert_many(documents, ordered=False, bypass_document_validation=True)
+    except BulkWriteError as e:
+        duplicates = sum(1 for error in e.details['writeErrors'] if error['code'] == 11000)
+        if duplicates != len(e.details['writeErrors']):
+            raise
+        return e.details['nInserted'], duplicates
+    return len(documents), 0
+
+
+_worker_plan = None
+
+
+def _init_worker(plan):
+    global _worker_plan
+    import django
+    django.setup()
+    _worker_plan = plan
+
+
+def _insert_task(batch):
+    collection_name, start, stop = batch
+    return (collection_name, stop - start) + insert_batch(_worker_plan, collection_name, start, stop)
+
+
+def seed(plan, workers=1, batch_size=SEED_BATCH_SIZE, progress=None):
+    """Insert every document of the plan, in batches spread over `workers` processes
+
+    ``progress(collection_name, inserted, duplicates)`` is called after each
+    batch. Returns {collection_name: (inserted, duplicates)}.
+    """
+    totals = {name: [0, 0] for name in SEED_COLLECTIONS if plan.counts.get(name)}
+    batches = plan.batches(batch_size)
+    if workers > 1:
+        pool = multiprocessing.Pool(min(workers, len(batches)) or 1, initializer=_init_worker, initargs=(plan,))
+        results = pool.imap_unordered(_insert_task, batches)
+    else:
+        pool = None
+        results = (
+            (name, stop - start) + insert_batch(plan, name, start, stop)
+            for name, start, stop in batches
+        )
+    try:
+        for collection_name, _, inserted, duplicates in results:
+            totals[collection_name][0] += inserted
+            totals[collection_name][1] += duplicates
+            if progress is not None:
+                progress(collection_name, inserted, duplicates)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return {name: tuple(counts) for name, counts in totals.items()}
@@ -0,0 +1,251 @@
+"""
+Test helpers for the MongoDB models
+
+``MongoTestCase`` gives every test a fresh, indexed database (an in-memory
+mongomock database unless MONGODB_TEST_CONNECTION_STRING points at a real
+server), and ``count_mongo_commands`` records the MongoDB commands a block
+sends, as the monitoring listener sees them, so tests can pin the number of
+round trips. mongomock publishes no monitoring events, so against it
+MongoTestCase makes its collections publish the command events a server
+connection would (one per method call; in-memory cursors need no getMore). The
+query guard runs in "raise" mode, so any query without a supporting index
+fails the test: against a real server its explain plan is checked, against
+mongomock its shape is checked statically against the MONGO_INDEXES registry
+(see mongo_query_guard). Queries of the async (motor) views are not guarded.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import itertools
+import logging
+from types import SimpleNamespace
+import time
+import uuid
+
+from decouple import config
+from django.test import SimpleTestCase, override_settings
+from pymongo import monitoring
+
+from mongodb_handler import async_mongo_handler, event_listeners, mongo_handler
+from mongo_cache import pandit_cache
+from mongo_indexes import ensure_indexes
+from mongo_monitoring import command_listener, record_commands
+from mongo_query_guard import query_guard
+from mongo_writers import session_writer
+
+# Wire command sent by each pymongo collection method (the mongomock stand-ins publish these)
+MONGOMOCK_COMMANDS = {
+    'aggregate': 'aggregate',
+    'count_documents': 'aggregate',
+    'create_index': 'createIndexes',
+    'create_indexes': 'createIndexes',
+    'delete_many': 'delete',
+    'delete_one': 'delete',
+    'distinct': 'distinct',
+    'drop': 'drop',
+    'drop_index': 'dropIndexes',
+    'estimated_document_count': 'count',
+    'find': 'find',
+    'find_one': 'find',
+    'find_one_and_delete': 'findAndModify',
+    'find_one_and_replace': 'findAndModify',
+    'find_one_and_update': 'findAndModify',
+    'index_information': 'listIndexes',
+    'insert_many': 'insert',
+    'insert_one': 'insert',
+    'replace_one': 'update',
+    'update_many': 'update',
+    'update_one': 'update',
+}
+BULK_WRITE_COMMANDS = {
+    'InsertOne': 'insert',
+    'ReplaceOne': 'update',
+    'UpdateOne': 'update',
+    'UpdateMany': 'update',
+    'DeleteOne': 'delete',
+    'DeleteMany': 'delete',
+}
+
+_in_mongomock_command = ContextVar('in_mongomock_command', default=False)
+_mongomock_request_ids = itertools.count(1)
+
+
+class CommandLog(list):
+    """List of (collection_name, command_name) tuples recorded by count_mongo_commands"""
+
+    def for_collection(self, collection_name):
+        return [command_name for name, command_name in self if name == collection_name]
+
+    def __str__(self):
+        return '\n'.join(f'{name}.{command_name}' for name, command_name in self) or '(no commands)'
+
+
+@contextmanager
+def count_mongo_commands():
+    """Record the MongoDB commands sent from this context inside the block
+
+    Commands are seen by the monitoring listener (mongo_monitoring), so
+    cursor getMores and the async (motor) views count too. Commands of other
+    threads, e.g. the buffered session writer flushing on its interval, are
+    not part of the request being measured and are not recorded.
+    """
+    with record_commands(CommandLog()) as log:
+        yield log
+
+
+def listeners_for_tests():
+    """The client's listeners, always including the one count_mongo_commands relies on"""
+    listeners = event_listeners()
+    return listeners if command_listener in listeners else [command_listener, *listeners]
+
+
+def command_event_listeners():
+    return [listener for listener in listeners_for_tests() if isinstance(listener, monitoring.CommandListener)]
+
+
+def bulk_write_commands(requests):
+    """One command per run of same-typed requests, as pymongo batches them"""
+    commands = [BULK_WRITE_COMMANDS.get(type(request).__name__, 'bulkWrite') for request in requests]
+    return [command for position, command in enumerate(commands)
+            if position == 0 or commands[position - 1] != command]
+
+
+def publishing(method_name, method):
+    """Wrap a mongomock Collection method to publish the command events a server connection would"""
+
+    @functools.wraps(method)
+    def publish(collection, *args, **kwargs):
+        if _in_mongomock_command.get():
+            # mongomock implements find_one with find, and so on: only the outer call is a command
+            return method(collection, *args, **kwargs)
+        if method_name == 'bulk_write':
+            command_names = bulk_write_commands(args[0] if args else kwargs.get('requests', []))
+        else:
+            command_names = [MONGOMOCK_COMMANDS[method_name]]
+        listeners = command_event_listeners()
+        events = [SimpleNamespace(
+            command_name=command_name,
+            command={command_name: collection.name},
+            connection_id=('mongomock', 0),
+            request_id=next(_mongomock_request_ids),
+            database_name=collection.database.name,
+            duration_micros=0,
+        ) for command_name in command_names]
+        for event in events:
+            for listener in listeners:
+                listener.started(event)
+        token = _in_mongomock_command.set(True)
+        started = time.perf_counter()
+        try:
+            result = method(collection, *args, **kwargs)
+        except Exception as e:
+            for event in events:
+                event.failure = {'errmsg': str(e)}
+                for listener in listeners:
+                    listener.failed(event)
+            raise
+        finally:
+            _in_mongomock_command.reset(token)
+        for event in events:
+            event.duration_micros = int((time.perf_counter() - started) * 1e6)
+            for listener in listeners:
+                listener.succeeded(event)
+        return result
+    publish.original = method
+    return publish
+
+
+@contextmanager
+def mongomock_command_events():
+    """Make mongomock collections (sync, and motor via mongomock_motor) publish command events"""
+    from mongomock.collection import Collection
+
+    for method_name in [*MONGOMOCK_COMMANDS, 'bulk_write']:
+        setattr(Collection, method_name, publishing(method_name, getattr(Collection, method_name)))
+    try:
+        yield
+    finally:
+        for method_name in [*MONGOMOCK_COMMANDS, 'bulk_write']:
+            setattr(Collection, method_name, getattr(Collection, method_name).original)
+
+
+def create_test_client():
+    """A client for the test databases: a real server if configured, otherwise mongomock"""
+    connection_string = config('MONGODB_TEST_CONNECTION_STRING', default='')
+    if connection_string:
+        import pymongo
+        return pymongo.MongoClient(connection_string, event_listeners=listeners_for_tests())
+    import mongomock
+    return mongomock.MongoClient()
+
+
+def create_async_test_database(client, database_name):
+    """The motor database (per event loop) for a test database of create_test_client"""
+    if type(client).__module__.startswith('mongomock'):
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient(mock_mongo_client=client)[database_name]
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(
+        config('MONGODB_TEST_CONNECTION_STRING'), event_listeners=listeners_for_tests()
+    )[database_name]
+
+
+@override_settings(
+    USE_MONGODB=True,
+    EMAIL_OUTBOX_WORKERS=0,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class MongoTestCase(SimpleTestCase):
+    """Runs each test against a fresh MongoDB database with the registry indexes"""
+
+    _client = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if MongoTestCase._client is None:
+            MongoTestCase._client = create_test_client()
+        if type(MongoTestCase._client).__module__.startswith('mongomock'):
+            cls.enterClassContext(mongomock_command_events())
+        # Keep the per-request log lines out of the test output
+        request_logger = logging.getLogger('poojapath.requests')
+        cls._request_log_level = request_logger.level
+        request_logger.setLevel(logging.WARNING)
+        # Any unindexed query fails the test (explained on a real server, checked against the registry on mongomock)
+        cls._query_guard_settings = (query_guard.mode, query_guard.sort_threshold)
+        query_guard.mode, query_guard.sort_threshold = 'raise', 0
+
+    @classmethod
+    def tearDownClass(cls):
+        query_guard.mode, query_guard.sort_threshold = cls._query_guard_settings
+        logging.getLogger('poojapath.requests').setLevel(cls._request_log_level)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.database_name = f'poojapath_test_{uuid.uuid4().hex[:12]}'
+        self.database = self._client[self.database_name]
+        self._previous_database = mongo_handler.use_database(self.database)
+        # The async views (motor) see the same database
+        self._previous_async_database = async_mongo_handler.use_database(
+            functools.partial(create_async_test_database, self._client, self.database_name)
+        )
+        ensure_indexes()
+        pandit_cache.bump_version()
+
+    def tearDown(self):
+        # Write buffered session records into this test's database before it goes away
+        session_writer.flush()
+        mongo_handler.use_database(self._previous_database)
+        async_mongo_handler.use_database(self._previous_async_database)
+        self._client.drop_database(self.database_name)
+        super().tearDown()
+
+    @contextmanager
+    def assertNumMongoCommands(self, expected):
+        """Fail unless exactly ``expected`` MongoDB commands run inside the block"""
+        with count_mongo_commands() as log:
+            yield log
+        if len(log) != expected:
+            self.fail(f'{len(log)} MongoDB commands executed, {expected} expected:\n{log}')
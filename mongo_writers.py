@@ -0,0 +1,142 @@
+"""
+Buffered MongoDB writers for PoojaPath API
+
+For write-only audit records (login sessions) the request path only appends
+the document to a bounded in-process queue; a background thread flushes the
+queue with insert_many once it reaches ``max_batch`` documents or every
+``flush_interval`` seconds. When the queue is full new documents are dropped
+and counted rather than blocking the request. Queued documents are flushed
+when the process exits.
+
+With METRICS_ENABLED the outcome counts and the queue length are exported as
+Prometheus metrics (poojapath_api.metrics).
+"""
+
+import atexit
+from collections import deque
+import logging
+import os
+import threading
+
+from django.conf import settings
+from pymongo.errors import BulkWriteError
+
+from mongodb_handler import mongo_handler
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """Bounded queue of documents flushed to one collection by a background thread"""
+    
+    def __init__(self, collection_name, max_batch=100, flush_interval=1.0, max_queue=10000):
+        self.collection_name = collection_name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        # dropped = overflow (queue full) + documents of failed flushes
+        self._stats = {
+            'enqueued': 0, 'written': 0, 'dropped': 0, 'overflow': 0, 'batches': 0, 'flush_errors': 0,
+        }
+    
+    def _count(self, outcome, count=1):
+        # Called with _condition held
+        if outcome in ('overflow', 'failed'):
+            self._stats['dropped'] += count
+        if outcome != 'failed':
+            self._stats[outcome] += count
+        if getattr(settings, 'METRICS_ENABLED', False):
+            from poojapath_api.metrics import BUFFERED_WRITER_DOCUMENTS, BUFFERED_WRITER_QUEUE_LENGTH
+            BUFFERED_WRITER_DOCUMENTS.labels(self.collection_name, outcome).inc(count)
+            BUFFERED_WRITER_QUEUE_LENGTH.labels(self.collection_name).set(len(self._queue))
+    
+    def write(self, document):
+        """Queue a document; returns False (and counts a drop) when the queue is full"""
+        self._ensure_thread()
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                self._count('overflow')
+                return False
+            self._queue.append(document)
+            self._count('enqueued')
+            if len(self._queue) >= self.max_batch:
+                self._condition.notify()
+        return True
+    
+    def _ensure_thread(self):
+        # Threads do not survive a fork; start one lazily per process
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=f'buffered-writer-{self.collection_name}', daemon=True
+            )
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._queue) < self.max_batch:
+                    self._condition.wait(self.flush_interval)
+            self.flush()
+    
+    def _take_batch(self):
+        with self._condition:
+            count = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(count)]
+    
+    def flush(self):
+        """Write everything queued so far; returns the number of documents written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return written
+                try:
+                    collection = mongo_handler.get_collection(self.collection_name)
+                    collection.insert_many(batch, ordered=False)
+                    inserted = len(batch)
+                except BulkWriteError as e:
+                    # Unordered: every document without a write error was inserted
+                    inserted = e.details.get('nInserted', 0)
+                    logger.error(
+                        f"Failed to flush {len(batch) - inserted} of {len(batch)} documents to "
+                        f"{self.collection_name}: {e.details.get('writeErrors', [{}])[0].get('errmsg')}"
+                    )
+                    with self._condition:
+                        self._stats['flush_errors'] += 1
+                        self._count('failed', len(batch) - inserted)
+                except Exception:
+                    logger.exception(f"Failed to flush {len(batch)} documents to {self.collection_name}")
+                    with self._condition:
+                        self._stats['flush_errors'] += 1
+                        self._count('failed', len(batch))
+                    continue
+                written += inserted
+                with self._condition:
+                    self._count('written', inserted)
+                    self._stats['batches'] += 1
+    
+    def stats(self):
+        with self._condition:
+            return dict(self._stats, queue_depth=len(self._queue), max_queue=self.max_queue)
+
+
+session_writer = BufferedWriter(
+    'login_sessions',
+    max_batch=getattr(settings, 'LOGIN_SESSION_FLUSH_SIZE', 100),
+    flush_interval=getattr(settings, 'LOGIN_SESSION_FLUSH_SECONDS', 1.0),
+    max_queue=getattr(settings, 'LOGIN_SESSION_QUEUE_SIZE', 10000),
+)
+
+# Flush-on-shutdown: gunicorn workers exit through sys.exit, which runs atexit hooks
+atexit.register(session_writer.flush)
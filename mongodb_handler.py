@@ -5,6 +5,10 @@ This module provides direct MongoDB connection for storing user and pandit data
 while Django uses SQLite for its internal operations (migrations, sessions, etc.)
 """
 
+import asyncio
+import os
+import threading
+
 import pymongo
 from django.conf import settings
 from decouple import config
@@ -12,53 +16,202 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+def client_options():
+    """Connection pool, timeout and compression options for MongoClient / motor
+
+    Only options that are set in the environment are passed, so pymongo's
+    defaults (or values in the connection string) apply otherwise.
+    """
+    options = {}
+    for option, env_name in (
+        ('maxPoolSize', 'MONGODB_MAX_POOL_SIZE'),
+        ('minPoolSize', 'MONGODB_MIN_POOL_SIZE'),
+        ('maxIdleTimeMS', 'MONGODB_MAX_IDLE_TIME_MS'),
+        ('waitQueueTimeoutMS', 'MONGODB_WAIT_QUEUE_TIMEOUT_MS'),
+        ('serverSelectionTimeoutMS', 'MONGODB_SERVER_SELECTION_TIMEOUT_MS'),
+        ('connectTimeoutMS', 'MONGODB_CONNECT_TIMEOUT_MS'),
+    ):
+        value = config(env_name, default=None)
+        if value not in (None, ''):
+            options[option] = int(value)
+    compressors = config('MONGODB_COMPRESSORS', default='')
+    if compressors:
+        # e.g. "zstd,snappy,zlib": the first one the server also supports is used
+        options['compressors'] = compressors
+    return options
+
+
+def event_listeners():
+    """Listeners registered on every client (see mongo_monitoring and poojapath_api.metrics)"""
+    listeners = []
+    if getattr(settings, 'MONGODB_COMMAND_MONITORING', True):
+        from mongo_monitoring import command_listener
+        listeners.append(command_listener)
+    if getattr(settings, 'METRICS_ENABLED', False):
+        from poojapath_api.metrics import command_metrics_listener, pool_metrics_listener
+        listeners.extend([command_metrics_listener, pool_metrics_listener])
+    return listeners
+
+
 class MongoDBHandler:
+    """Process-wide access to the MongoDB client
+
+    The client is created lazily on first use, never at import time, so
+    importing the models neither blocks on server selection nor fails when
+    MongoDB is unreachable. Clients are not shared across fork(): a forked
+    child (e.g. a gunicorn worker) drops the inherited client and opens its
+    own on first use.
+    """
+    
     _instance = None
     _client = None
     _database = None
+    _pid = None
+    _lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=cls._instance._reset_after_fork)
         return cls._instance
     
-    def __init__(self):
-        if self._client is None:
-            self.connect()
-    
     def connect(self):
-        """Establish connection to MongoDB"""
+        """Create the client for this process (connections are opened on first operation)"""
+        connection_string = config('MONGODB_CONNECTION_STRING', default='mongodb://localhost:27017')
+        database_name = config('MONGODB_DATABASE_NAME', default='poojapath_db')
+        
         try:
-            connection_string = config('MONGODB_CONNECTION_STRING', default='mongodb://localhost:27017')
-            database_name = config('MONGODB_DATABASE_NAME', default='poojapath_db')
-            
-            self._client = pymongo.MongoClient(connection_string)
-            self._database = self._client[database_name]
-            
-            # Test connection
-            self._client.server_info()
-            logger.info(f"Connected to MongoDB database: {database_name}")
-            
+            if connection_string.startswith('mongomock://'):
+                # In-memory stand-in for tests and local benchmarks (pip install mongomock)
+                import mongomock
+                self._client = mongomock.MongoClient()
+            else:
+                self._client = pymongo.MongoClient(
+                    connection_string, event_listeners=event_listeners(), **client_options()
+                )
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
+            logger.error(f"Failed to create MongoDB client: {e}")
             raise
+        if self._database is None:
+            # Keep a database installed with use_database() (e.g. by a test)
+            self._database = self._client[database_name]
+        self._pid = os.getpid()
+        logger.info(f"MongoDB client created for database {database_name} (pid {self._pid})")
+    
+    def _reset_after_fork(self):
+        # The parent's sockets and monitor threads are unusable here; forget them
+        # without closing (closing would also end the parent's sessions)
+        self._client = None
+        self._database = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def get_client(self):
+        """Get this process's MongoClient, creating it on first use"""
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self.connect()
+        return self._client
     
     def get_database(self):
         """Get the MongoDB database instance"""
-        if self._database is None:
+        if self._database is None or self._pid != os.getpid():
+            self.get_client()
+        return self._database
+    
+    def get_collection(self, collection_name):
+        """Get a specific collection from the database (checked by the query guard when enabled)"""
+        from mongo_query_guard import query_guard
+        return query_guard.wrap(self.get_database()[collection_name])
+    
+    def use_database(self, database):
+        """Point the handler at another database (e.g. a per-test database); returns the previous one"""
+        previous = self._database
+        self._database = database
+        self._pid = os.getpid()
+        return previous
+    
+    def ping(self):
+        """Round trip to the server (for health checks); raises if it is unreachable"""
+        return self.get_client().admin.command('ping')
+    
+    def close_connection(self):
+        """Close the MongoDB connection"""
+        if self._client:
+            self._client.close()
+            self._client = None
+            self._database = None
+            self._pid = None
+
+
+class AsyncMongoDBHandler:
+    """motor counterpart of MongoDBHandler, used by the async views
+
+    The client is created lazily inside the running event loop, because a
+    motor client is bound to the loop it is first used on; a new loop (e.g. a
+    fresh asyncio.run in a script) gets a new client.
+    """
+    
+    def __init__(self):
+        self._client = None
+        self._database = None
+        self._loop = None
+        self._database_factory = None
+    
+    def use_database(self, database_factory):
+        """Build the database with database_factory() instead of from the settings (e.g. a per-test database)
+
+        The factory is called once per event loop; None restores the
+        settings. Returns the previous factory.
+        """
+        previous = self._database_factory
+        self._database_factory = database_factory
+        self._database = None
+        return previous
+    
+    def connect(self):
+        """Create the motor client for the running event loop (no round trip until first use)"""
+        if self._database_factory is not None:
+            self._database = self._database_factory()
+            self._loop = asyncio.get_running_loop()
+            return
+        
+        connection_string = config('MONGODB_CONNECTION_STRING', default='mongodb://localhost:27017')
+        database_name = config('MONGODB_DATABASE_NAME', default='poojapath_db')
+        
+        if connection_string.startswith('mongomock://'):
+            # Share the sync handler's in-memory client so both layers see the same data
+            from mongomock_motor import AsyncMongoMockClient
+            self._client = AsyncMongoMockClient(mock_mongo_client=mongo_handler.get_client())
+        else:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self._client = AsyncIOMotorClient(
+                connection_string, event_listeners=event_listeners(), **client_options()
+            )
+        self._database = self._client[database_name]
+        self._loop = asyncio.get_running_loop()
+    
+    def get_database(self):
+        """Get the motor database for the running event loop"""
+        if self._database is None or self._loop is not asyncio.get_running_loop():
             self.connect()
         return self._database
     
     def get_collection(self, collection_name):
-        """Get a specific collection from the database"""
+        """Get a motor collection; must be called from a coroutine"""
         return self.get_database()[collection_name]
     
     def close_connection(self):
-        """Close the MongoDB connection"""
+        """Close the motor client"""
         if self._client:
             self._client.close()
             self._client = None
             self._database = None
+            self._loop = None
 
-# Global instance
+# Global instances
 mongo_handler = MongoDBHandler()
+async_mongo_handler = AsyncMongoDBHandler()
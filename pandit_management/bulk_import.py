@@ -0,0 +1,176 @@
+"""
+Bulk pandit import from NDJSON or CSV
+
+Rows are parsed lazily from the input stream, validated in batches and written
+with unordered insert_many. Duplicate (Pandit_name, Location) pairs are
+rejected by the unique index rather than a find_one per row, and every row
+that could not be imported is reported with its 1-based row number.
+"""
+
+import codecs
+import csv
+import json
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError
+
+from mongo_cache import pandit_cache
+from mongo_indexes import MONGO_INDEXES, missing_indexes
+from mongodb_handler import mongo_handler
+from .locations import normalize_location
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+# Field name -> max length, mirroring the Pandit model
+PANDIT_FIELDS = {
+    'Pandit_name': 100,
+    'phone': 15,
+    'Location': 100,
+}
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class UniqueIndexMissing(Exception):
+    """The pandits unique (Pandit_name, Location) index does not exist, so duplicates would not be rejected"""
+
+
+def detect_format(filename=None, content_type=None, default='ndjson'):
+    """Guess the import format from a file name or content type"""
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    if content_type and 'csv' in content_type:
+        return 'csv'
+    return default
+
+
+def iter_rows(lines, fmt):
+    """Yield (row_number, row, error) for each data row of a stream of byte lines"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format '{fmt}'")
+    
+    text_lines = codecs.iterdecode(lines, 'utf-8-sig')
+    if fmt == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text_lines), start=1):
+            yield row_number, row, None
+        return
+    
+    row_number = 0
+    for line in text_lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield row_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, 'Row must be a JSON object'
+            continue
+        yield row_number, row, None
+
+
+def validate_row(row):
+    """Return (document, error) for one parsed row"""
+    document = {}
+    for field, max_length in PANDIT_FIELDS.items():
+        value = row.get(field)
+        if value is None or not str(value).strip():
+            return None, f'{field} is required'
+        value = str(value).strip()
+        if len(value) > max_length:
+            return None, f'{field} must be at most {max_length} characters'
+        document[field] = value
+    
+    now = datetime.utcnow()
+    document['location_key'] = normalize_location(document['Location'])
+    document['created_at'] = now
+    document['updated_at'] = now
+    return document, None
+
+
+class PanditImport:
+    """Accumulates validated rows and writes them in unordered batches"""
+    
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, max_reported_errors=IMPORT_MAX_REPORTED_ERRORS):
+        self.batch_size = batch_size
+        self.max_reported_errors = max_reported_errors
+        self.collection = mongo_handler.get_collection('pandits')
+        self.processed = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self._batch = []
+    
+    def check_unique_index(self):
+        """Refuse to import unless duplicate detection is enforced by the database
+
+        Only checks: building indexes (which may drop conflicting ones) is left
+        to ``manage.py ensure_mongo_indexes``, run on every deploy.
+        """
+        unique_index_names = {index.document['name'] for index in MONGO_INDEXES['pandits']
+                              if index.document.get('unique')}
+        if any(index_name in unique_index_names for _, index_name in missing_indexes(['pandits'])):
+            raise UniqueIndexMissing(
+                "The unique (Pandit_name, Location) index on pandits is missing; "
+                "run 'python manage.py ensure_mongo_indexes'"
+            )
+    
+    def add_error(self, row_number, error):
+        self.failed += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({'row': row_number, 'error': error})
+    
+    def add_row(self, row_number, row, error=None):
+        self.processed += 1
+        if error is None:
+            document, error = validate_row(row)
+        if error is not None:
+            self.add_error(row_number, error)
+            return
+        self._batch.append((row_number, document))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Write the pending batch"""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        try:
+            result = self.collection.insert_many([document for _, document in batch], ordered=False)
+            self.inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            self.inserted += e.details.get('nInserted', 0)
+            for write_error in e.details.get('writeErrors', []):
+                row_number = batch[write_error['index']][0]
+                if write_error.get('code') == DUPLICATE_KEY_ERROR:
+                    self.add_error(row_number, 'Pandit with this name and location already exists')
+                else:
+                    self.add_error(row_number, write_error.get('errmsg', 'Write failed'))
+    
+    def report(self):
+        return {
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def import_pandits(lines, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """Import pandits from an iterable of byte lines and return the row report"""
+    pandit_import = PanditImport(batch_size=batch_size)
+    pandit_import.check_unique_index()
+    try:
+        for row_number, row, error in iter_rows(lines, fmt):
+            pandit_import.add_row(row_number, row, error)
+        pandit_import.flush()
+    finally:
+        if pandit_import.inserted:
+            pandit_cache.bump_version()
+    return pandit_import.report()
@@ -0,0 +1,23 @@
+"""
+Location normalization shared by the MongoDB and Django ORM pandit models
+
+Locations are stored as entered, plus a normalized ``location_key`` that is
+indexed and used for lookups, so searches are index seeks rather than scans.
+"""
+
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_location(location):
+    """Case-fold a location, strip diacritics and collapse whitespace"""
+    decomposed = unicodedata.normalize('NFKD', location or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _WHITESPACE.sub(' ', stripped).strip().casefold()
+
+
+def location_prefix_pattern(location):
+    """Anchored regex matching every location_key that starts with the normalized location"""
+    return '^' + re.escape(normalize_location(location))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from mongo_indexes import ensure_indexes
+from mongo_models import MongoPandit
+
+
+class Command(BaseCommand):
+    help = 'Create the pandit indexes and set location_key on existing MongoDB documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for index_name in ensure_indexes(['pandits'])['pandits']:
+            self.stdout.write(f'Index ready: pandits.{index_name}')
+
+        updated = MongoPandit.backfill_location_keys(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Backfilled location_key on {updated} pandits'))
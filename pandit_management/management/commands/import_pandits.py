@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pandit_management.bulk_import import (
+    IMPORT_BATCH_SIZE, IMPORT_FORMATS, UniqueIndexMissing, detect_format, import_pandits
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk import pandits into MongoDB from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file with Pandit_name, phone and Location')
+        parser.add_argument('--format', dest='input_format', choices=IMPORT_FORMATS)
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['input_format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as lines:
+                report = import_pandits(lines, fmt, batch_size=options['batch_size'])
+        except (OSError, ValueError, UnicodeDecodeError, UniqueIndexMissing) as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        if report['errors_truncated']:
+            self.stderr.write(f"... {report['failed'] - len(report['errors'])} more errors not shown")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['processed']} rows: {report['inserted']} inserted, {report['failed']} failed"
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 22:55
+
+from django.db import migrations, models
+
+from pandit_management.locations import normalize_location
+
+
+def backfill_location_keys(apps, schema_editor):
+    Pandit = apps.get_model('pandit_management', 'Pandit')
+    batch = []
+    for pandit in Pandit.objects.only('id', 'Location').iterator():
+        pandit.location_key = normalize_location(pandit.Location)
+        batch.append(pandit)
+        if len(batch) >= 1000:
+            Pandit.objects.bulk_update(batch, ['location_key'])
+            batch = []
+    if batch:
+        Pandit.objects.bulk_update(batch, ['location_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pandit_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pandit',
+            name='location_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_location_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pandit',
+            index=models.Index(fields=['location_key', 'Pandit_name'], name='pandits_locatio_fa29c0_idx'),
+        ),
+    ]
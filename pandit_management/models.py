@@ -1,17 +1,27 @@
 from django.conf import settings
 from django.db import models
 
+from .locations import normalize_location
+
 
 class Pandit(models.Model):
     Pandit_name = models.CharField(max_length=100)
     phone = models.CharField(max_length=15)
     Location = models.CharField(max_length=100)
+    location_key = models.CharField(max_length=100, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'pandits'
         unique_together = ['Pandit_name', 'Location']
+        indexes = [
+            models.Index(fields=['location_key', 'Pandit_name']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.location_key = normalize_location(self.Location)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.Pandit_name} - {self.Location}"
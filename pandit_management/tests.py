@@ -1,3 +1,399 @@
-from django.test import TestCase
+import threading
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from mongo_models import MongoPandit, MongoUser
+from mongo_query_guard import GuardedCollection, QueryGuard, UnindexedQuery, registry_problems
+from mongo_testing import MongoTestCase, count_mongo_commands
+from authentication.views_mongo import generate_jwt_tokens
+from . import views
+
+
+class PanditViewTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        user = MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+        MongoUser.mark_verified('ravi@example.com')
+        self.headers = {'Authorization': f"Bearer {generate_jwt_tokens(user)['access']}"}
+        # The first authenticated request checks the user once; later ones hit the principal cache
+        self.send('delete', '/api/pandit/delete/', {})
+
+    def get(self, path):
+        return self.client.get(path, headers=self.headers)
+
+    def send(self, method, path, data):
+        return getattr(self.client, method)(path, data, content_type='application/json', headers=self.headers)
+
+    def test_first_request_with_a_token_checks_the_user_once(self):
+        user = MongoUser.create_user('asha', 'asha@example.com', 'TestPass123!')
+        MongoUser.mark_verified('asha@example.com')
+        headers = {'Authorization': f"Bearer {generate_jwt_tokens(user)['access']}"}
+
+        def delete_nothing():
+            return self.client.delete('/api/pandit/delete/', {}, content_type='application/json', headers=headers)
+
+        with self.assertNumMongoCommands(1) as log:
+            response = delete_nothing()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(log, [('users', 'find')])
+
+        with self.assertNumMongoCommands(0):
+            delete_nothing()
+
+    def test_add_pandit_checks_for_a_duplicate_and_inserts(self):
+        with self.assertNumMongoCommands(2) as log:
+            response = self.send('post', '/api/pandit/add/', {
+                'Pandit_name': 'Pandit Sharma', 'phone': '9876543210', 'Location': 'Delhi',
+            })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(log, [('pandits', 'find'), ('pandits', 'insert')])
+
+    def test_duplicate_pandit_is_one_lookup(self):
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+
+        with self.assertNumMongoCommands(1):
+            response = self.send('post', '/api/pandit/add/', {
+                'Pandit_name': 'Pandit Sharma', 'phone': '9876543210', 'Location': 'Delhi',
+            })
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_pandit_is_a_lookup_and_a_delete(self):
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+
+        with self.assertNumMongoCommands(2) as log:
+            response = self.send('delete', '/api/pandit/delete/', {
+                'Pandit_name': 'Pandit Sharma', 'Location': 'Delhi',
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [('pandits', 'find'), ('pandits', 'delete')])
+
+    def test_delete_unknown_pandit(self):
+        with self.assertNumMongoCommands(1):
+            response = self.send('delete', '/api/pandit/delete/', {
+                'Pandit_name': 'Pandit Sharma', 'Location': 'Delhi',
+            })
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_is_one_page_query_and_a_count_then_cached(self):
+        for number in range(60):
+            MongoPandit.create_pandit(f'Pandit {number}', '9876543210', 'Delhi')
+
+        with self.assertNumMongoCommands(2) as log:
+            response = self.get('/api/pandit/list/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(log), [('pandits', 'count'), ('pandits', 'find')])
+        self.assertEqual(len(response.json()['pandits']), 50)
+
+        with self.assertNumMongoCommands(0):
+            self.get('/api/pandit/list/')
+
+        # The next page does not recount
+        with self.assertNumMongoCommands(1):
+            response = self.get(f"/api/pandit/list/?cursor={response.json()['next']}")
+        self.assertEqual(len(response.json()['pandits']), 10)
+
+    def test_location_is_one_query_then_cached(self):
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+        MongoPandit.create_pandit('Pandit Verma', '9876543211', 'Dehradun')
+
+        with self.assertNumMongoCommands(1) as log:
+            response = self.get('/api/pandit/location/De/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(log, [('pandits', 'find')])
+        self.assertEqual(response.json()['count'], 2)
+
+        with self.assertNumMongoCommands(0):
+            self.get('/api/pandit/location/De/')
+
+    def bulk_import(self, number_of_rows):
+        rows = ''.join(f'{{"Pandit_name": "Pandit {number}", "phone": "98765", "Location": "Pune"}}\n'
+                       for number in range(number_of_rows))
+        return self.client.post('/api/pandit/bulk-import/', rows,
+                                content_type='application/x-ndjson', headers=self.headers)
+
+    def test_bulk_import_checks_the_unique_index_then_inserts_per_batch(self):
+        with self.assertNumMongoCommands(2) as log:
+            response = self.bulk_import(3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['inserted'], 3)
+        self.assertEqual(log, [('pandits', 'listIndexes'), ('pandits', 'insert')])
+
+    def test_bulk_import_refuses_without_the_unique_index(self):
+        self.database['pandits'].drop_index('Pandit_name_1_Location_1')
+
+        response = self.bulk_import(3)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('ensure_mongo_indexes', response.json()['error'])
+        self.assertEqual(self.database['pandits'].count_documents({}), 0)
+        self.assertNotIn('Pandit_name_1_Location_1', self.database['pandits'].index_information())
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_cache_stats_take_the_metrics_token_and_do_not_touch_mongo(self):
+        self.assertEqual(self.get('/api/pandit/cache/stats/').status_code, 403)
+
+        with self.assertNumMongoCommands(0):
+            response = self.client.get('/api/pandit/cache/stats/', headers={'Authorization': 'Bearer s3cret'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hits', response.json()['cache'])
+
+
+class SqlPanditViewTests(SimpleTestCase):
+    def test_an_unknown_match_mode_is_rejected_like_the_mongo_view(self):
+        request = APIRequestFactory().get('/api/pandit/location/De/', {'match': 'fuzzy'})
+        force_authenticate(request, user=SimpleNamespace(is_authenticated=True))
+
+        response = views.get_pandit_by_location(request, location='De')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': "match must be 'prefix' or 'exact'"})
+
+
+class CountMongoCommandsTests(MongoTestCase):
+    def test_cursor_batches_are_counted(self):
+        for number in range(3):
+            MongoPandit.create_pandit(f'Pandit {number}', '9876543210', 'Pune')
+
+        with self.assertNumMongoCommands(1 if type(self._client).__module__.startswith('mongomock') else 2) as log:
+            self.assertEqual(len(list(self.database['pandits'].find({'location_key': 'pune'}, batch_size=2))), 3)
+
+        self.assertEqual(log.for_collection('pandits')[0], 'find')
+
+    def test_nested_blocks_and_other_threads(self):
+        with count_mongo_commands() as outer:
+            MongoPandit.objects.filter(location_key='pune').count()
+            with count_mongo_commands() as inner:
+                MongoPandit.objects.filter(location_key='delhi').count()
+                thread = threading.Thread(target=MongoPandit.objects.filter(location_key='puri').count)
+                thread.start()
+                thread.join()
+            MongoPandit.objects.filter(location_key='pune').exists()
+
+        self.assertEqual(inner, [('pandits', 'aggregate')])
+        self.assertEqual(outer, [('pandits', 'aggregate'), ('pandits', 'aggregate'), ('pandits', 'find')])
+
+
+class MongoQuerySetTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(10):
+            MongoPandit.create_pandit(f'Pandit {number}', f'98765{number}', 'Pune' if number % 2 else 'Delhi')
+        self.pandits = MongoPandit.objects.order_by('Pandit_name')
+
+    def names(self, queryset):
+        return [pandit.data['Pandit_name'] for pandit in queryset]
+
+    def test_building_a_queryset_does_not_query(self):
+        with self.assertNumMongoCommands(0):
+            MongoPandit.objects.filter(Location='Pune').order_by('-Pandit_name').only('Pandit_name')[2:5]
+
+    def test_slicing_maps_to_skip_and_limit(self):
+        with self.assertNumMongoCommands(1):
+            self.assertEqual(self.names(self.pandits[2:5]), ['Pandit 2', 'Pandit 3', 'Pandit 4'])
+
+        self.assertEqual(self.names(self.pandits[2:5][1:]), ['Pandit 3', 'Pandit 4'])
+        self.assertEqual(self.names(self.pandits[8:]), ['Pandit 8', 'Pandit 9'])
+        self.assertEqual(self.names(self.pandits[5:5]), [])
+        self.assertEqual(self.pandits[3].data['Pandit_name'], 'Pandit 3')
+        with self.assertRaises(IndexError):
+            self.pandits[2:5][3]
+        with self.assertRaises(ValueError):
+            self.pandits[-1]
+
+    def test_count_runs_on_the_server(self):
+        with self.assertNumMongoCommands(1) as log:
+            self.assertEqual(MongoPandit.objects.filter(location_key='pune').count(), 5)
+        self.assertEqual(log, [('pandits', 'aggregate')])
+
+        self.assertEqual(self.pandits[3:].count(), 7)
+        self.assertEqual(self.pandits[3:5].count(), 2)
+        with self.assertNumMongoCommands(0):
+            self.assertEqual(self.pandits[3:3].count(), 0)
+
+    def test_get(self):
+        with self.assertNumMongoCommands(1):
+            pandit = MongoPandit.objects.get(Pandit_name='Pandit 4')
+        self.assertEqual(pandit.data['Location'], 'Delhi')
+
+        with self.assertRaises(ObjectDoesNotExist):
+            MongoPandit.objects.get(Pandit_name='Pandit 42')
+        with self.assertRaises(MultipleObjectsReturned):
+            MongoPandit.objects.get(location_key='pune')
+
+    def test_update_is_one_update_many(self):
+        with self.assertNumMongoCommands(1) as log:
+            updated = MongoPandit.objects.filter(location_key='pune').update(phone='0')
+        self.assertEqual(log, [('pandits', 'update')])
+
+        self.assertEqual(updated, 5)
+        self.assertEqual(MongoPandit.objects.filter(location_key='pune', phone='0').count(), 5)
+
+    def test_delete_is_one_delete_many(self):
+        with self.assertNumMongoCommands(1) as log:
+            deleted = MongoPandit.objects.filter(Pandit_name__in=['Pandit 1', 'Pandit 2']).delete()
+        self.assertEqual(log, [('pandits', 'delete')])
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(MongoPandit.objects.count(), 8)
+
+    def test_sliced_queryset_cannot_be_updated_or_deleted(self):
+        with self.assertRaises(TypeError):
+            self.pandits[:2].delete()
+        with self.assertRaises(TypeError):
+            self.pandits[:2].update(phone='0')
+
+
+class MongoModelSaveTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+        self.pandit = MongoPandit.objects.get(Pandit_name='Pandit Sharma')
+
+    def stored(self):
+        return MongoPandit.objects.get(Pandit_name='Pandit Sharma').data
+
+    def test_save_without_changes_does_not_write(self):
+        self.pandit.data['phone'] = '9876543210'
+
+        with self.assertNumMongoCommands(0):
+            self.assertFalse(self.pandit.save())
+        self.assertFalse(self.pandit.is_dirty)
+
+    def test_changed_field_is_the_only_one_set(self):
+        self.pandit.data['phone'] = '1111111111'
+
+        update = self.pandit.pending_update()
+        self.assertEqual(set(update), {'$set'})
+        self.assertEqual(set(update['$set']), {'phone', 'updated_at'})
+        self.assertEqual(update['$set']['phone'], '1111111111')
+
+        with self.assertNumMongoCommands(1) as log:
+            self.assertTrue(self.pandit.save())
+        self.assertEqual(log, [('pandits', 'update')])
+        self.assertEqual(self.stored()['phone'], '1111111111')
+        self.assertFalse(self.pandit.is_dirty)
+        with self.assertNumMongoCommands(0):
+            self.assertFalse(self.pandit.save())
+
+    def test_removed_field_is_unset(self):
+        del self.pandit.data['phone']
+
+        update = self.pandit.pending_update()
+        self.assertEqual(update['$unset'], {'phone': ''})
+        self.assertEqual(set(update['$set']), {'updated_at'})
+
+        self.assertTrue(self.pandit.save())
+        self.assertNotIn('phone', self.stored())
+        self.assertEqual(self.stored()['Location'], 'Delhi')
+
+
+class ExplainingDatabase:
+    """Answers explain with a canned plan, standing in for a server (mongomock cannot explain)"""
+
+    def __init__(self, winning_plan):
+        self.explanation = {'queryPlanner': {'winningPlan': winning_plan}}
+        self.explained = []
+        self.verbosities = []
+
+    def command(self, name, command, verbosity=None):
+        self.explained.append(command)
+        self.verbosities.append(verbosity)
+        return self.explanation
+
+
+class QueryGuardTests(SimpleTestCase):
+    def guarded(self, guard, winning_plan, collection_size=0):
+        database = ExplainingDatabase(winning_plan)
+        collection = SimpleNamespace(name='pandits', database=database, find_one=lambda *args, **kwargs: None,
+                                     estimated_document_count=lambda: collection_size)
+        return GuardedCollection(collection, guard), database
+
+    def test_collection_scan_raises_and_each_shape_is_explained_once(self):
+        pandits, database = self.guarded(QueryGuard(mode='raise'), {'stage': 'COLLSCAN'})
+
+        for location in ('Delhi', 'Pune'):
+            with self.assertRaisesRegex(UnindexedQuery, 'COLLSCAN'):
+                pandits.find_one({'Location': location})
+
+        self.assertEqual(database.explained, [{'find': 'pandits', 'filter': {'Location': 'Delhi'}}])
+
+    def test_explain_only_plans_the_query(self):
+        pandits, database = self.guarded(QueryGuard(mode='raise'), {'stage': 'IXSCAN'})
+
+        pandits.find_one({'location_key': 'delhi'})
+
+        self.assertEqual(database.verbosities, ['queryPlanner'])
+
+    def test_in_memory_sort_above_the_threshold(self):
+        # Slot-based explain output nests the classic plan under queryPlan
+        plan = {'queryPlan': {'stage': 'SORT', 'inputStage': {'stage': 'IXSCAN'}}}
+        pandits, _ = self.guarded(QueryGuard(mode='raise', sort_threshold=100), plan, collection_size=100)
+        pandits.find_one({'location_key': 'delhi'}, sort=[('phone', 1)])
+
+        pandits, _ = self.guarded(QueryGuard(mode='raise', sort_threshold=100), plan, collection_size=101)
+        with self.assertRaisesRegex(UnindexedQuery, 'in-memory SORT of up to 101 documents'):
+            pandits.find_one({'location_key': 'delhi'}, sort=[('phone', 1)])
+
+    def test_limited_sort_only_counts_its_limit(self):
+        plan = {'stage': 'SORT', 'limitAmount': 20, 'inputStage': {'stage': 'IXSCAN'}}
+        pandits, _ = self.guarded(QueryGuard(mode='raise', sort_threshold=100), plan, collection_size=10 ** 6)
+
+        pandits.find_one({'location_key': 'delhi'}, sort=[('phone', 1)])
+
+    def test_log_mode_logs_each_shape_once(self):
+        pandits, _ = self.guarded(QueryGuard(mode='log'), {'stage': 'COLLSCAN'})
+
+        with self.assertLogs('poojapath.mongo', level='WARNING') as logs:
+            pandits.find_one({'Location': 'Delhi'})
+            pandits.find_one({'Location': 'Pune'})
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('filter {"Location": "?"}', logs.output[0])
+
+    def test_indexed_lookup_passes(self):
+        pandits, _ = self.guarded(QueryGuard(mode='raise'), {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}})
+
+        pandits.find_one({'location_key': 'delhi'})
+
+
+class RegistryCheckTests(SimpleTestCase):
+    """The query guard against mongomock, which cannot explain: queries are checked against MONGO_INDEXES"""
+
+    def test_filter_needs_the_leading_key_of_an_index(self):
+        self.assertEqual(registry_problems('pandits', {'Location': 'Delhi'}, None), ['COLLSCAN'])
+        self.assertEqual(registry_problems('pandits', {'location_key': {'$regex': '^de'}}, None), [])
+        self.assertEqual(registry_problems('pandits', {'_id': {'$in': [1, 2]}, 'phone': '1'}, None), [])
+        self.assertEqual(registry_problems('pandits', {'$or': [{'location_key': 'pune'}, {'phone': '1'}]}, None),
+                         ['COLLSCAN'])
+
+    def test_sort_must_follow_an_index_after_the_equality_fields(self):
+        otp_filter = {'email': 'ravi@example.com', 'purpose': 'signup', 'is_used': False}
+        self.assertEqual(registry_problems('otps', otp_filter, {'created_at': -1}), [])
+        self.assertEqual(registry_problems('otps', otp_filter, {'created_at': 1}), [])
+        self.assertEqual(registry_problems('pandits', {'location_key': 'pune'}, {'Pandit_name': 1}), [])
+        self.assertEqual(registry_problems('pandits', {'location_key': {'$regex': '^p'}}, {'Pandit_name': 1}),
+                         ['in-memory SORT'])
+        self.assertEqual(registry_problems('pandits', {'location_key': 'pune'}, {'phone': 1}, limit=10,
+                                           sort_threshold=10), [])
+
+    def test_guarded_mongomock_collection_raises(self):
+        import mongomock
+
+        pandits = GuardedCollection(mongomock.MongoClient().db.pandits, QueryGuard(mode='raise'))
+
+        with self.assertRaisesRegex(UnindexedQuery, 'COLLSCAN'):
+            pandits.find_one({'phone': '9876543210'})
+        with self.assertRaisesRegex(UnindexedQuery, 'in-memory SORT'):
+            list(pandits.find({'location_key': 'pune'}).sort('phone'))
+        self.assertIsNone(pandits.find_one({'location_key': 'pune'}))
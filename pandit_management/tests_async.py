@@ -0,0 +1,164 @@
+from asgiref.sync import async_to_sync
+from django.test import override_settings
+from django.urls import include, path
+
+from mongo_models import MongoPandit, MongoUser
+from mongo_testing import MongoTestCase
+from authentication.views_mongo import generate_jwt_tokens
+from . import urls, views_async
+
+# The async views, as pandit_management.urls serves them with USE_ASYNC_VIEWS=True
+urlpatterns = [
+    path('api/pandit/', include(urls.view_urlpatterns(views_async))),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, USE_ASYNC_VIEWS=True)
+class AsyncPanditViewTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        user = MongoUser.create_user('ravi', 'ravi@example.com', 'TestPass123!')
+        MongoUser.mark_verified('ravi@example.com')
+        self.headers = {'Authorization': f"Bearer {generate_jwt_tokens(user)['access']}"}
+
+    async def get(self, path, **kwargs):
+        kwargs.setdefault('headers', self.headers)
+        return await self.async_client.get(path, **kwargs)
+
+    async def send(self, method, path, data, content_type='application/json'):
+        return await getattr(self.async_client, method)(path, data, content_type=content_type, headers=self.headers)
+
+    async def test_add_pandit(self):
+        response = await self.send('post', '/api/pandit/add/', {
+            'Pandit_name': 'Pandit Sharma', 'phone': '9876543210', 'Location': 'Delhi',
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['message'], 'Pandit added successfully')
+        self.assertEqual(response.json()['pandit']['Location'], 'Delhi')
+        self.assertIsNotNone(MongoPandit.get_by_name_and_location('Pandit Sharma', 'Delhi'))
+
+    async def test_add_pandit_failures(self):
+        response = await self.send('post', '/api/pandit/add/', {'Pandit_name': 'Pandit Sharma'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Pandit_name, phone, and Location are required'})
+
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+        response = await self.send('post', '/api/pandit/add/', {
+            'Pandit_name': 'Pandit Sharma', 'phone': '9876543210', 'Location': 'Delhi',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Pandit with this name and location already exists'})
+
+    async def test_delete_pandit(self):
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+
+        response = await self.send('delete', '/api/pandit/delete/', {'Pandit_name': 'Pandit Sharma', 'Location': 'Delhi'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'Pandit deleted successfully'})
+        self.assertIsNone(MongoPandit.get_by_name_and_location('Pandit Sharma', 'Delhi'))
+
+    async def test_delete_pandit_with_a_form_encoded_body(self):
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+
+        response = await self.send('delete', '/api/pandit/delete/', 'Pandit_name=Pandit+Sharma&Location=Delhi',
+                                   content_type='application/x-www-form-urlencoded')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(MongoPandit.get_by_name_and_location('Pandit Sharma', 'Delhi'))
+
+    async def test_delete_pandit_failures(self):
+        response = await self.send('delete', '/api/pandit/delete/', {'Pandit_name': 'Pandit Sharma'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Pandit_name and Location are required'})
+
+        response = await self.send('delete', '/api/pandit/delete/', {'Pandit_name': 'Pandit Sharma', 'Location': 'Delhi'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Pandit not found'})
+
+    async def test_list_pandits(self):
+        for number in range(60):
+            MongoPandit.create_pandit(f'Pandit {number}', '9876543210', 'Delhi')
+
+        response = await self.get('/api/pandit/list/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((len(body['pandits']), body['count']), (50, 60))
+
+        response = await self.get(f"/api/pandit/list/?cursor={body['next']}")
+        self.assertEqual(len(response.json()['pandits']), 10)
+        self.assertIsNone(response.json()['next'])
+
+    async def test_list_pandits_failures(self):
+        response = await self.get('/api/pandit/list/?limit=many')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'limit must be an integer'})
+
+        response = await self.get('/api/pandit/list/?cursor=nonsense')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_pandits_by_location(self):
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+        MongoPandit.create_pandit('Pandit Verma', '9876543211', 'Dehradun')
+
+        response = await self.get('/api/pandit/location/De/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['count'], response.json()['location']), (2, 'De'))
+
+        response = await self.get('/api/pandit/location/Delhi/?match=exact')
+        self.assertEqual(response.json()['count'], 1)
+
+        response = await self.get('/api/pandit/location/De/?match=fuzzy')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': "match must be 'prefix' or 'exact'"})
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    async def test_synchronous_routes(self):
+        response = await self.async_client.get('/api/pandit/cache/stats/', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.async_client.post('/api/pandit/bulk-import/',
+                                                '{"Pandit_name": "Pandit 1", "phone": "98765", "Location": "Pune"}\n',
+                                                content_type='application/x-ndjson', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['inserted'], 1)
+
+    async def test_every_route_requires_a_token(self):
+        for method, path in [
+            ('post', '/api/pandit/add/'),
+            ('delete', '/api/pandit/delete/'),
+            ('get', '/api/pandit/list/'),
+            ('get', '/api/pandit/location/Delhi/'),
+            ('post', '/api/pandit/bulk-import/'),
+        ]:
+            response = await getattr(self.async_client, method)(path)
+            self.assertEqual(response.status_code, 401, path)
+            self.assertEqual(response.json(), {'detail': 'Authentication credentials were not provided.'})
+            self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+        response = await self.async_client.get('/api/pandit/list/', headers={'Authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+        # Cache statistics take the metrics token, not a user's
+        with self.settings(METRICS_TOKEN='s3cret'):
+            response = await self.get('/api/pandit/cache/stats/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_responses_match_the_sync_views(self):
+        MongoPandit.create_pandit('Pandit Sharma', '9876543210', 'Delhi')
+        MongoPandit.create_pandit('Pandit Verma', '9876543211', 'Dehradun')
+
+        for path in ('/api/pandit/list/', '/api/pandit/location/De/', '/api/pandit/list/?limit=x'):
+            async_response = async_to_sync(self.get)(path)
+            with self.settings(ROOT_URLCONF='poojapath_api.urls', USE_ASYNC_VIEWS=False):
+                sync_response = self.client.get(path, headers=self.headers)
+            self.assertEqual(async_response.status_code, sync_response.status_code)
+            # Same bytes, including the microsecond precision of the created_at timestamps
+            self.assertEqual(async_response.content, sync_response.content)
+
+        async_response = async_to_sync(self.async_client.get)('/api/pandit/list/')
+        with self.settings(ROOT_URLCONF='poojapath_api.urls', USE_ASYNC_VIEWS=False):
+            sync_response = self.client.get('/api/pandit/list/')
+        self.assertEqual(async_response.content, sync_response.content)
@@ -1,9 +1,23 @@
+from django.conf import settings
 from django.urls import path
-from . import views_mongo as views
-
-urlpatterns = [
-    path('add/', views.add_pandit, name='add_pandit'),
-    path('delete/', views.delete_pandit, name='delete_pandit'),
-    path('list/', views.list_pandits, name='list_pandits'),
-    path('location/<str:location>/', views.get_pandit_by_location, name='get_pandit_by_location'),
-]
+
+# Async (motor) views for ASGI deployments, sync DRF views otherwise
+if getattr(settings, 'USE_ASYNC_VIEWS', False):
+    from . import views_async as views
+else:
+    from . import views_mongo as views
+
+
+def view_urlpatterns(views):
+    """The routes of this app, served by views_mongo or views_async"""
+    return [
+        path('add/', views.add_pandit, name='add_pandit'),
+        path('bulk-import/', views.bulk_import_pandits, name='bulk_import_pandits'),
+        path('delete/', views.delete_pandit, name='delete_pandit'),
+        path('list/', views.list_pandits, name='list_pandits'),
+        path('location/<str:location>/', views.get_pandit_by_location, name='get_pandit_by_location'),
+        path('cache/stats/', views.pandit_cache_stats, name='pandit_cache_stats'),
+    ]
+
+
+urlpatterns = view_urlpatterns(views)
@@ -10,6 +10,7 @@ if getattr(settings, 'USE_MONGODB', False):
 else:
     from .models import Pandit
 
+from .locations import normalize_location
 from .serializers import PanditSerializer, PanditDeleteSerializer
 
 
@@ -71,8 +72,18 @@ def list_pandits(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_pandit_by_location(request, location):
-    """Get pandits by location"""
-    pandits = Pandit.objects.filter(Location__icontains=location)
+    """Get pandits by location (prefix match by default, ``?match=exact`` for exact)"""
+    match = request.query_params.get('match', 'prefix')
+    if match not in ('prefix', 'exact'):
+        return Response({
+            'error': "match must be 'prefix' or 'exact'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    location_key = normalize_location(location)
+    if match == 'exact':
+        pandits = Pandit.objects.filter(location_key=location_key)
+    else:
+        pandits = Pandit.objects.filter(location_key__startswith=location_key)
+    pandits = pandits.order_by('location_key', 'Pandit_name')
     serializer = PanditSerializer(pandits, many=True)
     return Response({
         'pandits': serializer.data,
@@ -0,0 +1,123 @@
+"""
+Async versions of the MongoDB pandit views
+
+Served instead of ``views_mongo`` when USE_ASYNC_VIEWS is enabled (see
+``authentication.views_async``). Bulk import and cache stats stay
+synchronous: the import is CPU/stream bound and the stats never touch
+MongoDB, and Django runs sync views in a worker thread under ASGI.
+"""
+
+from rest_framework import status
+from authentication.authentication import jwt_required
+from authentication.decorators import JsonApiResponse, async_api_view
+from mongo_models import PANDIT_PAGE_SIZE
+from mongo_models_async import AsyncMongoPandit
+# Re-exported for urls.py; these stay synchronous
+from .views_mongo import bulk_import_pandits, pandit_cache_stats  # noqa: F401
+
+
+@async_api_view(['POST'])
+@jwt_required
+async def add_pandit(request):
+    """Add a new pandit using MongoDB (async)"""
+    pandit_name = request.data.get('Pandit_name')
+    phone = request.data.get('phone')
+    location = request.data.get('Location')
+    
+    if not all([pandit_name, phone, location]):
+        return JsonApiResponse({
+            'error': 'Pandit_name, phone, and Location are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        pandit = await AsyncMongoPandit.acreate_pandit(
+            pandit_name=pandit_name,
+            phone=phone,
+            location=location
+        )
+        
+        return JsonApiResponse({
+            'message': 'Pandit added successfully',
+            'pandit': pandit.to_dict()
+        }, status=status.HTTP_201_CREATED)
+    
+    except ValueError as e:
+        return JsonApiResponse({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['DELETE'])
+@jwt_required
+async def delete_pandit(request):
+    """Delete a pandit by name and location using MongoDB (async)"""
+    pandit_name = request.data.get('Pandit_name')
+    location = request.data.get('Location')
+    
+    if not all([pandit_name, location]):
+        return JsonApiResponse({
+            'error': 'Pandit_name and Location are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    pandit = await AsyncMongoPandit.aget_by_name_and_location(pandit_name, location)
+    
+    if not pandit:
+        return JsonApiResponse({
+            'error': 'Pandit not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    await pandit.adelete()
+    
+    return JsonApiResponse({
+        'message': 'Pandit deleted successfully'
+    }, status=status.HTTP_200_OK)
+
+
+@async_api_view(['GET'])
+@jwt_required
+async def list_pandits(request):
+    """List pandits one page at a time using MongoDB (async)"""
+    cursor = request.query_params.get('cursor')
+    
+    try:
+        limit = int(request.query_params.get('limit', PANDIT_PAGE_SIZE))
+    except ValueError:
+        return JsonApiResponse({
+            'error': 'limit must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        pandits, next_cursor = await AsyncMongoPandit.aget_page(cursor=cursor, limit=limit)
+    except ValueError as e:
+        return JsonApiResponse({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return JsonApiResponse({
+        'message': 'Pandits retrieved successfully',
+        'pandits': [pandit.to_dict() for pandit in pandits],
+        'count': await AsyncMongoPandit.acount(),
+        'next': next_cursor
+    }, status=status.HTTP_200_OK)
+
+
+@async_api_view(['GET'])
+@jwt_required
+async def get_pandit_by_location(request, location):
+    """Get pandits by location using MongoDB (async); ``?match=prefix|exact``"""
+    match = request.query_params.get('match', 'prefix')
+    if match not in ('prefix', 'exact'):
+        return JsonApiResponse({
+            'error': "match must be 'prefix' or 'exact'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    pandits = await AsyncMongoPandit.aget_by_location(location, prefix=match == 'prefix')
+    pandit_data = [pandit.to_dict() for pandit in pandits]
+    
+    return JsonApiResponse({
+        'message': f'Pandits in {location} retrieved successfully',
+        'pandits': pandit_data,
+        'count': len(pandit_data),
+        'location': location
+    }, status=status.HTTP_200_OK)
+
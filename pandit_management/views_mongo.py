@@ -1,8 +1,11 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from mongo_models import MongoPandit
+from mongo_cache import pandit_cache
+from poojapath_api.permissions import HasMetricsToken
+from .bulk_import import IMPORT_FORMATS, UniqueIndexMissing, detect_format, import_pandits
+from mongo_models import MongoPandit, PANDIT_PAGE_SIZE
 
 
 @api_view(['POST'])
@@ -36,6 +39,54 @@ def add_pandit(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_import_pandits(request):
+    """Import many pandits from an NDJSON or CSV upload using MongoDB
+
+    Accepts either a multipart ``file`` field or the raw request body. The format
+    is taken from ``?input_format=ndjson|csv`` or guessed from the file name /
+    content type.
+    """
+    if request.content_type.startswith('multipart/form-data'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'error': 'file is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        lines = upload
+        fmt = detect_format(upload.name, upload.content_type)
+    else:
+        lines = request.stream
+        if lines is None:
+            return Response({
+                'error': 'Request body is empty'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        fmt = detect_format(content_type=request.content_type)
+    
+    fmt = request.query_params.get('input_format', fmt)
+    if fmt not in IMPORT_FORMATS:
+        return Response({
+            'error': f"input_format must be one of: {', '.join(IMPORT_FORMATS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        report = import_pandits(lines, fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except UniqueIndexMissing as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    return Response({
+        'message': 'Pandit import finished',
+        **report
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_pandit(request):
@@ -65,22 +116,48 @@ def delete_pandit(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_pandits(request):
-    """List all pandits using MongoDB"""
-    pandits = MongoPandit.get_all()
+    """List pandits one page at a time using MongoDB"""
+    cursor = request.query_params.get('cursor')
+    
+    try:
+        limit = int(request.query_params.get('limit', PANDIT_PAGE_SIZE))
+    except ValueError:
+        return Response({
+            'error': 'limit must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        pandits, next_cursor = MongoPandit.get_page(cursor=cursor, limit=limit)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     pandit_data = [pandit.to_dict() for pandit in pandits]
     
     return Response({
         'message': 'Pandits retrieved successfully',
         'pandits': pandit_data,
-        'count': len(pandit_data)
+        'count': MongoPandit.count(),
+        'next': next_cursor
     }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_pandit_by_location(request, location):
-    """Get pandits by location using MongoDB"""
-    pandits = MongoPandit.get_by_location(location)
+    """Get pandits by location using MongoDB
+
+    ``?match=prefix`` (default) returns every location starting with the given
+    text, ``?match=exact`` only the location itself; both ignore case and accents.
+    """
+    match = request.query_params.get('match', 'prefix')
+    if match not in ('prefix', 'exact'):
+        return Response({
+            'error': "match must be 'prefix' or 'exact'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    pandits = MongoPandit.get_by_location(location, prefix=match == 'prefix')
     pandit_data = [pandit.to_dict() for pandit in pandits]
     
     return Response({
@@ -89,3 +166,17 @@ def get_pandit_by_location(request, location):
         'count': len(pandit_data),
         'location': location
     }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([HasMetricsToken])
+def pandit_cache_stats(request):
+    """Hit/miss/eviction counters of this process's pandit read cache
+
+    Operational data, so it takes the METRICS_TOKEN like /metrics rather than
+    a user's JWT.
+    """
+    return Response({
+        'cache': pandit_cache.stats()
+    }, status=status.HTTP_200_OK)
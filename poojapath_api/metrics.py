@@ -0,0 +1,177 @@
+"""
+Prometheus metrics for PoojaPath API
+
+HTTP metrics are recorded by ``MetricsMiddleware`` (poojapath_api.middleware)
+and MongoDB command / connection pool metrics by the listeners below, which
+``MongoDBHandler`` registers on every client. ``/metrics`` serves them.
+
+Under gunicorn every worker is a separate process: with PROMETHEUS_MULTIPROC_DIR
+set (gunicorn.conf.py does this) each process writes its samples to that
+directory and ``/metrics`` aggregates all of them, so any worker can answer a
+scrape with the totals for the whole server.
+"""
+
+import os
+
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+from mongo_monitoring import command_collection
+from .permissions import has_metrics_token
+
+NAMESPACE = 'poojapath'
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by route, method and status code',
+    ['route', 'method', 'status'], namespace=NAMESPACE,
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route and method',
+    ['route', 'method'], namespace=NAMESPACE,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'HTTP requests currently being handled',
+    ['route', 'method'], namespace=NAMESPACE, multiprocess_mode='livesum',
+)
+
+MONGO_COMMANDS = Counter(
+    'mongo_commands_total', 'MongoDB commands by collection, command and outcome',
+    ['collection', 'command', 'outcome'], namespace=NAMESPACE,
+)
+MONGO_COMMAND_DURATION = Histogram(
+    'mongo_command_duration_seconds', 'MongoDB command latency by collection and command',
+    ['collection', 'command'], namespace=NAMESPACE,
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, float('inf')),
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    'mongo_pool_connections', 'Open MongoDB connections',
+    ['address'], namespace=NAMESPACE, multiprocess_mode='livesum',
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    'mongo_pool_checked_out_connections', 'MongoDB connections currently in use',
+    ['address'], namespace=NAMESPACE, multiprocess_mode='livesum',
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    'mongo_pool_checkout_failures_total', 'Failed connection checkouts (e.g. wait queue timeouts)',
+    ['address', 'reason'], namespace=NAMESPACE,
+)
+BUFFERED_WRITER_DOCUMENTS = Counter(
+    'buffered_writer_documents_total',
+    'Documents handled by the buffered writers by outcome (enqueued, written, overflow, failed)',
+    ['collection', 'outcome'], namespace=NAMESPACE,
+)
+BUFFERED_WRITER_QUEUE_LENGTH = Gauge(
+    'buffered_writer_queue_length', 'Documents waiting in the buffered writer queues',
+    ['collection'], namespace=NAMESPACE, multiprocess_mode='livesum',
+)
+EMAIL_OUTBOX_DELIVERIES = Counter(
+    'email_outbox_deliveries_total', 'Outbox email send attempts by outcome (sent, retried, failed)',
+    ['outcome'], namespace=NAMESPACE,
+)
+EMAIL_OUTBOX_DELIVERY_LATENCY = Histogram(
+    'email_outbox_delivery_latency_seconds', 'Time from enqueueing an outbox email to delivering it',
+    namespace=NAMESPACE,
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, float('inf')),
+)
+MONGO_QUERY_GUARD_VIOLATIONS = Counter(
+    'mongo_query_guard_violations_total', 'Query executions whose plan scans the collection or sorts in memory',
+    ['collection', 'problem'], namespace=NAMESPACE,
+)
+
+
+class MetricsCommandListener(monitoring.CommandListener):
+    """Counts MongoDB commands and observes their latency"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = (
+            command_collection(event.command_name, event.command) or ''
+        )
+
+    def _finished(self, event, outcome):
+        collection = self._collections.pop((event.connection_id, event.request_id), '')
+        MONGO_COMMANDS.labels(collection, event.command_name, outcome).inc()
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._finished(event, 'succeeded')
+
+    def failed(self, event):
+        self._finished(event, 'failed')
+
+
+def _address(event):
+    host, port = event.address
+    return f'{host}:{port}'
+
+
+class MetricsPoolListener(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections per server"""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(_address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).dec()
+
+
+command_metrics_listener = MetricsCommandListener()
+pool_metrics_listener = MetricsPoolListener()
+
+
+def metrics_registry():
+    """Registry for a scrape: every process's samples in multiprocess mode, else this process's"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; requires ``Authorization: Bearer <METRICS_TOKEN>``
+
+    Without a METRICS_TOKEN the endpoint only answers when DEBUG is on.
+    """
+    if not has_metrics_token(request):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,124 @@
+"""
+Request middleware for PoojaPath API
+"""
+
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from mongo_monitoring import end_request, start_request
+from .metrics import REQUEST_DURATION, REQUESTS, REQUESTS_IN_PROGRESS
+
+request_logger = logging.getLogger('poojapath.requests')
+
+
+class RequestTimingMiddleware:
+    """Reports how much of each request was spent in MongoDB
+    
+    Logs one structured line per request and, with SERVER_TIMING_HEADER on,
+    adds a ``Server-Timing`` header (total, MongoDB, and MongoDB per
+    collection). Works for both the sync DRF views and the async views
+    without forcing a thread hop.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, stats)
+    
+    async def __acall__(self, request):
+        stats, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, stats)
+    
+    def finish(self, request, response, stats):
+        duration = time.perf_counter() - stats.started
+        if self.server_timing:
+            response['Server-Timing'] = stats.server_timing(duration)
+        
+        match = getattr(request, 'resolver_match', None)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            **stats.as_dict(),
+        }
+        request_logger.info(f'request {json.dumps(fields)}', extra={'request_timing': fields})
+        return response
+
+
+def route_label(request):
+    """URL pattern of the request (e.g. 'api/pandit/location/<str:location>/'), bounded cardinality"""
+    try:
+        return resolve(request.path_info).route
+    except Resolver404:
+        return 'unmatched'
+
+
+class MetricsMiddleware:
+    """Per-route Prometheus request counters, latency histograms and in-flight gauges"""
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        labels, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.stop(labels)
+        return self.record(labels, started, response)
+    
+    async def __acall__(self, request):
+        labels, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.stop(labels)
+        return self.record(labels, started, response)
+    
+    @staticmethod
+    def start(request):
+        labels = (route_label(request), request.method)
+        REQUESTS_IN_PROGRESS.labels(*labels).inc()
+        return labels, time.perf_counter()
+    
+    @staticmethod
+    def stop(labels):
+        REQUESTS_IN_PROGRESS.labels(*labels).dec()
+    
+    @staticmethod
+    def record(labels, started, response):
+        REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - started)
+        REQUESTS.labels(*labels, str(response.status_code)).inc()
+        return response
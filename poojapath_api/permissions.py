@@ -0,0 +1,28 @@
+"""
+Access to operational endpoints
+
+``/metrics`` and the cache statistics are not for API users: they answer to
+``Authorization: Bearer <METRICS_TOKEN>``, or to anyone while DEBUG is on and
+no METRICS_TOKEN is set.
+"""
+
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+def has_metrics_token(request):
+    """Whether the request may read operational data (see the module docstring)"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return settings.DEBUG
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+class HasMetricsToken(BasePermission):
+    """DRF permission for views that must be used with no authentication classes"""
+    
+    def has_permission(self, request, view):
+        return has_metrics_token(request)
@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the whole request
+    'poojapath_api.middleware.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -84,6 +86,46 @@ WSGI_APPLICATION = 'poojapath_api.wsgi.application'
 # Dynamic database configuration based on environment variable
 USE_MONGODB = config('USE_MONGODB', default=False, cast=bool)
 
+# Serve the async (motor) views from */views_async.py; requires USE_MONGODB=True and an
+# ASGI server, e.g. `uvicorn poojapath_api.asgi:application`
+USE_ASYNC_VIEWS = config('USE_ASYNC_VIEWS', default=False, cast=bool)
+if USE_ASYNC_VIEWS:
+    # WhiteNoise 6.6 is sync-only and would push every request through a worker thread
+    # under ASGI; serve /static/ from the reverse proxy in async deployments
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Attribute MongoDB command count/duration to each request (request logs and, when
+# SERVER_TIMING_HEADER is on, a Server-Timing header) and log commands slower than
+# MONGODB_SLOW_COMMAND_MS with their filter shape. The header shows every client the
+# collection names and timings, so it is off unless enabled for debugging.
+MONGODB_COMMAND_MONITORING = config('MONGODB_COMMAND_MONITORING', default=True, cast=bool)
+MONGODB_SLOW_COMMAND_MS = config('MONGODB_SLOW_COMMAND_MS', default=100, cast=int)
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=False, cast=bool)
+
+# Prometheus metrics (poojapath_api/metrics.py) served at /metrics. Scrapes must send
+# "Authorization: Bearer <METRICS_TOKEN>"; without a token /metrics only answers when DEBUG
+# is on, since it reveals route names, traffic volumes and error rates. The same token guards
+# /api/pandit/cache/stats/. Under gunicorn,
+# gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR so the samples of all workers are aggregated.
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'poojapath_api.middleware.MetricsMiddleware')
+
+# Log MongoDB indexes missing from mongo_indexes.MONGO_INDEXES at startup
+MONGODB_CHECK_INDEXES_ON_STARTUP = config('MONGODB_CHECK_INDEXES_ON_STARTUP', default=False, cast=bool)
+
+# Explain (queryPlanner, without running it) each new MongoDB query shape once and flag collection
+# scans and in-memory sorts of more than MONGODB_QUERY_GUARD_SORT_DOCS documents (mongo_query_guard.py):
+# "raise" fails the query (tests), "log" logs and counts it, explaining only a sample of unchecked shapes
+MONGODB_QUERY_GUARD = config('MONGODB_QUERY_GUARD', default='off')  # off | log | raise
+MONGODB_QUERY_GUARD_SAMPLE_RATE = config('MONGODB_QUERY_GUARD_SAMPLE_RATE', default=0.1, cast=float)
+MONGODB_QUERY_GUARD_SORT_DOCS = config('MONGODB_QUERY_GUARD_SORT_DOCS', default=1000, cast=int)
+
+# Expire OTPs with a TTL index; set to False and run `manage.py sweep_expired_otps` instead
+# on deployments that cannot use TTL indexes
+MONGODB_OTP_TTL_INDEX = config('MONGODB_OTP_TTL_INDEX', default=True, cast=bool)
+
 # Always use SQLite for Django internal operations (admin, sessions, migrations)
 # When USE_MONGODB=True, API views will use MongoDB directly via mongo_models
 DATABASES = {
@@ -93,6 +135,17 @@ DATABASES = {
     }
 }
 
+# Process-local read-through cache for pandit list/location queries
+PANDIT_CACHE_MAX_ENTRIES = config('PANDIT_CACHE_MAX_ENTRIES', default=1024, cast=int)
+PANDIT_CACHE_TTL_SECONDS = config('PANDIT_CACHE_TTL_SECONDS', default=60, cast=int)
+
+# Login session records are queued in-process and inserted in batches
+# (mongo_writers.session_writer); set LOGIN_SESSION_BUFFERED=False for synchronous inserts
+LOGIN_SESSION_BUFFERED = config('LOGIN_SESSION_BUFFERED', default=True, cast=bool)
+LOGIN_SESSION_FLUSH_SIZE = config('LOGIN_SESSION_FLUSH_SIZE', default=100, cast=int)
+LOGIN_SESSION_FLUSH_SECONDS = config('LOGIN_SESSION_FLUSH_SECONDS', default=1.0, cast=float)
+LOGIN_SESSION_QUEUE_SIZE = config('LOGIN_SESSION_QUEUE_SIZE', default=10000, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,6 +165,30 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. The first entry of PASSWORD_HASHERS hashes new passwords; users whose
+# stored hash uses another hasher (or an older PBKDF2 cost) are rehashed on their next login.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=0, cast=int)  # 0 = Django default
+
+_PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'authentication.hashing.ConfigurablePBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Hashing runs in a bounded pool (authentication/hashing.py); requests beyond
+# workers + max pending wait up to the timeout, then get a 503
+PASSWORD_HASHING_EXECUTOR = config('PASSWORD_HASHING_EXECUTOR', default='thread')  # thread | process
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=os.cpu_count() or 1, cast=int)
+PASSWORD_HASHING_MAX_PENDING = config('PASSWORD_HASHING_MAX_PENDING', default=64, cast=int)
+PASSWORD_HASHING_TIMEOUT_SECONDS = config('PASSWORD_HASHING_TIMEOUT_SECONDS', default=5, cast=float)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -138,8 +215,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
+    # Tokens identify MongoDB users; the principal is built from the token claims
+    # instead of a Django User row
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.MongoJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -150,6 +229,7 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME_MINUTES', default=60, cast=int)),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=config('JWT_REFRESH_TOKEN_LIFETIME_DAYS', default=1, cast=int)),
+    # Enforced by authentication.revocation (no token_blacklist app / SQL tables needed)
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': False,
@@ -179,6 +259,18 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Confirm the token's Mongo user still exists and is verified; results are cached per
+# process for JWT_PRINCIPAL_CACHE_TTL_SECONDS
+JWT_VERIFY_MONGO_USER = config('JWT_VERIFY_MONGO_USER', default=True, cast=bool)
+JWT_PRINCIPAL_CACHE_MAX_ENTRIES = config('JWT_PRINCIPAL_CACHE_MAX_ENTRIES', default=10000, cast=int)
+JWT_PRINCIPAL_CACHE_TTL_SECONDS = config('JWT_PRINCIPAL_CACHE_TTL_SECONDS', default=60, cast=int)
+
+# Refresh-token revocation store (authentication/revocation.py): per-process Bloom filter
+# sizing and how often it picks up revocations made by other processes
+JWT_REVOCATION_BLOOM_CAPACITY = config('JWT_REVOCATION_BLOOM_CAPACITY', default=100000, cast=int)
+JWT_REVOCATION_BLOOM_ERROR_RATE = config('JWT_REVOCATION_BLOOM_ERROR_RATE', default=0.001, cast=float)
+JWT_REVOCATION_REFRESH_SECONDS = config('JWT_REVOCATION_REFRESH_SECONDS', default=5, cast=float)
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -197,5 +289,40 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
+# Email outbox (authentication/outbox.py): OTP emails are queued in MongoDB and sent by
+# background workers. EMAIL_OUTBOX_WORKERS=0 leaves delivery to `manage.py run_email_outbox`.
+EMAIL_OUTBOX_WORKERS = config('EMAIL_OUTBOX_WORKERS', default=1, cast=int)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=20, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_BACKOFF_SECONDS = config('EMAIL_OUTBOX_BACKOFF_SECONDS', default=30, cast=int)
+EMAIL_OUTBOX_POLL_SECONDS = config('EMAIL_OUTBOX_POLL_SECONDS', default=5, cast=int)
+
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
+
+# Logging: one structured line per request (poojapath.requests) and slow MongoDB
+# commands (poojapath.mongo)
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'plain',
+        },
+    },
+    'loggers': {
+        'poojapath': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
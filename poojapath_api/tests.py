@@ -0,0 +1,171 @@
+import os
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+
+from mongo_monitoring import CommandTimingListener, command_listener
+from .metrics import metrics_view
+from .middleware import MetricsMiddleware, RequestTimingMiddleware
+
+
+def run_command(listener, command_name, command, duration_ms, request_id=1, failure=None):
+    """Feed the listener the events pymongo sends for one command (mongomock sends none)"""
+    event = SimpleNamespace(
+        command_name=command_name,
+        command=command,
+        connection_id=('localhost', 27017),
+        request_id=request_id,
+        database_name='poojapath_db',
+        duration_micros=int(duration_ms * 1000),
+        failure=failure,
+    )
+    listener.started(event)
+    if failure is None:
+        listener.succeeded(event)
+    else:
+        listener.failed(event)
+
+
+def pandit_list_view(request):
+    run_command(command_listener, 'find', {'find': 'pandits', 'filter': {}}, 3, request_id=1)
+    run_command(command_listener, 'count', {'count': 'pandits', 'query': {}}, 1, request_id=2)
+    return HttpResponse()
+
+
+class RequestTimingMiddlewareTests(SimpleTestCase):
+    def request(self):
+        middleware = RequestTimingMiddleware(pandit_list_view)
+        with self.assertLogs('poojapath.requests', level='INFO') as logs:
+            response = middleware(RequestFactory().get('/api/pandit/list/'))
+        return response, logs.records[0].request_timing
+
+    def test_no_server_timing_header_by_default(self):
+        response, timing = self.request()
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(timing['mongo_commands'], 2)
+        self.assertEqual(timing['mongo_collections']['pandits']['commands'], 2)
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing_header_when_enabled(self):
+        response, _ = self.request()
+
+        metrics = response['Server-Timing'].split(', ')
+        self.assertTrue(metrics[0].startswith('app;dur='))
+        self.assertEqual(metrics[1:], [
+            'mongo;dur=4.0;desc="2 commands"',
+            'mongo.pandits;dur=4.0;desc="2 commands"',
+        ])
+
+
+class SlowCommandLogTests(SimpleTestCase):
+    def setUp(self):
+        self.listener = CommandTimingListener(slow_threshold_ms=50)
+
+    def test_slow_command_is_logged_with_its_redacted_filter(self):
+        with self.assertLogs('poojapath.mongo', level='WARNING') as logs:
+            run_command(self.listener, 'find', {
+                'find': 'pandits', 'filter': {'location_key': {'$regex': '^delhi'}, 'phone': '9876543210'},
+            }, 80)
+
+        self.assertEqual(logs.records[0].mongo_command, {
+            'command': 'find',
+            'collection': 'pandits',
+            'database': 'poojapath_db',
+            'duration_ms': 80.0,
+            'filter': {'location_key': {'$regex': '?'}, 'phone': '?'},
+        })
+        self.assertNotIn('9876543210', logs.output[0])
+        self.assertIn('"collection": "pandits"', logs.output[0])
+
+    def test_fast_command_is_not_logged(self):
+        with self.assertNoLogs('poojapath.mongo', level='WARNING'):
+            run_command(self.listener, 'find', {'find': 'pandits', 'filter': {'phone': '1'}}, 10)
+
+    def test_failed_slow_command_includes_the_error(self):
+        with self.assertLogs('poojapath.mongo', level='WARNING') as logs:
+            run_command(self.listener, 'update', {
+                'update': 'users', 'updates': [{'q': {'email': 'ravi@example.com'}, 'u': {}}],
+            }, 120, failure={'errmsg': 'operation exceeded time limit'})
+
+        self.assertEqual(logs.records[0].mongo_command['failure'], 'operation exceeded time limit')
+        self.assertEqual(logs.records[0].mongo_command['filter'], {'email': '?'})
+
+
+class MetricsViewTests(SimpleTestCase):
+    def scrape(self, **headers):
+        return metrics_view(RequestFactory().get('/metrics', headers=headers))
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_refused_without_a_token_outside_debug(self):
+        self.assertEqual(self.scrape().status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_open_without_a_token_in_debug(self):
+        response = self.scrape()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'poojapath_http_requests_total', response.content)
+
+    @override_settings(METRICS_TOKEN='s3cret', DEBUG=False)
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(Authorization='Bearer wrong').status_code, 403)
+        self.assertEqual(self.scrape(Authorization='Bearer s3cret').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_multiprocess_scrape_sums_every_worker(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Two "workers", each recording requests into the shared directory
+            for count in (2, 3):
+                subprocess.run([sys.executable, '-c', (
+                    'from poojapath_api.metrics import REQUESTS; '
+                    f"REQUESTS.labels('api/pandit/list/', 'GET', '200').inc({count})"
+                )], cwd=settings.BASE_DIR, env=dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory), check=True)
+
+            with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory):
+                response = self.scrape(Authorization='Bearer s3cret')
+
+        self.assertIn(
+            b'poojapath_http_requests_total{method="GET",route="api/pandit/list/",status="200"} 5.0',
+            response.content,
+        )
+
+
+class MetricsMiddlewareTests(SimpleTestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(f'poojapath_{name}', labels) or 0
+
+    def test_records_requests_by_route_and_status(self):
+        labels = {'route': 'api/pandit/location/<str:location>/', 'method': 'GET'}
+        in_progress = []
+
+        def view(request):
+            in_progress.append(self.sample('http_requests_in_progress', **labels))
+            return HttpResponse(status=201)
+
+        before = self.sample('http_requests_total', status='201', **labels)
+        observations = self.sample('http_request_duration_seconds_count', **labels)
+
+        MetricsMiddleware(view)(RequestFactory().get('/api/pandit/location/Delhi/'))
+
+        self.assertEqual(self.sample('http_requests_total', status='201', **labels), before + 1)
+        self.assertEqual(self.sample('http_request_duration_seconds_count', **labels), observations + 1)
+        self.assertEqual(in_progress, [1])
+        self.assertEqual(self.sample('http_requests_in_progress', **labels), 0)
+
+    def test_unknown_paths_share_one_label(self):
+        labels = {'route': 'unmatched', 'method': 'GET', 'status': '404'}
+        before = self.sample('http_requests_total', **labels)
+
+        for path in ('/wp-admin/', '/.env'):
+            MetricsMiddleware(lambda request: HttpResponse(status=404))(RequestFactory().get(path))
+
+        self.assertEqual(self.sample('http_requests_total', **labels), before + 2)